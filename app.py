@@ -1,6 +1,6 @@
 ﻿# app.py - Imobil.Index 2026 - For Sale + Monthly Rent + Daily Rent
 import os
-from collections.abc import Iterable
+from collections.abc import Callable, Iterable, Mapping
 
 import pandas as pd
 import plotly.express as px
@@ -8,6 +8,8 @@ import streamlit as st
 
 from dashboard_charts import (
     apply_common_chart_style,
+    build_sector_trend_figure,
+    cached_figure,
     render_listing_sections,
     render_plotly_chart,
     render_price_sections,
@@ -15,7 +17,9 @@ from dashboard_charts import (
 from dashboard_components import (
     format_int,
     format_number,
+    format_number_series,
     format_percent,
+    format_percent_series,
     format_price,
     render_app_header,
     render_chart_title,
@@ -27,9 +31,15 @@ from dashboard_components import (
 )
 from dashboard_data import (
     HISTORY_WINDOW_DAYS,
-    load_data,
-    load_historical_data,
-    load_historical_segment_data,
+    dataset_memory_report,
+    history_grain,
+    history_price_index,
+    load_dashboard_data,
+    load_history_window,
+    load_sale_profile_rollup,
+    market_index,
+    segment_cube,
+    snapshot_status,
 )
 from dashboard_theme import (
     CHART_NEUTRAL,
@@ -43,24 +53,34 @@ from dashboard_theme import (
     theme_css_vars,
 )
 from dashboard_transforms import (
-    apply_daily_occupancy_assumption,
+    ROLLING_INDEX_WINDOWS_DAYS,
+    as_datetime,
+    as_numeric,
     build_city_market_summary,
     build_city_price_gap_summary,
-    build_daily_vs_monthly_return,
+    build_occupancy_scenarios,
+    build_price_movement,
+    build_price_panel,
     build_sale_market_from_segments,
     build_segment_summary,
     build_weekly_city_price_movement,
     build_weekly_price_movement,
     data_freshness,
-    filter_by_city,
-    filter_by_city_and_listings,
     filter_sale_profile_segments,
-    filter_segments_to_market,
     has_sale_profile_filters,
     latest_data_date,
+    memoized,
+    new_transform_memo,
+    occupancy_return_scenario,
+    occupancy_scenario,
+    occupancy_scenario_table,
+    order_segment_summary,
     ordered_segment_options,
     place_label,
+    query_segment_cube,
     sector_label,
+    select_market_segments,
+    select_markets,
     weighted_average,
 )
 
@@ -98,6 +118,25 @@ CONDITION_GROUP_ORDER = [
     "Needs renovation",
 ]
 FLOOR_POSITION_ORDER = ["Ground floor", "Middle floor", "Top floor"]
+DASHBOARD_VIEWS = ["For Sale", "Monthly Rent", "Daily Rent", "Insights"]
+# Inputs that live inside view fragments. Their values are carried in session
+# state so they survive runs where their view is not rendered.
+VIEW_INPUT_DEFAULTS = {
+    "buyer_budget_eur": 100_000,
+    "daily_occupancy_percent": 60,
+    "market_lens": "Prices",
+    "trend_window": "90 days",
+    "trend_smoothing": "Daily",
+}
+# Sale trend windows. Longer windows read coarser history tiers, so the rows
+# loaded per sector stay roughly constant.
+TREND_WINDOWS = {"90 days": 90, "1 year": 365, "2 years": 730, "5 years": 1_825}
+TREND_GRAIN_LABELS = {"day": "Daily", "week": "Weekly", "month": "Monthly"}
+# Daily windows can swap raw snapshots for a rolling price index.
+TREND_SMOOTHING = {
+    "Daily": None,
+    **{f"{days}-day index": days for days in ROLLING_INDEX_WINDOWS_DAYS},
+}
 
 
 # =========================
@@ -148,7 +187,7 @@ __THEME_CSS_VARS__
             color: var(--text);
         }
 
-        div[data-testid="stTabs"] [role="tablist"] {
+        .st-key-view [data-testid="stButtonGroup"] {
             display: flex;
             flex-wrap: wrap;
             gap: 0.35rem;
@@ -162,30 +201,24 @@ __THEME_CSS_VARS__
             box-shadow: var(--shadow-card);
         }
 
-        div[data-testid="stTabs"] button {
+        .st-key-view button {
             flex: 1 1 8rem;
             justify-content: center;
             min-height: 2.35rem;
+            margin: 0;
             padding: 0.45rem 0.9rem;
-            border-radius: 6px;
-            border-bottom: 0 !important;
+            border: 0 !important;
+            border-radius: 6px !important;
+            background: transparent;
             font-weight: 650;
             color: #4f625a;
         }
 
-        div[data-testid="stTabs"] button[aria-selected="true"] {
+        .st-key-view button[kind="segmented_controlActive"] {
             background: var(--ink);
             color: #ffffff;
         }
 
-        div[data-testid="stTabs"] [data-baseweb="tab-highlight"] {
-            display: none;
-        }
-
-        div[data-testid="stTabs"] [data-baseweb="tab-border"] {
-            display: none;
-        }
-
         .app-header {
             margin: 0 0 1.15rem;
             padding: 1.05rem 1.15rem;
@@ -474,13 +507,13 @@ __THEME_CSS_VARS__
                 min-width: 0 !important;
             }
 
-            div[data-testid="stTabs"] [role="tablist"] {
+            .st-key-view [data-testid="stButtonGroup"] {
                 gap: 0.3rem;
                 margin-bottom: 1rem;
                 padding: 0.3rem;
             }
 
-            div[data-testid="stTabs"] button {
+            .st-key-view button {
                 flex: 1 1 calc(50% - 0.3rem);
                 min-height: 2.45rem;
                 padding: 0.45rem 0.35rem;
@@ -545,6 +578,11 @@ __THEME_CSS_VARS__
 )
 
 
+def derived(func: Callable, *args):
+    """Transform output memoized for this session; see `memoized`."""
+    return memoized(st.session_state["derived_frames"], func, *args)
+
+
 def render_data_load_error(details: str, show_details: bool = False) -> None:
     st.markdown(
         """
@@ -565,6 +603,55 @@ def render_data_load_error(details: str, show_details: bool = False) -> None:
             st.code(details)
 
 
+def render_stale_data_notice(details: str, show_details: bool = False) -> None:
+    st.markdown(
+        """
+        <div class="data-error-card">
+            <div class="data-error-label">Data connection</div>
+            <div class="data-error-title">Showing the last loaded snapshot</div>
+            <div class="data-error-copy">
+                The latest refresh from the public API did not complete, so the
+                dashboard keeps showing the previous market snapshot. It will
+                retry automatically in the background.
+            </div>
+        </div>
+        """,
+        unsafe_allow_html=True,
+    )
+    if show_details:
+        with st.expander("Technical details", icon=":material/code:"):
+            st.code(details)
+
+
+def render_load_diagnostics(
+    timings: dict[str, float],
+    datasets: dict[str, pd.DataFrame],
+) -> None:
+    with st.expander("Data load diagnostics", icon=":material/timer:"):
+        st.dataframe(
+            pd.DataFrame(
+                {
+                    "Dataset": list(timings),
+                    "Seconds": [round(value, 3) for value in timings.values()],
+                }
+            ).sort_values("Seconds", ascending=False),
+            hide_index=True,
+        )
+        memory = dataset_memory_report(datasets)
+        st.dataframe(
+            memory.rename(
+                columns={
+                    "dataset": "Dataset",
+                    "rows": "Rows",
+                    "columns": "Columns",
+                    "memory_mb": "Memory, MB",
+                }
+            ).round({"Memory, MB": 2}),
+            hide_index=True,
+        )
+        st.caption(f"Total in memory: {memory['memory_mb'].sum():.1f} MB")
+
+
 def render_tab_header(
     df: pd.DataFrame,
     price_col: str,
@@ -638,11 +725,25 @@ def render_segment_chart(
         render_empty_state("Not enough segment data for the current filters.")
         return
 
+    fig = cached_figure(
+        build_segment_chart_figure, summary, group_col, y_label, category_order
+    )
+    with st.container(border=True):
+        render_chart_title(title)
+        render_plotly_chart(fig)
+
+
+def build_segment_chart_figure(
+    summary: pd.DataFrame,
+    group_col: str,
+    y_label: str,
+    category_order: list[str],
+):
     plot = summary.copy()
     plot[group_col] = plot[group_col].astype(str)
-    plot["Label"] = plot["avg_per_m2_eur"].map(format_number)
-    plot["PriceLabel"] = plot["avg_per_m2_eur"].map(format_number)
-    plot["ListingsLabel"] = plot["listings"].map(format_int)
+    plot["Label"] = format_number_series(plot["avg_per_m2_eur"])
+    plot["PriceLabel"] = plot["Label"]
+    plot["ListingsLabel"] = format_number_series(plot["listings"])
     plot["Profile"] = pd.Categorical(
         plot[group_col],
         categories=category_order,
@@ -692,16 +793,14 @@ def render_segment_chart(
         automargin=True,
         title_text="",
     )
-
-    with st.container(border=True):
-        render_chart_title(title)
-        render_plotly_chart(fig)
+    return fig
 
 
 def render_sale_segments(
     df_segments: pd.DataFrame,
     selected_rooms: Iterable[str],
     selected_area_bands: Iterable[str],
+    summaries: Mapping[str, pd.DataFrame] | None = None,
 ) -> None:
     profile_caption = (
         "Sale prices inside the current room and area profile, weighted by listings."
@@ -712,16 +811,23 @@ def render_sale_segments(
         "Prices by home profile",
         profile_caption,
     )
-    if df_segments.empty:
+    if summaries is not None:
+        room_summary = order_segment_summary(
+            summaries["rooms_group"], "rooms_group", ROOM_GROUP_ORDER
+        )
+        area_summary = order_segment_summary(
+            summaries["area_band"], "area_band", AREA_BAND_ORDER
+        )
+    elif df_segments.empty:
         render_empty_state("No sale segment data matches the current filters.")
         return
-
-    room_summary = build_segment_summary(
-        df_segments, "rooms_group", ROOM_GROUP_ORDER
-    )
-    area_summary = build_segment_summary(
-        df_segments, "area_band", AREA_BAND_ORDER
-    )
+    else:
+        room_summary = derived(
+            build_segment_summary, df_segments, "rooms_group", ROOM_GROUP_ORDER
+        )
+        area_summary = derived(
+            build_segment_summary, df_segments, "area_band", AREA_BAND_ORDER
+        )
 
     col_rooms, col_area = st.columns(2)
     with col_rooms:
@@ -818,17 +924,22 @@ def render_city_comparison_chart(
     value_col: str,
     title: str,
 ) -> None:
-    plot = summary.nlargest(10, value_col).sort_values(value_col).copy()
+    plot = summary.nlargest(10, value_col)
     if plot.empty:
         render_empty_state("Not enough city data for the current filters.")
         return
 
-    is_price_chart = value_col == "avg_per_m2_eur"
-    plot["Label"] = plot[value_col].map(
-        lambda value: format_number(value) if is_price_chart else format_int(value)
-    )
-    plot["PriceLabel"] = plot["avg_per_m2_eur"].map(format_number)
-    plot["ListingsLabel"] = plot["listings"].map(format_int)
+    fig = cached_figure(build_city_comparison_figure, plot, value_col)
+    with st.container(border=True):
+        render_chart_title(title)
+        render_plotly_chart(fig)
+
+
+def build_city_comparison_figure(plot: pd.DataFrame, value_col: str):
+    plot = plot.sort_values(value_col).copy()
+    plot["Label"] = format_number_series(plot[value_col])
+    plot["PriceLabel"] = format_number_series(plot["avg_per_m2_eur"])
+    plot["ListingsLabel"] = format_number_series(plot["listings"])
 
     colors = [CHART_NEUTRAL] * len(plot)
     if colors:
@@ -870,14 +981,14 @@ def render_city_comparison_chart(
         automargin=True,
         title_text="",
     )
+    return fig
 
-    with st.container(border=True):
-        render_chart_title(title)
-        render_plotly_chart(fig)
 
-
-def render_city_comparison(df: pd.DataFrame) -> None:
-    summary = build_city_market_summary(df)
+def render_city_comparison(
+    df: pd.DataFrame,
+    summary: pd.DataFrame | None = None,
+) -> None:
+    summary = derived(build_city_market_summary, df) if summary is None else summary
     if summary.empty or summary["city"].nunique() < 2:
         return
 
@@ -900,7 +1011,8 @@ def render_city_comparison(df: pd.DataFrame) -> None:
         )
 
 
-def render_budget_guide(df: pd.DataFrame, buyer_budget: int) -> None:
+@st.fragment
+def render_budget_guide(df: pd.DataFrame) -> None:
     required = {"city", "sector", "listings", "avg_price_eur", "avg_per_m2_eur"}
     if df.empty or not required.issubset(df.columns):
         return
@@ -909,10 +1021,16 @@ def render_budget_guide(df: pd.DataFrame, buyer_budget: int) -> None:
         "Budget guide",
         "City-sector averages that fit the buyer budget, ranked by visible supply.",
     )
+    buyer_budget = st.number_input(
+        "Buyer budget, EUR",
+        min_value=10_000,
+        step=5_000,
+        key="buyer_budget_eur",
+    )
 
     markets = df.copy()
     for column in ("listings", "avg_price_eur", "avg_per_m2_eur"):
-        markets[column] = pd.to_numeric(markets[column], errors="coerce")
+        markets[column] = as_numeric(markets[column])
     markets = markets.dropna(subset=required)
     markets = markets[markets["listings"] > 0]
     within_budget = markets[markets["avg_price_eur"] <= buyer_budget].copy()
@@ -955,9 +1073,8 @@ def render_budget_guide(df: pd.DataFrame, buyer_budget: int) -> None:
             "listings": "Listings",
         }
     )
-    shortlist["Avg price, EUR"] = shortlist["Avg price, EUR"].map(format_number)
-    shortlist["Price, EUR/m2"] = shortlist["Price, EUR/m2"].map(format_number)
-    shortlist["Listings"] = shortlist["Listings"].map(format_int)
+    for column in ("Avg price, EUR", "Price, EUR/m2", "Listings"):
+        shortlist[column] = format_number_series(shortlist[column])
 
     with st.container(border=True):
         st.dataframe(
@@ -1070,10 +1187,17 @@ def render_weekly_market_brief(
     historical_sales: pd.DataFrame,
     visible_markets: pd.DataFrame,
 ) -> None:
-    movement = build_weekly_city_price_movement(historical_sales, visible_markets)
+    # Movement at every lag is computed once per snapshot; each filter state
+    # only slices its seven-day rows.
+    price_movement = derived(
+        build_price_movement, derived(build_price_panel, historical_sales)
+    )
+    movement = derived(
+        build_weekly_city_price_movement, price_movement, visible_markets
+    )
     is_city_brief = len(movement) >= 3
     if not is_city_brief:
-        movement = build_weekly_price_movement(historical_sales, visible_markets)
+        movement = derived(build_weekly_price_movement, price_movement, visible_markets)
         if len(movement) < 3:
             return
 
@@ -1160,10 +1284,11 @@ def build_break_even_table(
     if df_rent.empty or not required.issubset(df_rent.columns):
         return pd.DataFrame()
 
-    monthly = df_rent[df_rent["deal_type"] == MONTHLY_RENT_DEAL].copy()
-    daily = df_rent[df_rent["deal_type"] == DAILY_RENT_DEAL].copy()
-    monthly = filter_by_city_and_listings(monthly, selected_cities, min_listings)
-    daily = filter_by_city_and_listings(daily, selected_cities, min_listings)
+    rent_index = market_index(df_rent)
+    monthly = select_markets(
+        rent_index, selected_cities, min_listings, MONTHLY_RENT_DEAL
+    )
+    daily = select_markets(rent_index, selected_cities, min_listings, DAILY_RENT_DEAL)
     if monthly.empty or daily.empty:
         return pd.DataFrame()
 
@@ -1217,16 +1342,30 @@ def render_break_even_analysis(df_break_even: pd.DataFrame) -> None:
         cards,
     )
 
-    top = df_break_even.nsmallest(10, "break_even_days").copy()
-    top["ChartLabel"] = top["Sector"].str.replace(" -> ", " - ", regex=False)
-    top = top.sort_values("break_even_days", ascending=True)
-    top["Label"] = top["break_even_days"].map(
-        lambda value: f"{format_number(value)} days"
+    fig = cached_figure(
+        build_break_even_figure, df_break_even.nsmallest(10, "break_even_days")
     )
-    top["HoverLabel"] = top["break_even_days"].map(
-        lambda value: f"{format_number(value, 1)} days"
+    with st.container(border=True):
+        render_plotly_chart(fig)
+
+    st.markdown(
+        """
+        <div class="insight-strip">
+            This is a price-only comparison from current listings. It does not
+            include utilities, cleaning, service fees, vacancy, or seasonality.
+        </div>
+        """,
+        unsafe_allow_html=True,
     )
 
+
+def build_break_even_figure(top: pd.DataFrame):
+    top = top.copy()
+    top["ChartLabel"] = top["Sector"].str.replace(" -> ", " - ", regex=False)
+    top = top.sort_values("break_even_days", ascending=True)
+    top["Label"] = format_number_series(top["break_even_days"]) + " days"
+    top["HoverLabel"] = format_number_series(top["break_even_days"], 1) + " days"
+
     fig = px.bar(
         top,
         x="break_even_days",
@@ -1250,18 +1389,7 @@ def render_break_even_analysis(df_break_even: pd.DataFrame) -> None:
     fig.update_layout(margin={"l": 4, "r": 68, "t": 8, "b": 4}, bargap=0.24)
     fig.update_xaxes(title_text="", showticklabels=False, ticks="")
     fig.update_yaxes(tickangle=0, automargin=True, title_text="")
-    with st.container(border=True):
-        render_plotly_chart(fig)
-
-    st.markdown(
-        """
-        <div class="insight-strip">
-            This is a price-only comparison from current listings. It does not
-            include utilities, cleaning, service fees, vacancy, or seasonality.
-        </div>
-        """,
-        unsafe_allow_html=True,
-    )
+    return fig
 
 
 def render_outside_chisinau_radar(df_sales: pd.DataFrame) -> None:
@@ -1274,7 +1402,7 @@ def render_outside_chisinau_radar(df_sales: pd.DataFrame) -> None:
         return
 
     outside["weighted_value"] = outside[price_col] * outside["listings"]
-    city_stats = outside.groupby("city", as_index=False).agg(
+    city_stats = outside.groupby("city", as_index=False, observed=True).agg(
         listings=("listings", "sum"),
         weighted_value=("weighted_value", "sum"),
     )
@@ -1327,7 +1455,9 @@ def render_outside_chisinau_radar(df_sales: pd.DataFrame) -> None:
     )
     render_insight_card_row(cards)
 
-    regional_comparison = build_city_price_gap_summary(df_sales, CHISINAU_CITY)
+    regional_comparison = derived(
+        build_city_price_gap_summary, df_sales, CHISINAU_CITY
+    )
     if (
         regional_comparison.empty
         or "price_gap_eur_per_m2" not in regional_comparison.columns
@@ -1339,16 +1469,23 @@ def render_outside_chisinau_radar(df_sales: pd.DataFrame) -> None:
     if regional_comparison["city"].nunique() < 2:
         return
 
-    plot = (
-        regional_comparison.nlargest(8, "price_gap_eur_per_m2")
-        .sort_values("price_gap_eur_per_m2")
-        .copy()
+    fig = cached_figure(
+        build_price_gap_figure,
+        regional_comparison.nlargest(8, "price_gap_eur_per_m2"),
     )
-    plot["Label"] = plot["price_gap_eur_per_m2"].map(
-        lambda value: format_number(value)
+    with st.container(border=True):
+        render_chart_title("Largest price gap to Chisinau")
+        render_plotly_chart(fig)
+    st.caption(
+        "Values are listing-weighted city averages, not individual listing prices."
     )
-    plot["PriceLabel"] = plot["avg_per_m2_eur"].map(format_number)
-    plot["ListingsLabel"] = plot["listings"].map(format_int)
+
+
+def build_price_gap_figure(plot: pd.DataFrame):
+    plot = plot.sort_values("price_gap_eur_per_m2").copy()
+    plot["Label"] = format_number_series(plot["price_gap_eur_per_m2"])
+    plot["PriceLabel"] = format_number_series(plot["avg_per_m2_eur"])
+    plot["ListingsLabel"] = format_number_series(plot["listings"])
 
     colors = [CHART_NEUTRAL] * len(plot)
     colors[-1] = SALE_COLOR_SCALE[-1]
@@ -1388,13 +1525,7 @@ def render_outside_chisinau_radar(df_sales: pd.DataFrame) -> None:
         automargin=True,
         title_text="",
     )
-
-    with st.container(border=True):
-        render_chart_title("Largest price gap to Chisinau")
-        render_plotly_chart(fig)
-    st.caption(
-        "Values are listing-weighted city averages, not individual listing prices."
-    )
+    return fig
 
 
 def render_yield_opportunity_notes(df_yield: pd.DataFrame) -> None:
@@ -1403,12 +1534,8 @@ def render_yield_opportunity_notes(df_yield: pd.DataFrame) -> None:
         return
 
     data = df_yield.copy()
-    data["yield_monthly_percent"] = pd.to_numeric(
-        data["yield_monthly_percent"], errors="coerce"
-    )
-    data["yield_daily_percent"] = pd.to_numeric(
-        data["yield_daily_percent"], errors="coerce"
-    )
+    data["yield_monthly_percent"] = as_numeric(data["yield_monthly_percent"])
+    data["yield_daily_percent"] = as_numeric(data["yield_daily_percent"])
     data["daily_uplift"] = (
         data["yield_daily_percent"] - data["yield_monthly_percent"]
     )
@@ -1472,7 +1599,7 @@ def render_investment_shortlist(
         "total_rent_listings",
     ]
     for column in numeric_columns:
-        data[column] = pd.to_numeric(data[column], errors="coerce")
+        data[column] = as_numeric(data[column])
     data = data.dropna(subset=["city", "sector", *numeric_columns])
     data = data[
         (data["sale_listings"] >= min_listings)
@@ -1502,13 +1629,10 @@ def render_investment_shortlist(
             "total_rent_listings": "Rent listings",
         }
     )
-    shortlist["Monthly gross yield"] = shortlist["Monthly gross yield"].map(
-        format_percent
-    )
-    shortlist[daily_yield_label] = shortlist[daily_yield_label].map(format_percent)
-    shortlist["Avg price, EUR"] = shortlist["Avg price, EUR"].map(format_number)
-    shortlist["Sale listings"] = shortlist["Sale listings"].map(format_int)
-    shortlist["Rent listings"] = shortlist["Rent listings"].map(format_int)
+    for column in ("Monthly gross yield", daily_yield_label):
+        shortlist[column] = format_percent_series(shortlist[column])
+    for column in ("Avg price, EUR", "Sale listings", "Rent listings"):
+        shortlist[column] = format_number_series(shortlist[column])
 
     render_section(
         "Investment shortlist",
@@ -1551,11 +1675,11 @@ def render_investment_shortlist(
 
 
 def render_daily_vs_monthly_return(
-    df_yield: pd.DataFrame,
+    scenarios: dict,
     daily_occupancy_percent: int,
     min_listings: int,
 ) -> None:
-    data = build_daily_vs_monthly_return(df_yield, daily_occupancy_percent)
+    data = derived(occupancy_return_scenario, scenarios, daily_occupancy_percent)
     if data.empty:
         return
 
@@ -1625,17 +1749,13 @@ def render_daily_vs_monthly_return(
             "daily_advantage_pp": "Daily vs monthly",
         }
     )
-    comparison["Monthly yield"] = comparison["Monthly yield"].map(format_percent)
-    comparison[daily_yield_label] = comparison[daily_yield_label].map(format_percent)
-    comparison["Break-even occupancy"] = comparison[
-        "Break-even occupancy"
-    ].map(format_percent)
-    comparison["Daily vs monthly"] = comparison["Daily vs monthly"].map(
-        lambda value: (
-            f"+{format_number(value, 1)} pp"
-            if value > 0
-            else f"{format_number(value, 1)} pp"
-        )
+    for column in ("Monthly yield", daily_yield_label, "Break-even occupancy"):
+        comparison[column] = format_percent_series(comparison[column])
+    advantage = comparison["Daily vs monthly"]
+    comparison["Daily vs monthly"] = (
+        advantage.gt(0).map({True: "+", False: ""})
+        + format_number_series(advantage, 1)
+        + " pp"
     )
 
     with st.container(border=True):
@@ -1667,6 +1787,84 @@ def render_daily_vs_monthly_return(
     )
 
 
+def render_occupancy_sensitivity(
+    scenarios: dict,
+    daily_occupancy_percent: int,
+    min_listings: int,
+) -> None:
+    table = derived(occupancy_scenario_table, scenarios)
+    if table.empty:
+        return
+
+    table = table[
+        (table["sale_listings"] >= min_listings)
+        & (table["total_rent_listings"] >= min_listings)
+    ]
+    if table.empty:
+        return
+
+    render_section(
+        "Occupancy sensitivity",
+        "Median gross yield of the comparable visible markets at every occupancy step.",
+    )
+    medians = (
+        table.groupby("occupancy_percent")[
+            ["monthly_gross_yield_percent", "daily_gross_yield_percent"]
+        ]
+        .median()
+        .reset_index()
+    )
+    fig = cached_figure(
+        build_occupancy_sensitivity_figure, medians, daily_occupancy_percent
+    )
+    with st.container(border=True):
+        render_plotly_chart(fig)
+    st.download_button(
+        "Download scenarios (CSV)",
+        data=lambda: table.round(2).to_csv(index=False),
+        file_name="occupancy_scenarios.csv",
+        mime="text/csv",
+        on_click="ignore",
+        icon=":material/download:",
+    )
+
+
+def build_occupancy_sensitivity_figure(
+    medians: pd.DataFrame,
+    daily_occupancy_percent: int,
+):
+    fig = px.line(
+        medians,
+        x="occupancy_percent",
+        y=["daily_gross_yield_percent", "monthly_gross_yield_percent"],
+        markers=True,
+    )
+    styles = {
+        "daily_gross_yield_percent": ("Daily rent", YIELD_COLOR_SCALE[-1], "solid"),
+        "monthly_gross_yield_percent": ("Monthly rent", CHART_NEUTRAL, "dash"),
+    }
+    for trace in fig.data:
+        column = trace.name
+        name, color, dash = styles[column]
+        trace.update(
+            name=name,
+            line={"color": color, "width": 2.2, "dash": dash},
+            customdata=format_percent_series(medians[column]).to_numpy(),
+            hovertemplate=f"<b>{name}</b><br>%{{customdata}} gross yield<extra></extra>",
+        )
+    fig.add_vline(
+        x=daily_occupancy_percent,
+        line_width=1,
+        line_dash="dot",
+        line_color=THEME["chart_label"],
+    )
+    fig = apply_common_chart_style(fig, height=340, show_legend=True)
+    fig.update_layout(hovermode="x unified", legend_title_text="")
+    fig.update_xaxes(title_text="Daily occupancy, %", showgrid=False)
+    fig.update_yaxes(title_text="Gross yield, % p.a.", zeroline=False)
+    return fig
+
+
 def render_yield_chart(
     df_yield: pd.DataFrame,
     metric: str,
@@ -1677,17 +1875,24 @@ def render_yield_chart(
     if df_yield.empty or metric not in df_yield.columns:
         render_empty_state("Yield data is not available for the current snapshot.")
         return
-    if pd.to_numeric(df_yield[metric], errors="coerce").dropna().empty:
+    if as_numeric(df_yield[metric]).dropna().empty:
         render_empty_state("Yield data is not available for the current filters.")
         return
 
     top_y = df_yield.copy()
-    top_y[metric] = pd.to_numeric(top_y[metric], errors="coerce")
+    top_y[metric] = as_numeric(top_y[metric])
     top_y = top_y.dropna(subset=[metric]).nlargest(10, metric)
+    fig = cached_figure(build_yield_chart_figure, top_y, metric)
+    with st.container(border=True):
+        render_plotly_chart(fig)
+
+
+def build_yield_chart_figure(top_y: pd.DataFrame, metric: str):
+    top_y = top_y.copy()
     top_y["Sector"] = sector_label(top_y)
     top_y["ChartLabel"] = top_y["Sector"].str.replace(" -> ", " - ", regex=False)
     top_y = top_y.sort_values(metric, ascending=True)
-    top_y["Label"] = top_y[metric].map(format_percent)
+    top_y["Label"] = format_percent_series(top_y[metric])
 
     colors = [CHART_NEUTRAL] * len(top_y)
     if colors:
@@ -1728,112 +1933,82 @@ def render_yield_chart(
         automargin=True,
         title_text="",
     )
-
-    with st.container(border=True):
-        render_plotly_chart(fig)
+    return fig
 
 
-def render_sales_trend(hist: pd.DataFrame, selected_cities: list[str]) -> None:
+@st.fragment
+def render_sales_trend(
+    hist: pd.DataFrame,
+    selected_cities: list[str],
+    freshness: dict | None = None,
+) -> None:
+    window_label = st.session_state["trend_window"]
+    window_days = TREND_WINDOWS[window_label]
+    # The snapshot holds the daily rows; longer windows read a coarser rollup.
+    grain = "day" if window_days <= HISTORY_WINDOW_DAYS else history_grain(window_days)
+    smoothing_days = (
+        TREND_SMOOTHING[st.session_state["trend_smoothing"]] if grain == "day" else None
+    )
+    paths = (
+        f"{TREND_GRAIN_LABELS[grain]} price paths"
+        if smoothing_days is None
+        else f"{smoothing_days}-day listing-weighted price index"
+    )
     render_section(
         "Chisinau price pulse",
-        "90-day price paths in the most active Chisinau sectors.",
+        f"{paths} over {window_label} in the most active Chisinau sectors.",
     )
+    st.radio("Trend window", list(TREND_WINDOWS), horizontal=True, key="trend_window")
+    if grain == "day":
+        st.radio(
+            "Smoothing", list(TREND_SMOOTHING), horizontal=True, key="trend_smoothing"
+        )
+    if selected_cities and CHISINAU_CITY not in selected_cities:
+        render_empty_state("Chisinau is not selected, so the price trend is hidden.")
+        return
+
+    if grain != "day":
+        try:
+            hist = load_history_window(
+                window_days, (CHISINAU_CITY,), freshness=freshness
+            )
+        # The 90-day trend comes from the snapshot and stays available.
+        except Exception:  # noqa: BLE001
+            render_empty_state(
+                f"Price history for {window_label} could not be loaded right now. "
+                "The 90-day trend is still available."
+            )
+            return
+    elif smoothing_days is not None:
+        hist = history_price_index(smoothing_days)
+        if hist.empty:
+            render_empty_state("The smoothed index is not available yet.")
+            return
     if hist.empty:
         render_empty_state("Historical sale data is not available.")
         return
 
     h = hist.copy()
-    h["date"] = pd.to_datetime(h["date"], errors="coerce")
+    h["date"] = as_datetime(h["date"])
     h = h.dropna(subset=["date"])
-    history_cutoff = pd.Timestamp.now() - pd.Timedelta(HISTORY_WINDOW_DAYS, unit="D")
+    history_cutoff = pd.Timestamp.now() - pd.Timedelta(window_days, unit="D")
     h = h[h["date"] >= history_cutoff]
     h = h[h["city"] == CHISINAU_CITY]
 
-    if selected_cities and CHISINAU_CITY not in selected_cities:
-        render_empty_state("Chisinau is not selected, so the 90-day trend is hidden.")
-        return
-
     if h.empty:
-        render_empty_state("No Chisinau history is available for the last 90 days.")
+        render_empty_state(
+            f"No Chisinau history is available for the last {window_label}."
+        )
         return
 
     top_sec = h["sector"].value_counts().head(8).index
-    plot = h[h["sector"].isin(top_sec)].copy().sort_values("date")
+    plot = h[h["sector"].isin(top_sec)].sort_values("date")
 
     if plot.empty:
         render_empty_state("No sectors have enough historical observations to plot.")
         return
 
-    plot["sector"] = plot["sector"].fillna("Center").astype(str)
-    plot["PriceLabel"] = plot["avg_per_m2_eur"].map(format_number)
-    trend_colors = [
-        "#315fc9",
-        "#12805c",
-        "#c56b2c",
-        "#b84d4a",
-        "#7557b5",
-        "#0f8b8d",
-        "#6f8f3b",
-        "#a36b1c",
-    ]
-    color_map = {
-        sector: trend_colors[index % len(trend_colors)]
-        for index, sector in enumerate(plot["sector"].drop_duplicates())
-    }
-
-    fig = px.line(
-        plot,
-        x="date",
-        y="avg_per_m2_eur",
-        color="sector",
-        markers=False,
-        color_discrete_map=color_map,
-        custom_data=["PriceLabel"],
-        labels={"avg_per_m2_eur": "EUR per m2", "date": "Date", "sector": "Sector"},
-    )
-    fig.update_traces(
-        line_width=2.2,
-        hovertemplate=(
-            "<b>%{fullData.name}</b><br>"
-            "%{x|%d %b %Y}<br>"
-            "%{customdata[0]} EUR per m2<extra></extra>"
-        ),
-    )
-
-    last_points = plot.sort_values("date").groupby("sector", as_index=False).tail(1)
-    last_points = last_points.sort_values("avg_per_m2_eur")
-    for _, row in last_points.iterrows():
-        sector = row["sector"]
-        fig.add_scatter(
-            x=[row["date"]],
-            y=[row["avg_per_m2_eur"]],
-            mode="markers+text",
-            marker={"size": 6, "color": color_map.get(sector, THEME["muted"])},
-            text=[f"{sector} {format_number(row['avg_per_m2_eur'])}"],
-            textposition="middle right",
-            textfont={"size": 12, "color": THEME["chart_label"]},
-            hoverinfo="skip",
-            showlegend=False,
-            cliponaxis=False,
-        )
-
-    fig = apply_common_chart_style(fig, height=500, show_legend=False)
-    fig.update_layout(
-        hovermode="x unified",
-        margin={"l": 16, "r": 150, "t": 10, "b": 18},
-    )
-    fig.update_xaxes(
-        title_text="",
-        tickangle=0,
-        showgrid=False,
-        tickformat="%d %b",
-    )
-    fig.update_yaxes(
-        title_text="EUR per m2",
-        gridcolor=THEME["border"],
-        zeroline=False,
-    )
-
+    fig = cached_figure(build_sector_trend_figure, plot)
     with st.container(border=True):
         render_plotly_chart(fig)
 
@@ -1865,26 +2040,25 @@ def render_profile_sales_trend(
         )
         return
 
-    h = filter_by_city(hist_segments, [trend_city])
-    h = filter_sale_profile_segments(h, selected_rooms, selected_area_bands)
+    h = derived(
+        filter_sale_profile_segments,
+        derived(select_markets, market_index(hist_segments), [trend_city]),
+        selected_rooms,
+        selected_area_bands,
+    )
     if h.empty:
         render_empty_state("No profile-level history matches the current filters yet.")
         return
 
-    h["date"] = pd.to_datetime(h["date"], errors="coerce")
-    h["listings"] = pd.to_numeric(h["listings"], errors="coerce")
-    h["avg_price_eur"] = pd.to_numeric(h["avg_price_eur"], errors="coerce")
-    h["avg_per_m2_eur"] = pd.to_numeric(h["avg_per_m2_eur"], errors="coerce")
-    h = h.dropna(
-        subset=["date", "listings", "avg_price_eur", "avg_per_m2_eur"]
-    )
+    # Markets are rolled up once per profile; the rolling cutoff only slices
+    # their dates. The rollup skips rows without listings or prices.
+    plot = derived(build_sale_market_from_segments, h)
     history_cutoff = pd.Timestamp.now() - pd.Timedelta(HISTORY_WINDOW_DAYS, unit="D")
-    h = h[h["date"] >= history_cutoff]
-    if h.empty:
+    plot = plot[plot["date"] >= history_cutoff]
+    if plot.empty:
         render_empty_state("No profile-level history is available for the last 90 days.")
         return
 
-    plot = build_sale_market_from_segments(h)
     plot = plot[plot["listings"] >= min_listings]
     if plot.empty:
         render_empty_state("No profile-level history has enough listings yet.")
@@ -1896,86 +2070,17 @@ def render_profile_sales_trend(
         return
 
     top_sectors = (
-        plot.groupby("sector", dropna=False)["listings"]
+        plot.groupby("sector", dropna=False, observed=True)["listings"]
         .sum()
         .nlargest(8)
         .index
     )
-    plot = plot[plot["sector"].isin(top_sectors)].copy().sort_values("date")
+    plot = plot[plot["sector"].isin(top_sectors)].sort_values("date")
     if plot.empty:
         render_empty_state("No sectors have enough profile history to plot.")
         return
 
-    plot["sector"] = plot["sector"].fillna("Center").astype(str)
-    plot["PriceLabel"] = plot["avg_per_m2_eur"].map(format_number)
-    trend_colors = [
-        "#315fc9",
-        "#12805c",
-        "#c56b2c",
-        "#b84d4a",
-        "#7557b5",
-        "#0f8b8d",
-        "#6f8f3b",
-        "#a36b1c",
-    ]
-    color_map = {
-        sector: trend_colors[index % len(trend_colors)]
-        for index, sector in enumerate(plot["sector"].drop_duplicates())
-    }
-
-    fig = px.line(
-        plot,
-        x="date",
-        y="avg_per_m2_eur",
-        color="sector",
-        markers=False,
-        color_discrete_map=color_map,
-        custom_data=["PriceLabel"],
-        labels={"avg_per_m2_eur": "EUR per m2", "date": "Date", "sector": "Sector"},
-    )
-    fig.update_traces(
-        line_width=2.2,
-        hovertemplate=(
-            "<b>%{fullData.name}</b><br>"
-            "%{x|%d %b %Y}<br>"
-            "%{customdata[0]} EUR per m2<extra></extra>"
-        ),
-    )
-
-    last_points = plot.sort_values("date").groupby("sector", as_index=False).tail(1)
-    last_points = last_points.sort_values("avg_per_m2_eur")
-    for _, row in last_points.iterrows():
-        sector = row["sector"]
-        fig.add_scatter(
-            x=[row["date"]],
-            y=[row["avg_per_m2_eur"]],
-            mode="markers+text",
-            marker={"size": 6, "color": color_map.get(sector, THEME["muted"])},
-            text=[f"{sector} {format_number(row['avg_per_m2_eur'])}"],
-            textposition="middle right",
-            textfont={"size": 12, "color": THEME["chart_label"]},
-            hoverinfo="skip",
-            showlegend=False,
-            cliponaxis=False,
-        )
-
-    fig = apply_common_chart_style(fig, height=500, show_legend=False)
-    fig.update_layout(
-        hovermode="x unified",
-        margin={"l": 16, "r": 150, "t": 10, "b": 18},
-    )
-    fig.update_xaxes(
-        title_text="",
-        tickangle=0,
-        showgrid=False,
-        tickformat="%d %b",
-    )
-    fig.update_yaxes(
-        title_text="EUR per m2",
-        gridcolor=THEME["border"],
-        zeroline=False,
-    )
-
+    fig = cached_figure(build_sector_trend_figure, plot)
     with st.container(border=True):
         render_plotly_chart(fig)
 
@@ -2003,9 +2108,7 @@ def render_sector_table(
     numeric_cols = disp.select_dtypes(include="number").columns
     for col in numeric_cols:
         decimals = 1 if "per_m2" in col else 0
-        disp[col] = disp[col].map(
-            lambda value, decimals=decimals: format_number(value, decimals)
-        )
+        disp[col] = format_number_series(disp[col], decimals)
 
     disp = disp.rename(columns=label_map).rename(columns=compact_labels)
 
@@ -2044,6 +2147,108 @@ def render_sector_table(
     )
 
 
+def daily_occupancy_input() -> int:
+    """Occupancy slider shared by the Daily Rent and Insights fragments."""
+    daily_occupancy_percent = st.slider(
+        "Expected occupancy",
+        min_value=20,
+        max_value=90,
+        step=5,
+        format="%d%%",
+        key="daily_occupancy_percent",
+    )
+    st.caption("Applies to daily-rent yield and return comparisons.")
+    return daily_occupancy_percent
+
+
+@st.fragment
+def render_market_rankings(
+    df: pd.DataFrame,
+    price_col: str,
+    price_label: str,
+    color_scale: list[str],
+    high_color_scale: list[str],
+    price_decimals: int,
+) -> None:
+    market_lens = st.radio(
+        "Chart focus",
+        ["Prices", "Listings"],
+        horizontal=True,
+        key="market_lens",
+    )
+    if market_lens == "Listings":
+        render_listing_sections(df, color_scale)
+    else:
+        render_price_sections(
+            df,
+            price_col,
+            price_label,
+            color_scale,
+            high_color_scale,
+            price_decimals,
+        )
+
+
+@st.fragment
+def render_daily_rent_analysis(
+    df: pd.DataFrame,
+    price_col: str,
+    df_yield: pd.DataFrame,
+    df_rent: pd.DataFrame,
+    selected_cities: list[str],
+    min_listings: int,
+) -> None:
+    daily_occupancy_percent = daily_occupancy_input()
+    # Every slider step is precomputed once per snapshot; moving it is a lookup.
+    scenarios = derived(build_occupancy_scenarios, df_yield)
+    filtered_yield = derived(occupancy_scenario, scenarios, daily_occupancy_percent)
+    render_yield_chart(
+        filtered_yield,
+        "yield_daily_percent",
+        f"Daily rental yield at {daily_occupancy_percent}% occupancy",
+        "Indicative gross annual yield, before operating costs.",
+    )
+    # A nested fragment: chart focus reruns only the rankings, while the
+    # occupancy above still reaches the return scenarios below them.
+    render_market_rankings(
+        df,
+        price_col,
+        "Price per m2 (EUR/day)",
+        DAILY_COLOR_SCALE,
+        HIGH_DAILY_RENT_COLOR_SCALE,
+        1,
+    )
+    with st.expander("Return scenarios", icon=":material/analytics:"):
+        st.caption(
+            "Compare daily and monthly rent using the selected occupancy assumption."
+        )
+        render_daily_rent_context(filtered_yield, daily_occupancy_percent)
+        break_even_df = derived(
+            build_break_even_table, df_rent, selected_cities, min_listings
+        )
+        render_break_even_analysis(break_even_df)
+        render_daily_vs_monthly_return(
+            scenarios,
+            daily_occupancy_percent,
+            min_listings,
+        )
+        render_occupancy_sensitivity(scenarios, daily_occupancy_percent, min_listings)
+
+
+@st.fragment
+def render_investment_analysis(df_yield: pd.DataFrame, min_listings: int) -> None:
+    with st.expander("Investment analysis"):
+        daily_occupancy_percent = daily_occupancy_input()
+        scenarios = derived(build_occupancy_scenarios, df_yield)
+        yield_df = derived(occupancy_scenario, scenarios, daily_occupancy_percent)
+        render_yield_opportunity_notes(yield_df)
+        render_investment_shortlist(
+            yield_df,
+            min_listings,
+            daily_occupancy_percent,
+        )
+
+
 def render_daily_rent_context(
     df_yield: pd.DataFrame,
     daily_occupancy_percent: int,
@@ -2055,9 +2260,7 @@ def render_daily_rent_context(
 
     top_daily_yield = None
     if not df_yield.empty and "yield_daily_percent" in df_yield.columns:
-        top_daily_yield = pd.to_numeric(
-            df_yield["yield_daily_percent"], errors="coerce"
-        ).max()
+        top_daily_yield = as_numeric(df_yield["yield_daily_percent"]).max()
 
     st.markdown(
         f"""
@@ -2098,17 +2301,17 @@ def render_daily_rent_context(
 # =========================
 try:
     with st.spinner("Loading market data..."):
-        df_hist_sales = load_historical_data()
-        df_hist_sale_segments = load_historical_segment_data()
-        (
-            df_sales,
-            df_sale_segments,
-            df_sale_housing_types,
-            df_sale_conditions,
-            df_sale_floor_positions,
-            df_rent,
-            df_yield,
-        ) = load_data()
+        datasets, load_timings = load_dashboard_data()
+    load_status = snapshot_status()
+    df_hist_sales = datasets["history"]
+    df_hist_sale_segments = datasets["segment_history"]
+    df_sales = datasets["sales"]
+    df_sale_segments = datasets["sale_segments"]
+    df_sale_housing_types = datasets["sale_housing_types"]
+    df_sale_conditions = datasets["sale_conditions"]
+    df_sale_floor_positions = datasets["sale_floor_positions"]
+    df_rent = datasets["rent"]
+    df_yield = datasets["yield"]
 # Keep the dashboard readable if the upstream API or local cache fails.
 except Exception as exc:  # noqa: BLE001
     render_data_load_error(
@@ -2117,6 +2320,13 @@ except Exception as exc:  # noqa: BLE001
     )
     st.stop()
 
+# Derived frames are keyed by the identity of snapshot frames, so a new
+# snapshot starts an empty memo.
+if st.session_state.get("derived_frames", {}).get("snapshot") is not datasets:
+    st.session_state["derived_frames"] = new_transform_memo(datasets)
+for key, default in VIEW_INPUT_DEFAULTS.items():
+    st.session_state[key] = st.session_state.get(key, default)
+
 
 # =========================
 # Filter options
@@ -2143,6 +2353,13 @@ latest_snapshot = (
     f"Data as of {max(latest_dates):%d %B %Y}" if latest_dates else "No snapshot"
 )
 render_app_header(latest_snapshot)
+if load_status["last_error"] is not None:
+    render_stale_data_notice(
+        str(load_status["last_error"]),
+        show_details=os.environ.get("IMOBIL_DEBUG_ERRORS") == "1",
+    )
+if os.environ.get("IMOBIL_DEBUG_TIMINGS") == "1":
+    render_load_diagnostics(load_timings, datasets)
 
 filter_col, main_col = st.columns([1.25, 4.45], gap="large")
 
@@ -2186,7 +2403,9 @@ with filter_col, st.container(border=True):
         placeholder="All cities",
         key="filter_cities",
     )
-    profile_option_segments = filter_by_city(df_sale_segments, selected_cities)
+    profile_option_segments = select_markets(
+        market_index(df_sale_segments), selected_cities
+    )
     room_options = ordered_segment_options(
         profile_option_segments, "rooms_group", ROOM_GROUP_ORDER
     )
@@ -2220,14 +2439,7 @@ with filter_col, st.container(border=True):
         placeholder="All areas",
         key="filter_sale_area_bands",
     )
-    buyer_budget = st.number_input(
-        "Buyer budget, EUR",
-        min_value=10_000,
-        value=100_000,
-        step=5_000,
-        key="buyer_budget_eur",
-    )
-    st.caption("Rooms and area affect For Sale. Budget applies to Budget guide only.")
+    st.caption("Rooms and area affect For Sale only.")
     min_listings = st.number_input(
         "Min. listings",
         min_value=1,
@@ -2235,50 +2447,63 @@ with filter_col, st.container(border=True):
         step=1,
         key="filter_min_listings",
     )
-    st.markdown("**Daily rent assumption**")
-    daily_occupancy_percent = st.slider(
-        "Expected occupancy",
-        min_value=20,
-        max_value=90,
-        value=60,
-        step=5,
-        format="%d%%",
-        key="daily_occupancy_percent",
-    )
-    st.caption("Applies to daily-rent yield and return comparisons.")
-    market_lens = st.radio(
-        "Chart focus",
-        ["Prices", "Listings"],
-        horizontal=True,
-        key="market_lens",
-    )
-    st.caption("Applies to the main rankings in every tab.")
 
     selected_count = len(selected_cities) if selected_cities else len(all_cities)
     st.metric("Cities in view", f"{selected_count}/{len(all_cities)}")
     st.caption("Use presets for fast exploration or filters for a specific view.")
 
 with main_col:
-    tab_sale, tab_rent_monthly, tab_rent_daily, tab_insights = st.tabs(
-        ["For Sale", "Monthly Rent", "Daily Rent", "Insights"]
+    # Only the selected view is computed and sent to the browser. Switching
+    # views reruns the script, and the derived-frame memo keeps that cheap.
+    active_view = st.segmented_control(
+        "Dashboard view",
+        DASHBOARD_VIEWS,
+        default=DASHBOARD_VIEWS[0],
+        required=True,
+        key="view",
+        label_visibility="collapsed",
+        width="stretch",
+        bind="query-params",
     )
 
     # --------------------- 1. Sale ---------------------
-    with tab_sale:
+    if active_view == "For Sale":
         price_col = "avg_per_m2_eur"
         sale_profile_active = has_sale_profile_filters(
             selected_sale_rooms, selected_sale_area_bands
         )
-        city_sale_segments = filter_by_city(df_sale_segments, selected_cities)
-        profile_sale_segments = filter_sale_profile_segments(
-            city_sale_segments, selected_sale_rooms, selected_sale_area_bands
+        # Opt-in while api_sale_profile_rollup is rolled out; None falls back.
+        profile_rollup = (
+            load_sale_profile_rollup(
+                tuple(selected_cities),
+                tuple(selected_sale_rooms),
+                tuple(selected_sale_area_bands),
+                min_listings,
+                freshness=load_status["markers"],
+            )
+            if sale_profile_active
+            and os.environ.get("IMOBIL_SERVER_ROLLUPS") == "1"
+            else None
         )
-        if sale_profile_active:
-            df = build_sale_market_from_segments(profile_sale_segments)
-            df = filter_by_city_and_listings(df, [], min_listings)
+        if profile_rollup is None and sale_profile_active:
+            profile_rollup = derived(
+                query_segment_cube,
+                segment_cube(df_sale_segments),
+                selected_cities,
+                selected_sale_rooms,
+                selected_sale_area_bands,
+                min_listings,
+            )
+        if profile_rollup is not None:
+            df = profile_rollup["market"]
+            sale_segments = pd.DataFrame()
         else:
-            df = filter_by_city_and_listings(df_sales, selected_cities, min_listings)
-        sale_segments = filter_segments_to_market(profile_sale_segments, df)
+            df = derived(
+                select_markets, market_index(df_sales), selected_cities, min_listings
+            )
+            sale_segments = derived(
+                select_market_segments, market_index(df_sale_segments), df
+            )
 
         if df.empty:
             render_empty_state("No sale listings match the current filters.")
@@ -2292,7 +2517,9 @@ with main_col:
                     min_listings,
                 )
             else:
-                render_sales_trend(df_hist_sales, selected_cities)
+                render_sales_trend(
+                    df_hist_sales, selected_cities, freshness=load_status["markers"]
+                )
             render_tab_header(
                 df,
                 price_col,
@@ -2303,37 +2530,48 @@ with main_col:
                 ),
             )
             render_market_highlights(df, price_col, price_decimals=0)
-            if market_lens == "Listings":
-                render_listing_sections(df, SALE_COLOR_SCALE)
-            else:
-                render_price_sections(
-                    df,
-                    price_col,
-                    "Price per m2 (EUR)",
-                    SALE_COLOR_SCALE,
-                    HIGH_PRICE_COLOR_SCALE,
-                    0,
-                )
-            render_budget_guide(df, buyer_budget)
-            render_city_comparison(df)
+            render_market_rankings(
+                df,
+                price_col,
+                "Price per m2 (EUR)",
+                SALE_COLOR_SCALE,
+                HIGH_PRICE_COLOR_SCALE,
+                0,
+            )
+            render_budget_guide(df)
+            render_city_comparison(
+                df, profile_rollup["city"] if profile_rollup is not None else None
+            )
             with st.expander("Property characteristics", icon=":material/home:"):
                 st.caption(
                     "Compare housing type, finish, floor position, room count, and area."
                 )
-                housing_type_data = filter_by_city_and_listings(
-                    df_sale_housing_types, selected_cities, min_listings
+                housing_type_data = derived(
+                    select_markets,
+                    market_index(df_sale_housing_types),
+                    selected_cities,
+                    min_listings,
                 )
                 render_housing_type_comparison(housing_type_data)
-                condition_data = filter_by_city_and_listings(
-                    df_sale_conditions, selected_cities, min_listings
+                condition_data = derived(
+                    select_markets,
+                    market_index(df_sale_conditions),
+                    selected_cities,
+                    min_listings,
                 )
                 render_condition_comparison(condition_data)
-                floor_position_data = filter_by_city_and_listings(
-                    df_sale_floor_positions, selected_cities, min_listings
+                floor_position_data = derived(
+                    select_markets,
+                    market_index(df_sale_floor_positions),
+                    selected_cities,
+                    min_listings,
                 )
                 render_floor_position_comparison(floor_position_data)
                 render_sale_segments(
-                    sale_segments, selected_sale_rooms, selected_sale_area_bands
+                    sale_segments,
+                    selected_sale_rooms,
+                    selected_sale_area_bands,
+                    profile_rollup,
                 )
             render_sector_table(
                 df,
@@ -2349,12 +2587,17 @@ with main_col:
             )
 
     # --------------------- 2. Monthly Rental ---------------------
-    with tab_rent_monthly:
+    elif active_view == "Monthly Rent":
         price_col = "avg_price_per_m2_eur"
-        df = df_rent[df_rent["deal_type"] == MONTHLY_RENT_DEAL].copy()
-        df = filter_by_city_and_listings(df, selected_cities, min_listings)
-        filtered_yield = filter_by_city_and_listings(
-            df_yield, selected_cities, min_listings
+        df = derived(
+            select_markets,
+            market_index(df_rent),
+            selected_cities,
+            min_listings,
+            MONTHLY_RENT_DEAL,
+        )
+        filtered_yield = derived(
+            select_markets, market_index(df_yield), selected_cities, min_listings
         )
 
         if render_tab_header(
@@ -2367,17 +2610,14 @@ with main_col:
             render_market_highlights(
                 df, price_col, price_decimals=1, price_suffix="/month"
             )
-            if market_lens == "Listings":
-                render_listing_sections(df, RENT_COLOR_SCALE)
-            else:
-                render_price_sections(
-                    df,
-                    price_col,
-                    "Price per m2 (EUR/month)",
-                    RENT_COLOR_SCALE,
-                    DAILY_COLOR_SCALE,
-                    1,
-                )
+            render_market_rankings(
+                df,
+                price_col,
+                "Price per m2 (EUR/month)",
+                RENT_COLOR_SCALE,
+                DAILY_COLOR_SCALE,
+                1,
+            )
             render_yield_chart(
                 filtered_yield,
                 "yield_monthly_percent",
@@ -2386,13 +2626,17 @@ with main_col:
             )
 
     # --------------------- 3. Daily Rental ---------------------
-    with tab_rent_daily:
+    elif active_view == "Daily Rent":
         price_col = "avg_price_per_m2_eur"
-        df = df_rent[df_rent["deal_type"] == DAILY_RENT_DEAL].copy()
-        df = filter_by_city_and_listings(df, selected_cities, min_listings)
-        filtered_yield = apply_daily_occupancy_assumption(
-            filter_by_city_and_listings(df_yield, selected_cities, min_listings),
-            daily_occupancy_percent,
+        df = derived(
+            select_markets,
+            market_index(df_rent),
+            selected_cities,
+            min_listings,
+            DAILY_RENT_DEAL,
+        )
+        filtered_yield = derived(
+            select_markets, market_index(df_yield), selected_cities, min_listings
         )
 
         if render_tab_header(
@@ -2405,46 +2649,17 @@ with main_col:
             render_market_highlights(
                 df, price_col, price_decimals=1, price_suffix="/day"
             )
-            render_yield_chart(
-                filtered_yield,
-                "yield_daily_percent",
-                f"Daily rental yield at {daily_occupancy_percent}% occupancy",
-                "Indicative gross annual yield, before operating costs.",
+            render_daily_rent_analysis(
+                df, price_col, filtered_yield, df_rent, selected_cities, min_listings
             )
-            if market_lens == "Listings":
-                render_listing_sections(df, DAILY_COLOR_SCALE)
-            else:
-                render_price_sections(
-                    df,
-                    price_col,
-                    "Price per m2 (EUR/day)",
-                    DAILY_COLOR_SCALE,
-                    HIGH_DAILY_RENT_COLOR_SCALE,
-                    1,
-                )
-            with st.expander("Return scenarios", icon=":material/analytics:"):
-                st.caption(
-                    "Compare daily and monthly rent using the selected occupancy assumption."
-                )
-                render_daily_rent_context(filtered_yield, daily_occupancy_percent)
-                break_even_df = build_break_even_table(
-                    df_rent, selected_cities, min_listings
-                )
-                render_break_even_analysis(break_even_df)
-                render_daily_vs_monthly_return(
-                    filtered_yield,
-                    daily_occupancy_percent,
-                    min_listings,
-                )
 
     # --------------------- 4. Insights ---------------------
-    with tab_insights:
-        sale_df = filter_by_city_and_listings(
-            df_sales, selected_cities, min_listings
+    elif active_view == "Insights":
+        sale_df = derived(
+            select_markets, market_index(df_sales), selected_cities, min_listings
         )
-        yield_df = apply_daily_occupancy_assumption(
-            filter_by_city_and_listings(df_yield, selected_cities, min_listings),
-            daily_occupancy_percent,
+        yield_df = derived(
+            select_markets, market_index(df_yield), selected_cities, min_listings
         )
         if sale_df.empty and yield_df.empty:
             render_empty_state(
@@ -2455,13 +2670,7 @@ with main_col:
             render_decision_notes(sale_df, "avg_per_m2_eur", price_decimals=0)
             render_outside_chisinau_radar(sale_df)
             if not yield_df.empty:
-                with st.expander("Investment analysis"):
-                    render_yield_opportunity_notes(yield_df)
-                    render_investment_shortlist(
-                        yield_df,
-                        min_listings,
-                        daily_occupancy_percent,
-                    )
+                render_investment_analysis(yield_df, min_listings)
 
 
 # =========================
@@ -0,0 +1,84 @@
+import json
+import os
+from datetime import UTC, datetime
+from pathlib import Path
+
+import pandas as pd
+
+SNAPSHOT_CACHE_DIR = Path(
+    os.environ.get("IMOBIL_CACHE_DIR")
+    or Path(__file__).resolve().parent / ".cache" / "snapshots"
+)
+MANIFEST_FILE = "manifest.json"
+MARKER_COLUMNS = ("refreshed_at", "date")
+
+
+def snapshot_marker(df: pd.DataFrame) -> str | None:
+    """Identify a loaded table by its latest refresh timestamp or snapshot date."""
+    for column in MARKER_COLUMNS:
+        if df.empty or column not in df.columns:
+            continue
+        values = df[column].dropna()
+        if not values.empty:
+            return str(values.astype(str).max())
+    return None
+
+
+def snapshot_markers(datasets: dict[str, pd.DataFrame]) -> dict[str, str | None]:
+    return {name: snapshot_marker(df) for name, df in datasets.items()}
+
+
+def write_snapshot_cache(
+    datasets: dict[str, pd.DataFrame],
+    extra: dict | None = None,
+    cache_dir: Path | None = None,
+) -> None:
+    """
+    Writes each dataset to its own Parquet file and records the snapshot
+    markers in a manifest. Files are replaced atomically, so a reader never
+    sees a half-written table.
+    """
+    cache_dir = cache_dir or SNAPSHOT_CACHE_DIR
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tables = {}
+    for name, df in datasets.items():
+        path = cache_dir / f"{name}.parquet"
+        temp_path = path.with_name(f"{path.name}.tmp")
+        df.to_parquet(temp_path, index=False)
+        os.replace(temp_path, path)
+        tables[name] = {
+            "marker": snapshot_marker(df),
+            "rows": len(df),
+            "memory_bytes": int(df.memory_usage(deep=True).sum()),
+        }
+
+    manifest = {
+        "written_at": datetime.now(UTC).isoformat(timespec="seconds"),
+        "tables": tables,
+        **(extra or {}),
+    }
+    manifest_path = cache_dir / MANIFEST_FILE
+    temp_path = manifest_path.with_name(f"{manifest_path.name}.tmp")
+    temp_path.write_text(json.dumps(manifest, ensure_ascii=False), encoding="utf-8")
+    os.replace(temp_path, manifest_path)
+
+
+def read_snapshot_cache(
+    names: list[str] | tuple[str, ...],
+    cache_dir: Path | None = None,
+) -> tuple[dict[str, pd.DataFrame], dict] | None:
+    """Returns every named dataset and the manifest, or None on any cache miss."""
+    cache_dir = cache_dir or SNAPSHOT_CACHE_DIR
+    manifest_path = cache_dir / MANIFEST_FILE
+    if not manifest_path.exists():
+        return None
+    try:
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        if not set(names).issubset(manifest.get("tables", {})):
+            return None
+        datasets = {
+            name: pd.read_parquet(cache_dir / f"{name}.parquet") for name in names
+        }
+    except (OSError, ValueError):
+        return None
+    return datasets, manifest
@@ -1,22 +1,90 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+
 import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
 import streamlit as st
 
-from dashboard_components import format_number, render_empty_state, render_section
-from dashboard_theme import CHART_NEUTRAL, PLOTLY_FONT_FAMILY, THEME
-from dashboard_transforms import sector_label
+from dashboard_components import (
+    format_number_series,
+    render_empty_state,
+    render_section,
+)
+from dashboard_theme import CHART_NEUTRAL, PLOTLY_FONT_FAMILY, THEME, TREND_COLORS
+from dashboard_transforms import lttb_indices, memo_key, sector_label, sector_names
 
 PLOTLY_CHART_CONFIG = {
     "displayModeBar": False,
     "displaylogo": False,
     "responsive": True,
 }
+# Built figures kept for reuse across reruns and sessions.
+FIGURE_CACHE_MAX_ENTRIES = 256
+# Trend histories longer than this many rows are drawn with WebGL line traces,
+# each downsampled to at most TREND_MAX_POINTS_PER_SECTOR points.
+TREND_WEBGL_MIN_ROWS = 5_000
+TREND_MAX_POINTS_PER_SECTOR = 500
+# Trends spanning more days than this label their ticks by month and year.
+TREND_MONTH_TICKS_MIN_DAYS = 120
 
 
 def render_plotly_chart(fig) -> None:
     st.plotly_chart(fig, width="stretch", config=PLOTLY_CHART_CONFIG)
 
 
+def new_figure_cache() -> dict:
+    return {"lock": threading.Lock(), "figures": OrderedDict()}
+
+
+@st.cache_resource
+def get_figure_cache() -> dict:
+    """Process-wide figure cache, shared by every session."""
+    return new_figure_cache()
+
+
+def frame_fingerprint(df: pd.DataFrame) -> str:
+    """Content hash of a plotted slice: column names, dtypes, and values."""
+    digest = hashlib.blake2b(repr(df.dtypes.to_dict()).encode(), digest_size=16)
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def cached_figure(
+    build: Callable,
+    data: pd.DataFrame,
+    *params,
+    cache: dict | None = None,
+    max_entries: int = FIGURE_CACHE_MAX_ENTRIES,
+):
+    """
+    Returns `build(data, *params)` from an LRU keyed by a content hash of the
+    plotted slice and the style parameters. Cached figures are shared between
+    sessions and must not be modified after they are built.
+    """
+    cache = cache if cache is not None else get_figure_cache()
+    key = (
+        build.__module__,
+        build.__qualname__,
+        frame_fingerprint(data),
+        memo_key(params),
+    )
+    figures = cache["figures"]
+    with cache["lock"]:
+        if key in figures:
+            figures.move_to_end(key)
+            return figures[key]
+
+    fig = build(data, *params)
+    with cache["lock"]:
+        figures[key] = fig
+        while len(figures) > max_entries:
+            figures.popitem(last=False)
+    return fig
+
+
 def apply_common_chart_style(fig, height: int = 430, show_legend: bool = False):
     fig.update_layout(
         height=height,
@@ -60,17 +128,16 @@ def apply_common_chart_style(fig, height: int = 430, show_legend: bool = False):
     return fig
 
 
-def format_chart_hover_value(value: float, y_label: str, digits: int) -> str:
-    formatted = format_number(value, digits)
+def chart_hover_unit(y_label: str) -> str:
     if y_label == "Listings":
-        return f"{formatted} listings"
+        return " listings"
     if "month" in y_label:
-        return f"{formatted} EUR/m2/month"
+        return " EUR/m2/month"
     if "day" in y_label:
-        return f"{formatted} EUR/m2/day"
+        return " EUR/m2/day"
     if "EUR" in y_label:
-        return f"{formatted} EUR/m2"
-    return formatted
+        return " EUR/m2"
+    return ""
 
 
 def render_ranked_bars(
@@ -93,19 +160,32 @@ def render_ranked_bars(
         return
 
     top = (
-        df.nsmallest(10, price_col).copy()
-        if mode == "lowest"
-        else df.nlargest(10, price_col).copy()
+        df.nsmallest(10, price_col) if mode == "lowest" else df.nlargest(10, price_col)
+    )
+    accent_color = color_scale[1] if mode == "lowest" else color_scale[-1]
+    fig = cached_figure(
+        build_ranked_bar_figure, top, price_col, y_label, accent_color, mode, digits
     )
+
+    with st.container(border=True):
+        render_plotly_chart(fig)
+
+
+def build_ranked_bar_figure(
+    top: pd.DataFrame,
+    price_col: str,
+    y_label: str,
+    accent_color: str,
+    mode: str,
+    digits: int,
+):
+    top = top.copy()
     top["Sector"] = sector_label(top)
     top["ChartLabel"] = top["Sector"].str.replace(" -> ", " - ", regex=False)
     top = top.sort_values(price_col, ascending=True)
-    top["Label"] = top[price_col].map(lambda value: format_number(value, digits))
-    top["HoverValue"] = top[price_col].map(
-        lambda value: format_chart_hover_value(value, y_label, digits)
-    )
+    top["Label"] = format_number_series(top[price_col], digits)
+    top["HoverValue"] = top["Label"] + chart_hover_unit(y_label)
 
-    accent_color = color_scale[1] if mode == "lowest" else color_scale[-1]
     colors = [CHART_NEUTRAL] * len(top)
     if colors:
         colors[0 if mode == "lowest" else -1] = accent_color
@@ -142,9 +222,95 @@ def render_ranked_bars(
         automargin=True,
         title_text="",
     )
+    return fig
 
-    with st.container(border=True):
-        render_plotly_chart(fig)
+
+def build_sector_trend_figure(plot: pd.DataFrame):
+    """
+    Price lines per sector, plus one marker-and-text trace that labels the
+    last point of every line. Large histories switch to WebGL lines with
+    LTTB-downsampled points; the end labels always use the full data.
+    """
+    large = len(plot) > TREND_WEBGL_MIN_ROWS
+    line_trace = go.Scattergl if large else go.Scatter
+    sectors = sector_names(plot["sector"])
+    prices = plot["avg_per_m2_eur"]
+    price_labels = format_number_series(prices)
+    color_map = {
+        sector: TREND_COLORS[index % len(TREND_COLORS)]
+        for index, sector in enumerate(sectors.drop_duplicates())
+    }
+
+    positions = sectors.groupby(sectors, sort=False).indices
+    fig = go.Figure()
+    for sector, color in color_map.items():
+        rows = positions[sector]
+        if large:
+            rows = rows[plot["date"].iloc[rows].to_numpy().argsort(kind="stable")]
+            rows = rows[
+                lttb_indices(
+                    plot["date"].iloc[rows].to_numpy().astype("int64"),
+                    prices.iloc[rows].to_numpy(),
+                    TREND_MAX_POINTS_PER_SECTOR,
+                )
+            ]
+        fig.add_trace(
+            line_trace(
+                x=plot["date"].iloc[rows],
+                y=prices.iloc[rows],
+                customdata=price_labels.iloc[rows].to_numpy().reshape(-1, 1),
+                mode="lines",
+                name=sector,
+                line={"color": color, "width": 2.2},
+                hovertemplate=(
+                    "<b>%{fullData.name}</b><br>"
+                    "%{x|%d %b %Y}<br>"
+                    "%{customdata[0]} EUR per m2<extra></extra>"
+                ),
+            )
+        )
+
+    last_rows = plot.assign(sector=sectors).sort_values("date").groupby("sector")
+    last_points = last_rows.tail(1).sort_values("avg_per_m2_eur")
+    fig.add_trace(
+        go.Scatter(
+            x=last_points["date"],
+            y=last_points["avg_per_m2_eur"],
+            mode="markers+text",
+            marker={"size": 6, "color": last_points["sector"].map(color_map)},
+            text=(
+                last_points["sector"]
+                + " "
+                + format_number_series(last_points["avg_per_m2_eur"])
+            ),
+            textposition="middle right",
+            textfont={"size": 12, "color": THEME["chart_label"]},
+            hoverinfo="skip",
+            showlegend=False,
+            cliponaxis=False,
+        )
+    )
+
+    fig = apply_common_chart_style(fig, height=500, show_legend=False)
+    fig.update_layout(
+        hovermode="x unified",
+        margin={"l": 16, "r": 150, "t": 10, "b": 18},
+    )
+    span = plot["date"].max() - plot["date"].min()
+    fig.update_xaxes(
+        title_text="",
+        tickangle=0,
+        showgrid=False,
+        tickformat=(
+            "%b %Y" if span > pd.Timedelta(days=TREND_MONTH_TICKS_MIN_DAYS) else "%d %b"
+        ),
+    )
+    fig.update_yaxes(
+        title_text="EUR per m2",
+        gridcolor=THEME["border"],
+        zeroline=False,
+    )
+    return fig
 
 
 def render_price_sections(
@@ -1,7 +1,14 @@
 from html import escape
 
+import numpy as np
+import pandas as pd
 import streamlit as st
 
+# Above this, format_number_series falls back to per-value formatting.
+MAX_VECTORIZED_DECIMALS = 3
+# Scaled magnitudes above this are no longer exact integers in float64.
+EXACT_FLOAT_INTEGER_LIMIT = 2**53
+
 
 def format_number(value: float, decimals: int = 0) -> str:
     """Format visible numbers with Moldova-style separators."""
@@ -21,6 +28,73 @@ def format_percent(value: float, decimals: int = 1) -> str:
     return f"{format_number(value, decimals)}%"
 
 
+def digit_groups(width: int, prefix: str = "") -> np.ndarray:
+    """Lookup text for 0..999, or for 0..10**width-1 zero-padded to `width`."""
+    if width == 0:
+        return np.array([f"{prefix}{number}" for number in range(1000)], dtype=object)
+    return np.array(
+        [f"{prefix}{number:0{width}d}" for number in range(10**width)], dtype=object
+    )
+
+
+LEADING_GROUPS = digit_groups(0)
+THOUSANDS_GROUPS = digit_groups(3, prefix=".")
+DECIMAL_GROUPS = {
+    decimals: digit_groups(decimals, prefix=",")
+    for decimals in range(1, MAX_VECTORIZED_DECIMALS + 1)
+}
+
+
+def format_number_series(values: pd.Series, decimals: int = 0) -> pd.Series:
+    """
+    `format_number` for a whole Series at once, assembled from lookup tables
+    of three-digit groups. Values that are not finite, or whose scaled
+    magnitude is an exact rounding tie, go through the scalar version, so both
+    give the same text for every value.
+    """
+    if decimals > MAX_VECTORIZED_DECIMALS:
+        return values.map(lambda value: format_number(value, decimals))
+
+    numbers = values.to_numpy(dtype="float64", na_value=np.nan)
+    with np.errstate(invalid="ignore"):
+        scaled = np.abs(numbers) * 10**decimals
+        vectorized = (
+            np.isfinite(scaled)
+            & (scaled < EXACT_FLOAT_INTEGER_LIMIT)
+            & (scaled - np.floor(scaled) != 0.5)
+        )
+    units = np.rint(np.where(vectorized, scaled, 0)).astype(np.int64)
+    whole, fraction = np.divmod(units, 10**decimals)
+
+    # Build the integer part right to left, one group per pass. Groups with
+    # more digits to their left are zero-padded and carry the separator.
+    text = LEADING_GROUPS[whole % 1000]
+    rest = whole // 1000
+    longer = np.flatnonzero(rest)
+    text[longer] = THOUSANDS_GROUPS[whole[longer] % 1000]
+    while longer.size:
+        groups = rest[longer] % 1000
+        rest[longer] //= 1000
+        has_more = rest[longer] > 0
+        text[longer] = (
+            np.where(has_more, THOUSANDS_GROUPS[groups], LEADING_GROUPS[groups])
+            + text[longer]
+        )
+        longer = longer[has_more]
+    if decimals:
+        text = text + DECIMAL_GROUPS[decimals][fraction]
+    negative = np.flatnonzero(np.signbit(numbers))
+    text[negative] = "-" + text[negative]
+    if not vectorized.all():
+        fallback = np.flatnonzero(~vectorized)
+        text[fallback] = [format_number(value, decimals) for value in numbers[fallback]]
+    return pd.Series(text, index=values.index, dtype=object)
+
+
+def format_percent_series(values: pd.Series, decimals: int = 1) -> pd.Series:
+    return format_number_series(values, decimals) + "%"
+
+
 def render_section(title: str, caption: str | None = None) -> None:
     caption_html = f'<p class="section-caption">{caption}</p>' if caption else ""
     st.markdown(
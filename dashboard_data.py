@@ -1,10 +1,33 @@
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterable, Mapping
+from concurrent.futures import ThreadPoolExecutor
 from datetime import UTC, datetime, timedelta
 
 import pandas as pd
 import streamlit as st
 from supabase import create_client
 
+from dashboard_cache import read_snapshot_cache, snapshot_markers, write_snapshot_cache
+from dashboard_transforms import (
+    HISTORY_GRAIN_PERIODS,
+    advance_rolling_index,
+    build_market_index,
+    build_segment_cube,
+    new_rolling_index,
+    rolling_index_frame,
+    rollup_history,
+    trim_rolling_index,
+)
+
 HISTORY_WINDOW_DAYS = 90
+ESTATE_CURRENT_COLUMNS = "date,city,sector,listings,avg_price_eur,avg_per_m2_eur"
+RENT_CURRENT_COLUMNS = "date,city,sector,deal_type,listings,avg_price_per_m2_eur"
+RENT_YIELD_COLUMNS = (
+    "city,sector,yield_monthly_percent,yield_daily_percent,annual_rent_monthly,"
+    "annual_rent_daily_60pct,avg_sale_price_eur,total_rent_listings,sale_listings"
+)
 HISTORY_SALE_COLUMNS = "date,city,sector,listings,avg_per_m2_eur"
 HISTORY_SALE_SEGMENT_COLUMNS = (
     "date,city,sector,rooms_group,area_band,listings,avg_price_eur,avg_per_m2_eur"
@@ -22,123 +45,1071 @@ ESTATE_FLOOR_POSITION_COLUMNS = (
     "date,city,sector,floor_position,listings,avg_price_eur,median_price_eur,avg_per_m2_eur"
 )
 
+# Final dtypes for the columns shared by the table contracts. Loads convert
+# once, so the transforms and charts can skip per-rerun coercion.
+DATE_COLUMNS = ("date",)
+COUNT_COLUMNS = ("listings", "sale_listings", "total_rent_listings")
+MEASURE_COLUMNS = (
+    "avg_price_eur",
+    "median_price_eur",
+    "avg_per_m2_eur",
+    "avg_price_per_m2_eur",
+    "median_price_per_m2_eur",
+    "avg_area_m2",
+    "yield_monthly_percent",
+    "yield_daily_percent",
+    "annual_rent_monthly",
+    "annual_rent_daily_60pct",
+    "avg_sale_price_eur",
+)
+CATEGORY_COLUMNS = (
+    "municipality",
+    "city",
+    "sector",
+    "rooms_group",
+    "area_band",
+    "housing_type",
+    "condition_group",
+    "floor_position",
+    "deal_type",
+)
+
+# Dataset name, public table, selected columns. Every current table is required.
+CURRENT_TABLES = (
+    ("sales", "api_estate_current", ESTATE_CURRENT_COLUMNS),
+    ("sale_segments", "api_estate_segments_current", ESTATE_SEGMENT_COLUMNS),
+    (
+        "sale_housing_types",
+        "api_estate_housing_type_current",
+        ESTATE_HOUSING_TYPE_COLUMNS,
+    ),
+    ("sale_conditions", "api_estate_condition_current", ESTATE_CONDITION_COLUMNS),
+    (
+        "sale_floor_positions",
+        "api_estate_floor_position_current",
+        ESTATE_FLOOR_POSITION_COLUMNS,
+    ),
+    ("rent", "api_rent_current", RENT_CURRENT_COLUMNS),
+    ("yield", "api_rent_yield", RENT_YIELD_COLUMNS),
+)
+HISTORY_TABLES = (
+    ("history", "api_estate_daily", HISTORY_SALE_COLUMNS),
+    ("segment_history", "api_estate_segments_daily", HISTORY_SALE_SEGMENT_COLUMNS),
+)
+# Primary keys of the paginated daily tables; pages continue after the last key.
+TABLE_KEY_COLUMNS = {
+    "api_estate_daily": ("date", "municipality", "city", "sector"),
+    "api_estate_segments_daily": (
+        "date",
+        "municipality",
+        "city",
+        "sector",
+        "rooms_group",
+        "area_band",
+    ),
+}
+# Supabase caps a response at 1000 rows by default, so pages never grow past it.
+PAGE_SIZE_MAX = 1000
+PAGE_SIZE_MIN = 250
+PAGE_TARGET_SECONDS = 1.0
+PAGE_FETCH_MAX_WORKERS = 4
+# Profile history is optional while the daily segment table is rolled out.
+OPTIONAL_DATASETS = frozenset({"segment_history"})
+LOADER_MAX_WORKERS = 6
+DATASET_NAMES = tuple(name for name, _, _ in (*CURRENT_TABLES, *HISTORY_TABLES))
+# Every public table stamps `refreshed_at` when the gold refresh rewrites it.
+FRESHNESS_COLUMN = "refreshed_at"
+FRESHNESS_PROBE_SECONDS = 60
+# Upper bound on snapshot age when the freshness probe cannot be read.
+SNAPSHOT_MAX_AGE_SECONDS = 3600
+SNAPSHOT_RETRY_SECONDS = 60
+# Server-side sale-profile rollups; see sql/add_sale_profile_rollup_rpc.sql.
+SALE_PROFILE_ROLLUP_FUNCTION = "api_sale_profile_rollup"
+SALE_PROFILE_ROLLUP_COLUMNS = (
+    "level",
+    "date",
+    "city",
+    "sector",
+    "group_value",
+    "listings",
+    "avg_price_eur",
+    "avg_per_m2_eur",
+)
+# Server-side weekly/monthly sale history; see sql/add_estate_history_rollup_rpc.sql.
+HISTORY_ROLLUP_FUNCTION = "api_estate_history_rollup"
+# Rollup tiers beyond the snapshot's daily rows, finest first: grain and days
+# of history it covers. A trend window reads the finest tier that covers it,
+# so one sector line stays near 50-90 points from 90 days of daily rows to
+# five years of monthly rows.
+HISTORY_TIERS = (("week", 366), ("month", 5 * 366))
+# Rollup level -> output columns, shaped like the matching pandas builder.
+SALE_PROFILE_ROLLUP_LEVELS = {
+    "market": ("date", "city", "sector", "listings", "avg_price_eur", "avg_per_m2_eur"),
+    "rooms_group": ("rooms_group", "listings", "avg_per_m2_eur"),
+    "area_band": ("area_band", "listings", "avg_per_m2_eur"),
+    "city": ("city", "listings", "avg_price_eur", "avg_per_m2_eur"),
+}
+
 
 @st.cache_resource
 def get_supabase_client():
     return create_client(st.secrets["SUPABASE_URL"], st.secrets["SUPABASE_KEY"])
 
 
-def fetch_paginated_rows(
+def quote_filter_value(value) -> str:
+    text = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{text}"'
+
+
+def keyset_filter(key_columns: tuple[str, ...], last_row: dict) -> str:
+    """PostgREST `or` filter for rows strictly after `last_row` in key order."""
+    clauses = []
+    for index, column in enumerate(key_columns):
+        parts = [
+            f"{previous}.eq.{quote_filter_value(last_row[previous])}"
+            for previous in key_columns[:index]
+        ]
+        parts.append(f"{column}.gt.{quote_filter_value(last_row[column])}")
+        clauses.append(parts[0] if len(parts) == 1 else f"and({','.join(parts)})")
+    return ",".join(clauses)
+
+
+def next_page_size(page_size: int, seconds: float) -> int:
+    """Halves the page after a slow response and doubles it after a fast one."""
+    if seconds > PAGE_TARGET_SECONDS:
+        return max(PAGE_SIZE_MIN, page_size // 2)
+    if seconds < PAGE_TARGET_SECONDS / 4:
+        return min(PAGE_SIZE_MAX, page_size * 2)
+    return page_size
+
+
+def ordered_page_query(
+    supabase,
+    table_name: str,
+    columns: str,
+    cutoff: str,
+    key_columns: tuple[str, ...],
+    count: str | None = None,
+    cities: tuple[str, ...] = (),
+):
+    query = supabase.table(table_name).select(columns, count=count)
+    query = query.gte("date", cutoff)
+    if cities:
+        query = query.in_("city", list(cities))
+    for column in key_columns:
+        query = query.order(column)
+    return query
+
+
+def fetch_keyset_rows(
     table_name: str,
     columns: str,
     cutoff: str,
-    page_size: int = 1000,
+    key_columns: tuple[str, ...],
+    page_size: int = PAGE_SIZE_MAX,
+    supabase=None,
+    cities: tuple[str, ...] = (),
 ) -> list[dict]:
-    supabase = get_supabase_client()
+    """
+    Walks pages one at a time, each starting strictly after the previous
+    page's last primary key, so a refresh mid-scan cannot skip or repeat rows.
+    """
+    supabase = supabase or get_supabase_client()
     rows = []
-    offset = 0
-
+    last_row = None
     while True:
-        resp = (
-            supabase.table(table_name)
-            .select(columns)
-            .gte("date", cutoff)
-            .range(offset, offset + page_size - 1)
-            .order("date", desc=False)
-            .execute()
+        query = ordered_page_query(
+            supabase, table_name, columns, cutoff, key_columns, cities=cities
         )
+        if last_row is not None:
+            query = query.or_(keyset_filter(key_columns, last_row))
 
-        batch = resp.data
+        started = time.perf_counter()
+        batch = query.limit(page_size).execute().data
         if not batch:
             break
         rows.extend(batch)
         if len(batch) < page_size:
             break
-        offset += page_size
-
+        last_row = batch[-1]
+        page_size = next_page_size(page_size, time.perf_counter() - started)
     return rows
 
 
-@st.cache_data(ttl=3600)
-def load_historical_data() -> pd.DataFrame:
+def fetch_counted_rows(
+    table_name: str,
+    columns: str,
+    cutoff: str,
+    key_columns: tuple[str, ...],
+    page_size: int = PAGE_SIZE_MAX,
+    supabase=None,
+    max_workers: int = PAGE_FETCH_MAX_WORKERS,
+    cities: tuple[str, ...] = (),
+) -> list[dict] | None:
     """
-    Loads only the last HISTORY_WINDOW_DAYS of sale history, filtered at the
-    database level, since that's all the 90-day trend chart uses.
+    Reads the first page with `count="exact"`, then fetches the remaining
+    known ranges concurrently and joins them in key order. Returns None when
+    the pages do not add up to one consistent scan, for example because a
+    refresh landed mid-fetch or the server capped the page size.
     """
-    cutoff = (datetime.now(UTC) - timedelta(days=HISTORY_WINDOW_DAYS)).strftime(
-        "%Y-%m-%d"
+    supabase = supabase or get_supabase_client()
+    first = (
+        ordered_page_query(
+            supabase,
+            table_name,
+            columns,
+            cutoff,
+            key_columns,
+            count="exact",
+            cities=cities,
+        )
+        .range(0, page_size - 1)
+        .execute()
     )
-    return pd.DataFrame(
-        fetch_paginated_rows("api_estate_daily", HISTORY_SALE_COLUMNS, cutoff)
+    total = first.count
+    if total is None or len(first.data) != min(total, page_size):
+        return None
+
+    ranges = [
+        (start, min(start + page_size, total) - 1)
+        for start in range(page_size, total, page_size)
+    ]
+    if not ranges:
+        return first.data
+
+    def fetch_range(bounds: tuple[int, int]) -> list[dict]:
+        query = ordered_page_query(
+            supabase, table_name, columns, cutoff, key_columns, cities=cities
+        )
+        return query.range(*bounds).execute().data
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(ranges)))) as pool:
+        pages = list(pool.map(fetch_range, ranges))
+
+    if any(len(page) != end - start + 1 for (start, end), page in zip(ranges, pages)):
+        return None
+    rows = [*first.data, *(row for page in pages for row in page)]
+    keys = {tuple(row[column] for column in key_columns) for row in rows}
+    return rows if len(keys) == total else None
+
+
+def fetch_paginated_rows(
+    table_name: str,
+    columns: str,
+    cutoff: str,
+    page_size: int = PAGE_SIZE_MAX,
+    supabase=None,
+    key_columns: tuple[str, ...] | None = None,
+    cities: tuple[str, ...] = (),
+) -> list[dict]:
+    """
+    Reads every row dated `cutoff` or later, only in `cities` when any are
+    given. The row count is known after the first page, so the remaining
+    pages are fetched in parallel; if that scan is inconsistent, the rows are
+    re-read with the keyset paginator. Key columns that were not requested
+    are fetched for ordering and dropped from the result.
+    """
+    supabase = supabase or get_supabase_client()
+    key_columns = key_columns or TABLE_KEY_COLUMNS[table_name]
+    extra_columns = []
+    if columns != "*":
+        requested = columns.split(",")
+        extra_columns = [column for column in key_columns if column not in requested]
+        columns = ",".join([*requested, *extra_columns])
+
+    rows = fetch_counted_rows(
+        table_name, columns, cutoff, key_columns, page_size, supabase, cities=cities
     )
+    if rows is None:
+        rows = fetch_keyset_rows(
+            table_name, columns, cutoff, key_columns, page_size, supabase, cities
+        )
+
+    for row in rows:
+        for column in extra_columns:
+            row.pop(column, None)
+    return rows
+
+
+def fetch_table_rows(table_name: str, columns: str, supabase=None) -> list[dict]:
+    supabase = supabase or get_supabase_client()
+    return supabase.table(table_name).select(columns).execute().data
+
+
+def normalize_count(values: pd.Series) -> pd.Series:
+    values = pd.to_numeric(values, errors="coerce")
+    # Counts with gaps or fractions stay float64 so NaN still means missing.
+    if values.isna().any() or not (values % 1 == 0).all():
+        return values.astype("float64")
+    return values.astype("int32")
+
+
+def normalize_frame(
+    df: pd.DataFrame,
+    categories: Mapping[str, list] | None = None,
+) -> pd.DataFrame:
+    """
+    Converts the known columns to their final dtypes: datetime64 dates, int32
+    counts, float64 measures and categorical labels. A label column listed in
+    `categories` gets exactly that category set. Columns that already have
+    their final dtype are left alone, so normalizing twice is cheap.
+    """
+    if df.empty:
+        return df
+
+    converted = {}
+    for column in df.columns:
+        values = df[column]
+        if column in DATE_COLUMNS and not pd.api.types.is_datetime64_any_dtype(
+            values
+        ):
+            converted[column] = pd.to_datetime(values, errors="coerce")
+        elif column in COUNT_COLUMNS and values.dtype != "int32":
+            counts = normalize_count(values)
+            if counts.dtype != values.dtype:
+                converted[column] = counts
+        elif column in MEASURE_COLUMNS and values.dtype != "float64":
+            converted[column] = pd.to_numeric(values, errors="coerce").astype(
+                "float64"
+            )
+        elif column in CATEGORY_COLUMNS:
+            dtype = (
+                pd.CategoricalDtype(categories[column])
+                if categories and column in categories
+                else "category"
+            )
+            if values.dtype != dtype:
+                converted[column] = values.astype(dtype)
+    return df.assign(**converted) if converted else df
 
 
-@st.cache_data(ttl=3600)
-def load_historical_segment_data() -> pd.DataFrame:
+def shared_categories(datasets: Mapping[str, pd.DataFrame]) -> dict[str, list]:
+    """Sorted union of each label column's values across the whole snapshot."""
+    values: dict[str, set] = {}
+    for df in datasets.values():
+        for column in df.columns.intersection(CATEGORY_COLUMNS):
+            labels = df[column]
+            if isinstance(labels.dtype, pd.CategoricalDtype):
+                observed = labels.cat.categories
+            else:
+                observed = labels.dropna().unique()
+            values.setdefault(column, set()).update(observed)
+    return {column: sorted(labels) for column, labels in values.items()}
+
+
+def normalize_datasets(datasets: dict[str, pd.DataFrame]) -> dict[str, pd.DataFrame]:
     """
-    Loads profile-level sale history when the optional public API table exists.
-    The dashboard keeps working while the table is being rolled out.
+    Normalizes every dataset with one shared category set per label column, so
+    merges, concats and filters across datasets stay categorical instead of
+    falling back to object strings.
     """
-    cutoff = (datetime.now(UTC) - timedelta(days=HISTORY_WINDOW_DAYS)).strftime(
-        "%Y-%m-%d"
+    categories = shared_categories(datasets)
+    return {name: normalize_frame(df, categories) for name, df in datasets.items()}
+
+
+def dataset_memory_report(datasets: Mapping[str, pd.DataFrame]) -> pd.DataFrame:
+    """Rows, columns and deep in-memory size of every dataset, largest first."""
+    report = pd.DataFrame(
+        [
+            {
+                "dataset": name,
+                "rows": len(df),
+                "columns": len(df.columns),
+                "memory_mb": df.memory_usage(deep=True).sum() / 1_048_576,
+            }
+            for name, df in datasets.items()
+        ],
+        columns=["dataset", "rows", "columns", "memory_mb"],
     )
-    try:
-        rows = fetch_paginated_rows(
-            "api_estate_segments_daily", HISTORY_SALE_SEGMENT_COLUMNS, cutoff
+    return report.sort_values("memory_mb", ascending=False, ignore_index=True)
+
+
+def new_history_store() -> dict:
+    return {"lock": threading.Lock(), "tables": {}, "tiers": {}}
+
+
+@st.cache_resource
+def get_history_store() -> dict:
+    """Process-wide history rows that survive `st.cache_data` expiries."""
+    return new_history_store()
+
+
+def merge_history_rows(
+    cached: pd.DataFrame,
+    fresh: pd.DataFrame,
+    since: str,
+    cutoff: str,
+) -> pd.DataFrame:
+    """Replace cached snapshots from `since` onward and drop dates before `cutoff`."""
+    if fresh.empty:
+        merged = cached
+    else:
+        # Categories differ between loads, so the concat falls back to objects.
+        merged = normalize_frame(
+            pd.concat([cached[cached["date"] < since], fresh], ignore_index=True)
         )
-    except Exception:  # noqa: BLE001
+    return merged[merged["date"] >= cutoff].reset_index(drop=True)
+
+
+def sync_history_rows(
+    table_name: str,
+    columns: str,
+    cutoff: str,
+    supabase=None,
+    store: dict | None = None,
+) -> pd.DataFrame:
+    """
+    Keeps one history table current inside the shared store. The first call
+    loads the full window; later calls re-read only the last cached snapshot
+    date onward, because the daily tables gain one date per refresh and a
+    same-day pipeline re-run can still replace that date's rows.
+    """
+    store = store if store is not None else get_history_store()
+    with store["lock"]:
+        entry = store["tables"].setdefault(
+            table_name,
+            {"lock": threading.Lock(), "rows": pd.DataFrame(), "cutoff": None},
+        )
+
+    with entry["lock"]:
+        cached = entry["rows"]
+        if cached.empty or entry["cutoff"] is None or cutoff < entry["cutoff"]:
+            rows = normalize_frame(
+                pd.DataFrame(
+                    fetch_paginated_rows(table_name, columns, cutoff, supabase=supabase)
+                )
+            )
+            entry["indices"] = {}
+        else:
+            since = f"{cached['date'].max():%Y-%m-%d}"
+            fresh = normalize_frame(
+                pd.DataFrame(
+                    fetch_paginated_rows(table_name, columns, since, supabase=supabase)
+                )
+            )
+            rows = merge_history_rows(cached, fresh, since, cutoff)
+            # Rolling indices take only the re-read days, not the whole window.
+            for index in entry.get("indices", {}).values():
+                if not fresh.empty:
+                    advance_rolling_index(index, fresh, since)
+                trim_rolling_index(index, cutoff)
+        entry["rows"] = rows
+        entry["cutoff"] = cutoff
+        return rows
+
+
+def sync_history_tier(
+    grain: str,
+    cutoff: str,
+    cities: tuple[str, ...],
+    table_name: str = "api_estate_daily",
+    supabase=None,
+    store: dict | None = None,
+) -> pd.DataFrame:
+    """
+    Keeps a weekly or monthly rollup of a daily history table for one city
+    selection inside the shared store. The first call rolls up the whole
+    window; later calls re-read only the daily rows of the latest stored
+    period, the one period that new dates can still change.
+    """
+    store = store if store is not None else get_history_store()
+    with store["lock"]:
+        entry = store["tiers"].setdefault(
+            (table_name, grain, cities),
+            {"lock": threading.Lock(), "rows": pd.DataFrame(), "cutoff": None},
+        )
+
+    with entry["lock"]:
+        cached = entry["rows"]
+        reload = cached.empty or entry["cutoff"] is None or cutoff < entry["cutoff"]
+        since = cutoff if reload else f"{cached['date'].max():%Y-%m-%d}"
+        daily = normalize_frame(
+            pd.DataFrame(
+                fetch_paginated_rows(
+                    table_name,
+                    HISTORY_SALE_COLUMNS,
+                    since,
+                    supabase=supabase,
+                    cities=cities,
+                )
+            )
+        )
+        fresh = normalize_frame(rollup_history(daily, grain).reset_index(drop=True))
+        if reload:
+            rows = fresh
+        else:
+            # Keep the period that holds `cutoff`, as the first full load does.
+            period = pd.Period(cutoff, HISTORY_GRAIN_PERIODS[grain])
+            first_period = f"{period.start_time:%Y-%m-%d}"
+            rows = merge_history_rows(cached, fresh, since, first_period)
+        entry["rows"] = rows
+        entry["cutoff"] = cutoff
+        return rows
+
+
+def history_cutoff(window_days: int = HISTORY_WINDOW_DAYS) -> str:
+    return (datetime.now(UTC) - timedelta(days=window_days)).strftime("%Y-%m-%d")
+
+
+def history_price_index(
+    window_days: int,
+    table_name: str = "api_estate_daily",
+    store: dict | None = None,
+) -> pd.DataFrame:
+    """
+    Listing-weighted rolling price index of a stored history table. The index
+    is built once from the stored rows and then advanced by `sync_history_rows`
+    with each refresh's new days. Empty until the table has been loaded.
+    """
+    store = store if store is not None else get_history_store()
+    with store["lock"]:
+        entry = store["tables"].get(table_name)
+    if entry is None:
         return pd.DataFrame()
-    return pd.DataFrame(rows)
-
-
-@st.cache_data(ttl=3600)
-def load_data() -> tuple[
-    pd.DataFrame,
-    pd.DataFrame,
-    pd.DataFrame,
-    pd.DataFrame,
-    pd.DataFrame,
-    pd.DataFrame,
-    pd.DataFrame,
-]:
-    supabase = get_supabase_client()
-    sales = pd.DataFrame(
-        supabase.table("api_estate_current").select("*").execute().data
-    )
-    sale_segments = pd.DataFrame(
-        supabase.table("api_estate_segments_current")
-        .select(ESTATE_SEGMENT_COLUMNS)
-        .execute()
-        .data
-    )
-    sale_housing_types = pd.DataFrame(
-        supabase.table("api_estate_housing_type_current")
-        .select(ESTATE_HOUSING_TYPE_COLUMNS)
-        .execute()
-        .data
-    )
-    sale_conditions = pd.DataFrame(
-        supabase.table("api_estate_condition_current")
-        .select(ESTATE_CONDITION_COLUMNS)
-        .execute()
-        .data
-    )
-    sale_floor_positions = pd.DataFrame(
-        supabase.table("api_estate_floor_position_current")
-        .select(ESTATE_FLOOR_POSITION_COLUMNS)
+
+    with entry["lock"]:
+        indices = entry.setdefault("indices", {})
+        if window_days not in indices:
+            indices[window_days] = advance_rolling_index(
+                new_rolling_index(window_days), entry["rows"]
+            )
+        index = indices[window_days]
+        # Normalized once; later calls get the same frame until the index moves.
+        index["frame"] = normalize_frame(rolling_index_frame(index))
+        return index["frame"]
+
+
+def history_grain(window_days: int) -> str:
+    """
+    The grain of the finest rollup tier that covers `window_days`. Windows the
+    snapshot's daily rows cover have no rollup tier.
+    """
+    if window_days <= HISTORY_WINDOW_DAYS:
+        raise ValueError(f"The daily snapshot covers {window_days} days.")
+    for grain, tier_days in HISTORY_TIERS:
+        if window_days <= tier_days:
+            return grain
+    raise ValueError(f"No history tier covers {window_days} days.")
+
+
+def timed_fetch(fetch: Callable[[], list[dict]]) -> tuple:
+    started = time.perf_counter()
+    try:
+        return fetch(), None, time.perf_counter() - started
+    except Exception as exc:  # noqa: BLE001
+        return None, exc, time.perf_counter() - started
+
+
+def fetch_datasets(
+    fetchers: Mapping[str, Callable[[], list[dict] | pd.DataFrame]],
+    optional: Iterable[str] = (),
+    max_workers: int = LOADER_MAX_WORKERS,
+) -> tuple[dict[str, pd.DataFrame], dict[str, float]]:
+    """
+    Runs every dataset fetch at the same time on a bounded thread pool and
+    returns the frames with per-dataset wall time in seconds. A failed
+    required dataset raises; a failed optional dataset becomes empty.
+    """
+    optional = set(optional)
+    with ThreadPoolExecutor(
+        max_workers=max(1, min(max_workers, len(fetchers)))
+    ) as pool:
+        futures = {
+            name: pool.submit(timed_fetch, fetch) for name, fetch in fetchers.items()
+        }
+        results = {name: future.result() for name, future in futures.items()}
+
+    frames = {}
+    timings = {}
+    for name, (rows, error, seconds) in results.items():
+        timings[name] = seconds
+        if error is not None:
+            if name not in optional:
+                raise error
+            frames[name] = pd.DataFrame()
+            continue
+        frames[name] = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(rows)
+    return frames, timings
+
+
+def current_table_fetchers(supabase) -> dict[str, Callable[[], list[dict]]]:
+    return {
+        name: lambda table_name=table_name, columns=columns: fetch_table_rows(
+            table_name, columns, supabase=supabase
+        )
+        for name, table_name, columns in CURRENT_TABLES
+    }
+
+
+def history_fetchers(
+    supabase, cutoff: str, store: dict
+) -> dict[str, Callable[[], pd.DataFrame]]:
+    return {
+        name: lambda table_name=table_name, columns=columns: sync_history_rows(
+            table_name, columns, cutoff, supabase=supabase, store=store
+        )
+        for name, table_name, columns in HISTORY_TABLES
+    }
+
+
+def fetch_freshness_rows(table_name: str, supabase=None) -> list[dict]:
+    """The newest `refreshed_at` row only, the same probe `check_api_health` runs."""
+    supabase = supabase or get_supabase_client()
+    return (
+        supabase.table(table_name)
+        .select(FRESHNESS_COLUMN)
+        .order(FRESHNESS_COLUMN, desc=True)
+        .limit(1)
         .execute()
         .data
     )
-    rent = pd.DataFrame(supabase.table("api_rent_current").select("*").execute().data)
-    yield_data = pd.DataFrame(
-        supabase.table("api_rent_yield").select("*").execute().data
-    )
-    return (
-        sales,
-        sale_segments,
-        sale_housing_types,
-        sale_conditions,
-        sale_floor_positions,
-        rent,
-        yield_data,
-    )
+
+
+def probe_freshness(supabase=None) -> dict[str, str | None]:
+    """
+    Returns the latest `refreshed_at` of every dashboard dataset, one
+    single-row query per table run concurrently. An optional table that
+    cannot be read reports None.
+    """
+    supabase = supabase or get_supabase_client()
+    fetchers = {
+        name: lambda table_name=table_name: fetch_freshness_rows(
+            table_name, supabase=supabase
+        )
+        for name, table_name, _ in (*CURRENT_TABLES, *HISTORY_TABLES)
+    }
+    frames, _ = fetch_datasets(fetchers, optional=OPTIONAL_DATASETS)
+    return snapshot_markers(frames)
+
+
+@st.cache_data(ttl=FRESHNESS_PROBE_SECONDS, show_spinner=False)
+def load_freshness_markers() -> dict[str, str | None] | None:
+    """
+    Cached freshness probe. The markers change only when the upstream refresh
+    runs, so they are the cache key for the full loads. Returns None when the
+    probe fails; the failure is cached too, so reruns do not hammer the API.
+    """
+    try:
+        return probe_freshness()
+    except Exception:  # noqa: BLE001
+        return None
+
+
+def fetch_rpc_rows(
+    function_name: str,
+    params: dict,
+    page_size: int = PAGE_SIZE_MAX,
+    supabase=None,
+) -> list[dict]:
+    """
+    Reads an RPC's rows page by page until a short page, so the PostgREST
+    max-rows limit cannot truncate them. The rollup functions order their
+    rows, so consecutive ranges neither skip nor repeat a row.
+    """
+    supabase = supabase or get_supabase_client()
+    rows = []
+    while True:
+        batch = (
+            supabase.rpc(function_name, params)
+            .range(len(rows), len(rows) + page_size - 1)
+            .execute()
+            .data
+        )
+        rows.extend(batch)
+        if len(batch) < page_size:
+            return rows
+
+
+def fetch_sale_profile_rollup(
+    cities: Iterable[str],
+    rooms: Iterable[str],
+    area_bands: Iterable[str],
+    min_listings: int,
+    page_size: int = PAGE_SIZE_MAX,
+    supabase=None,
+) -> dict[str, pd.DataFrame]:
+    """
+    Runs `api_sale_profile_rollup` and splits its rows into one frame per
+    level: the profile markets that `build_sale_market_from_segments` builds,
+    the room and area summaries of `build_segment_summary`, and the city
+    summary of `build_city_market_summary`. Empty selections mean no filter.
+    """
+    supabase = supabase or get_supabase_client()
+    params = {
+        "p_cities": list(cities) or None,
+        "p_rooms": [str(value) for value in rooms] or None,
+        "p_area_bands": [str(value) for value in area_bands] or None,
+        "p_min_listings": int(min_listings),
+    }
+    rows = fetch_rpc_rows(SALE_PROFILE_ROLLUP_FUNCTION, params, page_size, supabase)
+    frame = pd.DataFrame(rows, columns=list(SALE_PROFILE_ROLLUP_COLUMNS))
+    rollup = {}
+    for level, columns in SALE_PROFILE_ROLLUP_LEVELS.items():
+        level_rows = frame[frame["level"] == level]
+        if level not in level_rows.columns:
+            level_rows = level_rows.rename(columns={"group_value": level})
+        rollup[level] = normalize_frame(
+            level_rows.loc[:, list(columns)].reset_index(drop=True)
+        )
+    return rollup
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def load_sale_profile_rollup(
+    cities: tuple[str, ...],
+    rooms: tuple[str, ...],
+    area_bands: tuple[str, ...],
+    min_listings: int,
+    freshness: dict | None = None,
+) -> dict[str, pd.DataFrame] | None:
+    """
+    Cached server-side rollup for one filter state, keyed by the snapshot
+    freshness markers. Returns None when the function is missing or fails, so
+    callers fall back to the pandas builders.
+    """
+    try:
+        return fetch_sale_profile_rollup(cities, rooms, area_bands, min_listings)
+    except Exception:  # noqa: BLE001
+        return None
+
+
+def fetch_history_rollup(
+    grain: str,
+    since: str,
+    cities: Iterable[str],
+    page_size: int = PAGE_SIZE_MAX,
+    supabase=None,
+) -> pd.DataFrame:
+    """Runs `api_estate_history_rollup` for one grain, window, and city set."""
+    supabase = supabase or get_supabase_client()
+    params = {"p_grain": grain, "p_since": since, "p_cities": list(cities) or None}
+    rows = fetch_rpc_rows(HISTORY_ROLLUP_FUNCTION, params, page_size, supabase)
+    return normalize_frame(pd.DataFrame(rows, columns=HISTORY_SALE_COLUMNS.split(",")))
+
+
+@st.cache_data(ttl=3600, show_spinner="Loading price history...")
+def load_history_window(
+    window_days: int,
+    cities: tuple[str, ...],
+    freshness: dict | None = None,
+) -> pd.DataFrame:
+    """
+    Sale history of the last `window_days` in `cities`, for windows longer
+    than the snapshot's, at the grain of the finest rollup tier that covers
+    the window. Tiers come from the server rollup; when the function is
+    missing they are kept up to date from the daily rows in the history store.
+    """
+    grain = history_grain(window_days)
+    since = history_cutoff(window_days)
+    try:
+        return fetch_history_rollup(grain, since, cities)
+    except Exception:  # noqa: BLE001
+        return sync_history_tier(grain, since, cities)
+
+
+def fetch_dashboard_datasets(
+    supabase=None,
+    store: dict | None = None,
+) -> tuple[dict[str, pd.DataFrame], dict[str, float]]:
+    """
+    Loads the seven current tables and both history tables in one concurrent
+    fan-out, so a cold start waits for the slowest table instead of the sum.
+    """
+    # Resolve cached resources here: worker threads have no Streamlit context.
+    supabase = supabase or get_supabase_client()
+    store = store if store is not None else get_history_store()
+    fetchers = {
+        **current_table_fetchers(supabase),
+        **history_fetchers(supabase, history_cutoff(), store),
+    }
+    frames, timings = fetch_datasets(fetchers, optional=OPTIONAL_DATASETS)
+    datasets = normalize_datasets(frames)
+    adopt_history_rows(frames, datasets, store)
+    return datasets, timings
+
+
+def adopt_history_rows(
+    frames: Mapping[str, pd.DataFrame],
+    datasets: Mapping[str, pd.DataFrame],
+    store: dict,
+) -> None:
+    """
+    Hands the recoded history frames back to the store, so the snapshot and the
+    store share one copy. Skipped if the store moved on in the meantime.
+    """
+    for name, table_name, _ in HISTORY_TABLES:
+        entry = store["tables"].get(table_name)
+        if entry is None:
+            continue
+        with entry["lock"]:
+            if entry["rows"] is frames[name]:
+                entry["rows"] = datasets[name]
+
+
+def new_snapshot_state() -> dict:
+    return {
+        "lock": threading.Lock(),
+        "refresh_lock": threading.Lock(),
+        "datasets": None,
+        "timings": {},
+        "loaded_at": 0.0,
+        "source": None,
+        "refreshing": False,
+        "last_error": None,
+        "failed_at": None,
+        "markers": None,
+    }
+
+
+@st.cache_resource
+def get_snapshot_state() -> dict:
+    """Process-wide dashboard snapshot shared by every session."""
+    return new_snapshot_state()
+
+
+def persist_snapshot(
+    datasets: dict[str, pd.DataFrame],
+    markers: dict[str, str | None] | None = None,
+) -> None:
+    # The disk copy only speeds up the next cold start; never fail a load on it.
+    try:
+        write_snapshot_cache(
+            datasets,
+            extra={"history_window_days": HISTORY_WINDOW_DAYS, "freshness": markers},
+        )
+    except (OSError, ValueError):
+        pass
+
+
+def seed_history_store(datasets: dict[str, pd.DataFrame], store: dict) -> None:
+    """Lets the first network refresh after a disk boot stay incremental."""
+    cutoff = history_cutoff()
+    for name, table_name, _ in HISTORY_TABLES:
+        rows = datasets[name]
+        if rows.empty or "date" not in rows.columns:
+            continue
+        with store["lock"]:
+            store["tables"].setdefault(
+                table_name,
+                {
+                    "lock": threading.Lock(),
+                    "rows": rows[rows["date"] >= cutoff].reset_index(drop=True),
+                    "cutoff": cutoff,
+                },
+            )
+
+
+def run_snapshot_refresh(
+    state: dict,
+    supabase,
+    store: dict,
+    markers: dict[str, str | None] | None = None,
+) -> None:
+    """
+    Replaces the shared snapshot with a fresh network load. Needs
+    `refresh_lock`. `markers` is the freshness probe that triggered the load;
+    if the upstream refreshes mid-load, the next probe just differs again.
+    """
+    try:
+        datasets, timings = fetch_dashboard_datasets(supabase, store)
+    except Exception as exc:  # noqa: BLE001
+        with state["lock"]:
+            state.update(refreshing=False, last_error=exc, failed_at=time.monotonic())
+        return
+
+    if (
+        state["datasets"] is None
+        or markers != state["markers"]
+        or snapshot_markers(datasets) != snapshot_markers(state["datasets"])
+    ):
+        persist_snapshot(datasets, markers)
+    with state["lock"]:
+        state.update(
+            datasets=datasets,
+            timings=timings,
+            loaded_at=time.monotonic(),
+            source="network",
+            refreshing=False,
+            last_error=None,
+            failed_at=None,
+            markers=markers,
+        )
+
+
+def refresh_snapshot(
+    state: dict,
+    supabase,
+    store: dict,
+    markers: dict[str, str | None] | None = None,
+) -> None:
+    """
+    Background refresh target. Only one refresh runs at a time; on failure the
+    previous snapshot keeps being served and the error is kept for the
+    dashboard notice.
+    """
+    with state["refresh_lock"]:
+        run_snapshot_refresh(state, supabase, store, markers)
+
+
+def start_background_refresh(
+    state: dict,
+    supabase,
+    store: dict,
+    markers: dict[str, str | None] | None = None,
+) -> None:
+    """Starts a refresh thread unless one is already running. Needs `state["lock"]`."""
+    if state["refreshing"]:
+        return
+    state["refreshing"] = True
+    threading.Thread(
+        target=refresh_snapshot,
+        args=(state, supabase, store, markers),
+        name="imobil-snapshot-refresh",
+        daemon=True,
+    ).start()
+
+
+def snapshot_is_stale(
+    state: dict,
+    markers: dict[str, str | None] | None = None,
+) -> bool:
+    """
+    A snapshot is stale once the freshness probe differs from the markers it
+    was loaded under. Without a probe reading, fall back to its age.
+    """
+    now = time.monotonic()
+    if state["failed_at"] is not None and now - state["failed_at"] < (
+        SNAPSHOT_RETRY_SECONDS
+    ):
+        return False
+    if markers is not None and state["markers"] is not None:
+        return markers != state["markers"]
+    return now - state["loaded_at"] >= SNAPSHOT_MAX_AGE_SECONDS
+
+
+def load_dashboard_data(
+    state: dict | None = None,
+) -> tuple[dict[str, pd.DataFrame], dict[str, float]]:
+    """
+    Returns every dashboard dataset and its load timings, stale-while-
+    revalidate: once any snapshot exists it is served immediately and a
+    stale one is refreshed on a background thread. Staleness follows the
+    cached `refreshed_at` probe, so full fetches happen only after an
+    upstream refresh. A cold process boots from the on-disk Parquet snapshot
+    when one exists; only a process with no snapshot at all waits for the
+    network.
+    """
+    state = state if state is not None else get_snapshot_state()
+    markers = load_freshness_markers()
+    with state["lock"]:
+        if state["datasets"] is None:
+            cached = read_snapshot_cache(DATASET_NAMES)
+            if cached is not None:
+                datasets, manifest = cached
+                datasets = normalize_datasets(datasets)
+                store = get_history_store()
+                if manifest.get("history_window_days") == HISTORY_WINDOW_DAYS:
+                    seed_history_store(datasets, store)
+                state.update(
+                    datasets=datasets,
+                    timings={},
+                    loaded_at=time.monotonic(),
+                    source="disk",
+                    markers=manifest.get("freshness"),
+                )
+                if markers is None or markers != state["markers"]:
+                    start_background_refresh(
+                        state, get_supabase_client(), store, markers
+                    )
+        elif snapshot_is_stale(state, markers):
+            start_background_refresh(
+                state, get_supabase_client(), get_history_store(), markers
+            )
+        if state["datasets"] is not None:
+            return state["datasets"], state["timings"]
+
+    # Nothing to serve yet: the first session loads, concurrent sessions wait.
+    with state["refresh_lock"]:
+        if state["datasets"] is None:
+            run_snapshot_refresh(
+                state, get_supabase_client(), get_history_store(), markers
+            )
+    with state["lock"]:
+        if state["datasets"] is None:
+            raise state["last_error"]
+        return state["datasets"], state["timings"]
+
+
+def snapshot_status(state: dict | None = None) -> dict:
+    """Describes the served snapshot for the dashboard freshness notice."""
+    state = state if state is not None else get_snapshot_state()
+    with state["lock"]:
+        return {
+            "source": state["source"],
+            "age_seconds": time.monotonic() - state["loaded_at"],
+            "refreshing": state["refreshing"],
+            "last_error": state["last_error"],
+            "markers": state["markers"],
+        }
+
+
+def new_segment_cube_store() -> dict:
+    return {"lock": threading.Lock(), "source": None, "cube": None}
+
+
+@st.cache_resource
+def get_segment_cube_store() -> dict:
+    """Process-wide segment cube, shared by every session."""
+    return new_segment_cube_store()
+
+
+def segment_cube(df_segments: pd.DataFrame, store: dict | None = None) -> dict:
+    """
+    The rollup cube of the served segment rows, rebuilt only when a new
+    snapshot replaces the frame. The store keeps the frame alive, so the
+    identity check cannot match a recycled object.
+    """
+    store = store if store is not None else get_segment_cube_store()
+    with store["lock"]:
+        if store["source"] is not df_segments:
+            store.update(source=df_segments, cube=build_segment_cube(df_segments))
+        return store["cube"]
+
+
+# Indexed frames kept per process: every indexed table of two snapshots.
+MARKET_INDEX_MAX_ENTRIES = 16
+
+
+def new_market_index_store() -> dict:
+    return {"lock": threading.Lock(), "indices": OrderedDict()}
+
+
+@st.cache_resource
+def get_market_index_store() -> dict:
+    """Process-wide market indices of served frames, shared by every session."""
+    return new_market_index_store()
+
+
+def market_index(
+    df: pd.DataFrame,
+    store: dict | None = None,
+    max_entries: int = MARKET_INDEX_MAX_ENTRIES,
+) -> dict:
+    """
+    The market index of a served frame, built once per snapshot frame. Each
+    index keeps its frame alive, so the identity key cannot match a recycled
+    object; the least recently used indices are dropped past `max_entries`.
+    """
+    store = store if store is not None else get_market_index_store()
+    indices = store["indices"]
+    with store["lock"]:
+        if id(df) in indices:
+            indices.move_to_end(id(df))
+            return indices[id(df)]
+
+    index = build_market_index(df)
+    with store["lock"]:
+        indices[id(df)] = index
+        while len(indices) > max_entries:
+            indices.popitem(last=False)
+    return index
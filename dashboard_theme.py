@@ -41,6 +41,16 @@ YIELD_COLOR_SCALE = ["#d9f3f1", "#7bcac5", "#0f8b8d", "#0b5f63"]
 HIGH_PRICE_COLOR_SCALE = ["#fee2e2", "#fca5a5", "#ef4444", "#991b1b"]
 HIGH_DAILY_RENT_COLOR_SCALE = ["#f3e8ff", "#c084fc", "#9333ea", "#581c87"]
 CHART_NEUTRAL = "#cbd8d2"
+TREND_COLORS = [
+    "#315fc9",
+    "#12805c",
+    "#c56b2c",
+    "#b84d4a",
+    "#7557b5",
+    "#0f8b8d",
+    "#6f8f3b",
+    "#a36b1c",
+]
 PLOTLY_FONT_FAMILY = "Inter, Segoe UI, sans-serif"
 
 
@@ -1,10 +1,71 @@
-from collections.abc import Iterable
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
 
+import numpy as np
 import pandas as pd
 
+# Derived frames a session keeps between reruns; older ones are evicted first.
+TRANSFORM_MEMO_MAX_ENTRIES = 64
+
+
+def new_transform_memo(snapshot: object) -> dict:
+    return {"snapshot": snapshot, "entries": OrderedDict()}
+
+
+def memo_key(value: object) -> object:
+    """Frames and other unhashable inputs are keyed by identity."""
+    if isinstance(value, list | tuple):
+        return tuple(memo_key(item) for item in value)
+    if isinstance(value, pd.DataFrame | pd.Series | dict):
+        return ("id", id(value))
+    return value
+
+
+def memoized(
+    memo: dict,
+    func: Callable,
+    *args,
+    max_entries: int = TRANSFORM_MEMO_MAX_ENTRIES,
+):
+    """
+    Returns `func(*args)` from an LRU of derived frames, so a rerun recomputes
+    only the outputs whose inputs changed. Each entry keeps its inputs alive,
+    which keeps identity keys unique. Results are shared between reruns and
+    must not be modified in place.
+    """
+    entries = memo["entries"]
+    key = (func.__module__, func.__qualname__, memo_key(args))
+    if key in entries:
+        entries.move_to_end(key)
+        return entries[key][1]
+
+    result = func(*args)
+    entries[key] = (args, result)
+    while len(entries) > max_entries:
+        entries.popitem(last=False)
+    return result
+
+
+def as_numeric(values: pd.Series) -> pd.Series:
+    """Coerces raw values; columns normalized at load time pass through as-is."""
+    if pd.api.types.is_numeric_dtype(values):
+        return values
+    return pd.to_numeric(values, errors="coerce")
+
+
+def as_datetime(values: pd.Series) -> pd.Series:
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    return pd.to_datetime(values, errors="coerce")
+
+
+def sector_names(sector: pd.Series) -> pd.Series:
+    # Categorical columns reject fill values outside their categories.
+    return sector.astype(object).fillna("Center").astype(str)
+
 
 def sector_label(df: pd.DataFrame) -> pd.Series:
-    return df["city"].astype(str) + " -> " + df["sector"].fillna("Center").astype(str)
+    return df["city"].astype(str) + " -> " + sector_names(df["sector"])
 
 
 def place_label(row: pd.Series) -> str:
@@ -23,7 +84,7 @@ def weighted_average(df: pd.DataFrame, price_col: str) -> float:
 def latest_data_date(df: pd.DataFrame) -> pd.Timestamp | None:
     if df.empty or "date" not in df.columns:
         return None
-    data_date = pd.to_datetime(df["date"], errors="coerce").max()
+    data_date = as_datetime(df["date"]).max()
     if pd.isna(data_date):
         return None
     return data_date
@@ -36,6 +97,46 @@ def data_freshness(df: pd.DataFrame) -> str:
     return f"Data as of {data_date:%d %B %Y}"
 
 
+def listing_weighted_groups(
+    df: pd.DataFrame,
+    keys: list[str],
+    price_columns: list[str],
+    required: list[str],
+) -> pd.DataFrame | None:
+    """
+    Listing totals and listing-weighted averages of `price_columns` per
+    `keys`, over rows with positive listings and every `required` and price
+    value present. Only the grouped columns are gathered, so the input frame
+    is never copied. None when no row qualifies.
+    """
+    listings = as_numeric(df["listings"])
+    prices = {column: as_numeric(df[column]) for column in price_columns}
+    keep = listings.notna() & (listings > 0)
+    for values in [*(df[column] for column in required), *prices.values()]:
+        keep &= values.notna()
+    keep = keep.to_numpy(dtype=bool)
+    if not keep.any():
+        return None
+
+    # Masked arrays rather than Series: no per-column index and no realignment.
+    listings = listings.array[keep]
+    work = pd.DataFrame(
+        {
+            **{key: df[key].array[keep] for key in keys},
+            "listings": listings,
+            **{
+                column: values.array[keep] * listings
+                for column, values in prices.items()
+            },
+        },
+        copy=False,
+    )
+    totals = work.groupby(keys, dropna=False, observed=True).sum()
+    for column in price_columns:
+        totals[column] = totals[column] / totals["listings"]
+    return totals.reset_index()
+
+
 def build_segment_summary(
     df_segments: pd.DataFrame,
     group_col: str,
@@ -45,30 +146,25 @@ def build_segment_summary(
     if df_segments.empty or not required.issubset(df_segments.columns):
         return pd.DataFrame()
 
-    work = df_segments.dropna(subset=[group_col, "listings", "avg_per_m2_eur"]).copy()
-    if work.empty:
-        return work
-
-    work["listings"] = pd.to_numeric(work["listings"], errors="coerce")
-    work["avg_per_m2_eur"] = pd.to_numeric(work["avg_per_m2_eur"], errors="coerce")
-    work = work.dropna(subset=["listings", "avg_per_m2_eur"])
-    work = work[work["listings"] > 0]
-    if work.empty:
-        return work
-
-    work["weighted_per_m2"] = work["avg_per_m2_eur"] * work["listings"]
-    grouped = (
-        work.groupby(group_col, as_index=False, observed=True)
-        .agg(listings=("listings", "sum"), weighted_per_m2=("weighted_per_m2", "sum"))
-        .copy()
+    grouped = listing_weighted_groups(
+        df_segments, [group_col], ["avg_per_m2_eur"], [group_col]
     )
-    grouped["avg_per_m2_eur"] = grouped["weighted_per_m2"] / grouped["listings"]
-    grouped[group_col] = pd.Categorical(
-        grouped[group_col].astype(str),
+    if grouped is None:
+        return df_segments.iloc[:0]
+    return order_segment_summary(grouped, group_col, category_order)
+
+
+def order_segment_summary(
+    summary: pd.DataFrame,
+    group_col: str,
+    category_order: list[str],
+) -> pd.DataFrame:
+    ordered = pd.Categorical(
+        summary[group_col].astype(str),
         categories=category_order,
         ordered=True,
     )
-    return grouped.sort_values(group_col).drop(columns=["weighted_per_m2"])
+    return summary.assign(**{group_col: ordered}).sort_values(group_col)
 
 
 def build_city_market_summary(df: pd.DataFrame) -> pd.DataFrame:
@@ -76,28 +172,10 @@ def build_city_market_summary(df: pd.DataFrame) -> pd.DataFrame:
     if df.empty or not required.issubset(df.columns):
         return pd.DataFrame()
 
-    work = df.copy()
-    for column in ("listings", "avg_price_eur", "avg_per_m2_eur"):
-        work[column] = pd.to_numeric(work[column], errors="coerce")
-    work = work.dropna(subset=["city", "listings", "avg_price_eur", "avg_per_m2_eur"])
-    work = work[work["listings"] > 0]
-    if work.empty:
-        return pd.DataFrame()
-
-    work["weighted_price"] = work["avg_price_eur"] * work["listings"]
-    work["weighted_per_m2"] = work["avg_per_m2_eur"] * work["listings"]
-    grouped = (
-        work.groupby("city", as_index=False, observed=True)
-        .agg(
-            listings=("listings", "sum"),
-            weighted_price=("weighted_price", "sum"),
-            weighted_per_m2=("weighted_per_m2", "sum"),
-        )
-        .copy()
+    grouped = listing_weighted_groups(
+        df, ["city"], ["avg_price_eur", "avg_per_m2_eur"], ["city"]
     )
-    grouped["avg_price_eur"] = grouped["weighted_price"] / grouped["listings"]
-    grouped["avg_per_m2_eur"] = grouped["weighted_per_m2"] / grouped["listings"]
-    return grouped.drop(columns=["weighted_price", "weighted_per_m2"])
+    return pd.DataFrame() if grouped is None else grouped
 
 
 def build_city_price_gap_summary(
@@ -114,14 +192,13 @@ def build_city_price_gap_summary(
         return pd.DataFrame()
 
     reference_price = float(reference.iloc[0]["avg_per_m2_eur"])
-    comparison = summary[summary["city"] != reference_city].copy()
+    comparison = summary[summary["city"] != reference_city]
     if comparison.empty:
         return comparison
 
-    comparison["price_gap_eur_per_m2"] = (
-        reference_price - comparison["avg_per_m2_eur"]
-    )
-    return comparison.sort_values("price_gap_eur_per_m2", ascending=False)
+    return comparison.assign(
+        price_gap_eur_per_m2=reference_price - comparison["avg_per_m2_eur"]
+    ).sort_values("price_gap_eur_per_m2", ascending=False)
 
 
 def ordered_segment_options(
@@ -145,18 +222,12 @@ def has_sale_profile_filters(
     return bool(list(selected_rooms) or list(selected_area_bands))
 
 
-def filter_by_city(
-    df: pd.DataFrame,
-    selected_cities: Iterable[str],
-) -> pd.DataFrame:
-    if df.empty:
-        return df
-
-    filtered = df.copy()
-    selected_cities = list(selected_cities)
-    if selected_cities and "city" in filtered.columns:
-        filtered = filtered[filtered["city"].isin(selected_cities)]
-    return filtered
+def text_isin(values: pd.Series, selected: list[str]) -> pd.Series:
+    """`values.astype(str).isin(selected)`; categoricals compare categories only."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        categories = values.cat.categories
+        return values.isin(categories[categories.astype(str).isin(selected)])
+    return values.astype(str).isin(selected)
 
 
 def filter_sale_profile_segments(
@@ -167,16 +238,14 @@ def filter_sale_profile_segments(
     if df_segments.empty:
         return df_segments
 
-    filtered = df_segments.copy()
+    filtered = df_segments
     selected_rooms = [str(value) for value in selected_rooms]
     selected_area_bands = [str(value) for value in selected_area_bands]
 
     if selected_rooms and "rooms_group" in filtered.columns:
-        filtered = filtered[filtered["rooms_group"].astype(str).isin(selected_rooms)]
+        filtered = filtered[text_isin(filtered["rooms_group"], selected_rooms)]
     if selected_area_bands and "area_band" in filtered.columns:
-        filtered = filtered[
-            filtered["area_band"].astype(str).isin(selected_area_bands)
-        ]
+        filtered = filtered[text_isin(filtered["area_band"], selected_area_bands)]
     return filtered
 
 
@@ -192,195 +261,477 @@ def build_sale_market_from_segments(df_segments: pd.DataFrame) -> pd.DataFrame:
     if df_segments.empty or not required.issubset(df_segments.columns):
         return pd.DataFrame()
 
-    work = df_segments.copy()
-    work["listings"] = pd.to_numeric(work["listings"], errors="coerce")
-    work["avg_price_eur"] = pd.to_numeric(work["avg_price_eur"], errors="coerce")
-    work["avg_per_m2_eur"] = pd.to_numeric(
-        work["avg_per_m2_eur"], errors="coerce"
+    grouped = listing_weighted_groups(
+        df_segments,
+        ["date", "city", "sector"],
+        ["avg_price_eur", "avg_per_m2_eur"],
+        ["date", "city"],
+    )
+    return df_segments.iloc[:0] if grouped is None else grouped
+
+
+# Per-cell sums of the segment cube. Market sums use rows that
+# `build_sale_market_from_segments` keeps; segment sums use rows that
+# `build_segment_summary` keeps.
+SEGMENT_CUBE_SUMS = (
+    "listings",
+    "weighted_price",
+    "weighted_per_m2",
+    "segment_listings",
+    "segment_weighted_per_m2",
+)
+
+
+def build_segment_cube(df_segments: pd.DataFrame) -> dict:
+    """
+    Sums segment rows into a (market, rooms_group, area_band) array per
+    measure, where a market is one date, city, and sector. Any room and
+    area selection is then a masked sum over the cube, without a groupby.
+    """
+    markets = pd.DataFrame(columns=["date", "city", "sector"])
+    cube = {
+        "markets": markets,
+        "market_city_codes": np.zeros(0, dtype="int64"),
+        "cities": pd.Index([]),
+        "rooms_group": [],
+        "area_band": [],
+    }
+    cube.update({name: np.zeros((0, 0, 0)) for name in SEGMENT_CUBE_SUMS})
+    required = {
+        "date",
+        "city",
+        "sector",
+        "rooms_group",
+        "area_band",
+        "listings",
+        "avg_price_eur",
+        "avg_per_m2_eur",
+    }
+    if df_segments.empty or not required.issubset(df_segments.columns):
+        return cube
+
+    work = df_segments.dropna(
+        subset=["date", "city", "rooms_group", "area_band", "listings"]
     )
-    work = work.dropna(
-        subset=["date", "city", "listings", "avg_price_eur", "avg_per_m2_eur"]
+    listings = as_numeric(work["listings"]).to_numpy(dtype="float64")
+    price = as_numeric(work["avg_price_eur"]).to_numpy(dtype="float64")
+    per_m2 = as_numeric(work["avg_per_m2_eur"]).to_numpy(dtype="float64")
+    segment_rows = (listings > 0) & ~np.isnan(per_m2)
+    market_rows = segment_rows & ~np.isnan(price)
+
+    grouped = work.groupby(
+        ["date", "city", "sector"], dropna=False, observed=True, sort=True
     )
-    work = work[work["listings"] > 0]
-    if work.empty:
-        return work
-
-    work["weighted_price"] = work["avg_price_eur"] * work["listings"]
-    work["weighted_per_m2"] = work["avg_per_m2_eur"] * work["listings"]
-    grouped = (
-        work.groupby(["date", "city", "sector"], as_index=False, dropna=False)
-        .agg(
-            listings=("listings", "sum"),
-            weighted_price=("weighted_price", "sum"),
-            weighted_per_m2=("weighted_per_m2", "sum"),
+    market_codes = grouped.ngroup().to_numpy()
+    room_codes, rooms = pd.factorize(work["rooms_group"].astype(str), sort=True)
+    area_codes, areas = pd.factorize(work["area_band"].astype(str), sort=True)
+    shape = (grouped.ngroups, len(rooms), len(areas))
+    cells = np.ravel_multi_index((market_codes, room_codes, area_codes), shape)
+    size = int(np.prod(shape))
+
+    def cell_sums(rows: np.ndarray, values: np.ndarray) -> np.ndarray:
+        weights = np.where(rows, values, 0.0)
+        return np.bincount(cells, weights, minlength=size).reshape(shape)
+
+    markets = grouped.size().index.to_frame(index=False)
+    city_codes, cities = pd.factorize(markets["city"], sort=True)
+    cube.update(
+        markets=markets,
+        market_city_codes=city_codes,
+        cities=cities,
+        rooms_group=rooms.tolist(),
+        area_band=areas.tolist(),
+        listings=cell_sums(market_rows, listings),
+        weighted_price=cell_sums(market_rows, listings * price),
+        weighted_per_m2=cell_sums(market_rows, listings * per_m2),
+        segment_listings=cell_sums(segment_rows, listings),
+        segment_weighted_per_m2=cell_sums(segment_rows, listings * per_m2),
+    )
+    return cube
+
+
+def query_segment_cube(
+    cube: dict,
+    selected_cities: Iterable[str],
+    selected_rooms: Iterable[str],
+    selected_area_bands: Iterable[str],
+    min_listings: int,
+) -> dict[str, pd.DataFrame]:
+    """
+    Answers one sale-profile filter state from the cube: the profile markets
+    with at least `min_listings`, the room and area summaries inside them,
+    and the city summary. Matches the pandas builders row for row.
+    """
+    selected_cities = list(selected_cities)
+    markets = cube["markets"]
+    market_mask = np.ones(len(markets), dtype=bool)
+    if selected_cities:
+        market_mask = markets["city"].isin(selected_cities).to_numpy()
+
+    axes = []
+    for column, selected in (
+        ("rooms_group", selected_rooms),
+        ("area_band", selected_area_bands),
+    ):
+        selected = {str(value) for value in selected}
+        axes.append(
+            np.array(
+                [not selected or value in selected for value in cube[column]],
+                dtype=bool,
+            )
+        )
+    room_mask, area_mask = axes
+
+    def profile_sums(name: str) -> np.ndarray:
+        return cube[name][:, room_mask][:, :, area_mask]
+
+    listings = profile_sums("listings").sum(axis=(1, 2))
+    keep = market_mask & (listings > 0) & (listings >= min_listings)
+    listings = listings[keep]
+    weighted_price = profile_sums("weighted_price").sum(axis=(1, 2))[keep]
+    weighted_per_m2 = profile_sums("weighted_per_m2").sum(axis=(1, 2))[keep]
+    market = markets[keep].reset_index(drop=True)
+    market["listings"] = listings.astype("int64")
+    market["avg_price_eur"] = weighted_price / listings
+    market["avg_per_m2_eur"] = weighted_per_m2 / listings
+
+    segment_listings = profile_sums("segment_listings")[keep]
+    segment_weighted = profile_sums("segment_weighted_per_m2")[keep]
+    rollup = {"market": market}
+    for column, mask, axis in (
+        ("rooms_group", room_mask, (0, 2)),
+        ("area_band", area_mask, (0, 1)),
+    ):
+        group_listings = segment_listings.sum(axis=axis)
+        present = group_listings > 0
+        rollup[column] = pd.DataFrame(
+            {
+                column: np.array(cube[column], dtype=object)[mask][present],
+                "listings": group_listings[present].astype("int64"),
+                "avg_per_m2_eur": segment_weighted.sum(axis=axis)[present]
+                / group_listings[present],
+            }
         )
-        .copy()
+
+    city_codes = cube["market_city_codes"][keep]
+    city_count = len(cube["cities"])
+    city_listings = np.bincount(city_codes, listings, minlength=city_count)
+    present = city_listings > 0
+    city_listings = city_listings[present]
+    rollup["city"] = pd.DataFrame(
+        {
+            "city": cube["cities"][present],
+            "listings": city_listings.astype("int64"),
+            "avg_price_eur": np.bincount(
+                city_codes, weighted_price, minlength=city_count
+            )[present]
+            / city_listings,
+            "avg_per_m2_eur": np.bincount(
+                city_codes, weighted_per_m2, minlength=city_count
+            )[present]
+            / city_listings,
+        }
     )
-    grouped["avg_price_eur"] = grouped["weighted_price"] / grouped["listings"]
-    grouped["avg_per_m2_eur"] = grouped["weighted_per_m2"] / grouped["listings"]
-    return grouped.drop(columns=["weighted_price", "weighted_per_m2"])
+    return rollup
+
+
+# Grouping keys of the market index; `market` matches the segment-to-market key.
+MARKET_INDEX_KEYS = {
+    "city": "city",
+    "deal_type": "deal_type",
+    "market": ["date", "city", "sector"],
+}
+
+
+def build_market_index(df: pd.DataFrame) -> dict:
+    """
+    Row positions of a snapshot frame per city, per deal type, and per
+    (date, city, sector) market, plus its listing counts. Built once per
+    snapshot, so view filters slice rows by position instead of scanning or
+    merging the whole frame. Keys whose columns the frame lacks are None.
+    """
+    index = {"frame": df, "listings": None}
+    for name, columns in MARKET_INDEX_KEYS.items():
+        present = set([columns] if isinstance(columns, str) else columns)
+        index[name] = (
+            df.groupby(columns, observed=True, sort=False, dropna=False).indices
+            if present.issubset(df.columns)
+            else None
+        )
+    if index["market"] is not None:
+        index["market"] = {
+            market_key(key): positions for key, positions in index["market"].items()
+        }
+    if "listings" in df.columns:
+        index["listings"] = numeric_values(df, "listings")
+    return index
 
 
-def filter_segments_to_market(
-    df_segments: pd.DataFrame,
-    df_market: pd.DataFrame,
+def market_key(values: Iterable) -> tuple:
+    """Missing key parts as None, so NaN parts of two markets compare equal."""
+    return tuple(None if pd.isna(value) else value for value in values)
+
+
+def index_positions(groups: dict, keys: Iterable) -> np.ndarray:
+    """Ascending row positions of the indexed groups in `keys`."""
+    parts = [groups[key] for key in keys if key in groups]
+    if not parts:
+        return np.zeros(0, dtype=np.intp)
+    if len(parts) == 1:
+        return parts[0]
+    return np.sort(np.concatenate(parts))
+
+
+def select_markets(
+    index: dict,
+    selected_cities: Iterable[str],
+    min_listings: int | None = None,
+    deal_type: str | None = None,
 ) -> pd.DataFrame:
-    key_cols = ["date", "city", "sector"]
+    """
+    Indexed rows in the selected cities (all cities when none are selected),
+    of one deal type, and with at least `min_listings` listings. The result
+    may be the indexed frame itself and must not be modified in place.
+    """
+    frame = index["frame"]
+    if frame.empty:
+        return frame
+
+    positions = None
+    selected_cities = list(selected_cities)
+    if selected_cities and index["city"] is not None:
+        positions = index_positions(index["city"], dict.fromkeys(selected_cities))
+    if deal_type is not None and index["deal_type"] is not None:
+        deal_positions = index_positions(index["deal_type"], [deal_type])
+        positions = (
+            deal_positions
+            if positions is None
+            else np.intersect1d(positions, deal_positions, assume_unique=True)
+        )
+    if min_listings is not None and index["listings"] is not None:
+        listings = index["listings"]
+        positions = (
+            np.flatnonzero(listings >= min_listings)
+            if positions is None
+            else positions[listings[positions] >= min_listings]
+        )
+    return frame if positions is None else frame.take(positions)
+
+
+def select_market_segments(index: dict, df_market: pd.DataFrame) -> pd.DataFrame:
+    """
+    Indexed segment rows of the (date, city, sector) markets in `df_market`,
+    looked up by key instead of merged.
+    """
+    key_cols = MARKET_INDEX_KEYS["market"]
     if (
-        df_segments.empty
+        index["frame"].empty
         or df_market.empty
-        or not set(key_cols).issubset(df_segments.columns)
+        or index["market"] is None
         or not set(key_cols).issubset(df_market.columns)
     ):
         return pd.DataFrame()
 
-    market_keys = df_market[key_cols].drop_duplicates()
-    return df_segments.merge(market_keys, on=key_cols, how="inner")
+    markets = zip(*(df_market[column] for column in key_cols), strict=True)
+    keys = dict.fromkeys(market_key(market) for market in markets)
+    positions = index_positions(index["market"], keys)
+    return index["frame"].take(positions)
 
 
-def filter_by_city_and_listings(
-    df: pd.DataFrame,
-    selected_cities: Iterable[str],
-    min_listings: int,
-) -> pd.DataFrame:
-    if df.empty:
-        return df
+# Lags, in days, of the precomputed sale price movement.
+MOVEMENT_LAGS_DAYS = (1, 7, 30, 90)
 
-    filtered = filter_by_city(df, selected_cities)
-    if "listings" in filtered.columns:
-        filtered = filtered[filtered["listings"] >= min_listings]
-    return filtered
+
+def empty_price_panel() -> dict:
+    return {
+        "dates": pd.DatetimeIndex([]),
+        "markets": pd.DataFrame(columns=["city", "sector"]),
+        "price": np.empty((0, 0)),
+        "listings": None,
+    }
+
+
+def build_price_panel(historical_data: pd.DataFrame) -> dict:
+    """
+    Date x market matrices of the sale history: the price per m2 and, when
+    present, the listings of every city-sector snapshot, NaN where a market
+    has no row on a date. Rows follow the sorted snapshot dates and columns
+    follow `markets`.
+    """
+    required = {"date", "city", "sector", "avg_per_m2_eur"}
+    if historical_data.empty or not required.issubset(historical_data.columns):
+        return empty_price_panel()
+
+    data = pd.DataFrame(
+        {
+            "date": as_datetime(historical_data["date"]),
+            "city": historical_data["city"],
+            "sector": historical_data["sector"],
+            "avg_per_m2_eur": as_numeric(historical_data["avg_per_m2_eur"]),
+        }
+    )
+    has_listings = "listings" in historical_data.columns
+    if has_listings:
+        data["listings"] = as_numeric(historical_data["listings"])
+    data = data.dropna(subset=["date", "city", "avg_per_m2_eur"])
+    data = data.drop_duplicates(["date", "city", "sector"], keep="last")
+    if data.empty:
+        return empty_price_panel()
+
+    date_codes, dates = pd.factorize(data["date"], sort=True)
+    markets = data.groupby(["city", "sector"], observed=True, dropna=False)
+    market_codes = markets.ngroup().to_numpy()
+    shape = (len(dates), markets.ngroups)
+
+    def matrix(column: str) -> np.ndarray:
+        values = np.full(shape, np.nan)
+        values[date_codes, market_codes] = data[column].to_numpy(dtype="float64")
+        return values
+
+    return {
+        "dates": pd.DatetimeIndex(dates),
+        "markets": markets.size().index.to_frame(index=False),
+        "price": matrix("avg_per_m2_eur"),
+        "listings": matrix("listings") if has_listings else None,
+    }
+
+
+def build_price_movement(
+    panel: dict,
+    lags_days: Iterable[int] = MOVEMENT_LAGS_DAYS,
+    dates: pd.DatetimeIndex | None = None,
+) -> pd.DataFrame:
+    """
+    Price change of every market on every snapshot date, or only on `dates`,
+    against the closest snapshot at least `lag` days earlier, for each lag.
+    Markets missing from either snapshot are left out.
+    """
+    snapshot_dates = panel["dates"].to_numpy()
+    rows = (
+        np.arange(len(snapshot_dates))
+        if dates is None
+        else panel["dates"].get_indexer(dates)
+    )
+    listings = panel["listings"]
+    frames = []
+    for lag in lags_days:
+        baseline = (
+            np.searchsorted(
+                snapshot_dates,
+                snapshot_dates[rows] - np.timedelta64(lag, "D"),
+                side="right",
+            )
+            - 1
+        )
+        latest_rows, baseline_rows = rows[baseline >= 0], baseline[baseline >= 0]
+        latest_price = panel["price"][latest_rows]
+        baseline_price = panel["price"][baseline_rows]
+        with np.errstate(invalid="ignore"):
+            comparable = (baseline_price > 0) & ~np.isnan(latest_price)
+        positions, columns = np.nonzero(comparable)
+        latest_rows, baseline_rows = latest_rows[positions], baseline_rows[positions]
+
+        markets = panel["markets"].iloc[columns]
+        values = {
+            "lag_days": np.full(len(columns), lag),
+            "city": markets["city"].to_numpy(),
+            "sector": markets["sector"].to_numpy(),
+            "latest_avg_per_m2_eur": latest_price[positions, columns],
+            "baseline_avg_per_m2_eur": baseline_price[positions, columns],
+        }
+        if listings is not None:
+            values["latest_listings"] = listings[latest_rows, columns]
+            values["baseline_listings"] = listings[baseline_rows, columns]
+        values["change_percent"] = (
+            (values["latest_avg_per_m2_eur"] - values["baseline_avg_per_m2_eur"])
+            / values["baseline_avg_per_m2_eur"]
+            * 100
+        )
+        values["latest_date"] = snapshot_dates[latest_rows]
+        values["baseline_date"] = snapshot_dates[baseline_rows]
+        values["days_between"] = (
+            values["latest_date"] - values["baseline_date"]
+        ) // np.timedelta64(1, "D")
+        frames.append(pd.DataFrame(values))
+    if not frames:
+        return pd.DataFrame()
+    return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
 
 
 def build_weekly_price_movement(
-    historical_data: pd.DataFrame,
+    movement: pd.DataFrame,
     visible_markets: pd.DataFrame,
+    lag_days: int = 7,
 ) -> pd.DataFrame:
-    """Compare the latest sale snapshot with a comparable earlier snapshot."""
-    history_required = {"date", "city", "sector", "avg_per_m2_eur"}
-    market_required = {"city", "sector"}
+    """
+    The `lag_days` rows of `build_price_movement` for the visible markets, on
+    the latest date any of them can be compared.
+    """
     if (
-        historical_data.empty
+        movement.empty
         or visible_markets.empty
-        or not history_required.issubset(historical_data.columns)
-        or not market_required.issubset(visible_markets.columns)
+        or not {"city", "sector"}.issubset(visible_markets.columns)
     ):
         return pd.DataFrame()
 
-    markets = visible_markets[["city", "sector"]].drop_duplicates()
-    history = historical_data.copy()
-    history["date"] = pd.to_datetime(history["date"], errors="coerce")
-    history["avg_per_m2_eur"] = pd.to_numeric(
-        history["avg_per_m2_eur"], errors="coerce"
-    )
-    if "listings" in history.columns:
-        history["listings"] = pd.to_numeric(history["listings"], errors="coerce")
-    history = history.dropna(subset=["date", "city", "avg_per_m2_eur"])
-    history = history.merge(markets, on=["city", "sector"], how="inner")
-    if history.empty:
-        return pd.DataFrame()
-
-    history = (
-        history.sort_values(["date", "city", "sector"])
-        .drop_duplicates(["date", "city", "sector"], keep="last")
-        .copy()
-    )
-    latest_date = history["date"].max()
-    baseline_candidates = history[
-        history["date"] <= latest_date - pd.Timedelta(7, unit="D")
-    ]
-    if baseline_candidates.empty:
+    lagged = movement["lag_days"].to_numpy() == lag_days
+    if not lagged.any():
         return pd.DataFrame()
-    baseline_date = baseline_candidates["date"].max()
-
-    latest_columns = ["city", "sector", "avg_per_m2_eur"]
-    baseline_columns = ["city", "sector", "avg_per_m2_eur"]
-    latest_rename = {"avg_per_m2_eur": "latest_avg_per_m2_eur"}
-    baseline_rename = {"avg_per_m2_eur": "baseline_avg_per_m2_eur"}
-    if "listings" in history.columns:
-        latest_columns.append("listings")
-        baseline_columns.append("listings")
-        latest_rename["listings"] = "latest_listings"
-        baseline_rename["listings"] = "baseline_listings"
-
-    latest = history[history["date"] == latest_date][latest_columns].rename(
-        columns=latest_rename
-    )
-    baseline = history[history["date"] == baseline_date][baseline_columns].rename(
-        columns=baseline_rename
-    )
-    movement = latest.merge(baseline, on=["city", "sector"], how="inner")
-    movement = movement[movement["baseline_avg_per_m2_eur"] > 0].copy()
-    if movement.empty:
-        return movement
-
-    movement["change_percent"] = (
-        (movement["latest_avg_per_m2_eur"] - movement["baseline_avg_per_m2_eur"])
-        / movement["baseline_avg_per_m2_eur"]
-        * 100
-    )
-    movement["latest_date"] = latest_date
-    movement["baseline_date"] = baseline_date
-    movement["days_between"] = (latest_date - baseline_date).days
-    return movement.sort_values("change_percent")
+    visible_keys = pd.MultiIndex.from_frame(visible_markets[["city", "sector"]])
+    # The newest date usually holds visible markets already, so only its few
+    # rows are matched against the filter; otherwise fall back to every date.
+    latest_dates = movement["latest_date"].to_numpy()
+    newest = lagged & (latest_dates == latest_dates[lagged].max())
+    for candidates in (newest, lagged):
+        rows = movement[candidates]
+        visible = pd.MultiIndex.from_frame(rows[["city", "sector"]]).isin(visible_keys)
+        if visible.any():
+            rows = rows[visible]
+            rows = rows[rows["latest_date"] == rows["latest_date"].max()]
+            return rows.drop(columns="lag_days").sort_values("change_percent")
+    return pd.DataFrame()
 
 
 def build_weekly_city_price_movement(
-    historical_data: pd.DataFrame,
+    movement: pd.DataFrame,
     visible_markets: pd.DataFrame,
+    lag_days: int = 7,
 ) -> pd.DataFrame:
     """Build comparable listing-weighted weekly asking-price movement by city."""
-    movement = build_weekly_price_movement(historical_data, visible_markets)
-    required = {
-        "city",
-        "sector",
-        "latest_avg_per_m2_eur",
-        "baseline_avg_per_m2_eur",
-        "latest_listings",
-        "baseline_listings",
-    }
-    if movement.empty or not required.issubset(movement.columns):
+    movement = build_weekly_price_movement(movement, visible_markets, lag_days)
+    if movement.empty or "latest_listings" not in movement.columns:
         return pd.DataFrame()
 
-    data = movement.copy()
-    numeric_columns = [
-        "latest_avg_per_m2_eur",
-        "baseline_avg_per_m2_eur",
-        "latest_listings",
-        "baseline_listings",
+    data = movement[
+        movement["sector"].notna()
+        & (movement["latest_avg_per_m2_eur"] > 0)
+        & (movement["latest_listings"] > 0)
+        & (movement["baseline_listings"] > 0)
     ]
-    for column in numeric_columns:
-        data[column] = pd.to_numeric(data[column], errors="coerce")
-    data = data.dropna(subset=["city", "sector", *numeric_columns])
-    data = data[
-        (data["latest_avg_per_m2_eur"] > 0)
-        & (data["baseline_avg_per_m2_eur"] > 0)
-        & (data["latest_listings"] > 0)
-        & (data["baseline_listings"] > 0)
-    ].copy()
     if data.empty:
         return pd.DataFrame()
 
-    data["latest_weighted_value"] = (
-        data["latest_avg_per_m2_eur"] * data["latest_listings"]
-    )
-    data["baseline_weighted_value"] = (
-        data["baseline_avg_per_m2_eur"] * data["baseline_listings"]
-    )
-    city_movement = (
-        data.groupby("city", as_index=False, observed=True)
-        .agg(
-            comparable_sectors=("sector", "nunique"),
-            latest_listings=("latest_listings", "sum"),
-            baseline_listings=("baseline_listings", "sum"),
-            latest_weighted_value=("latest_weighted_value", "sum"),
-            baseline_weighted_value=("baseline_weighted_value", "sum"),
-            latest_date=("latest_date", "first"),
-            baseline_date=("baseline_date", "first"),
-            days_between=("days_between", "first"),
-        )
-        .copy()
+    grouped = pd.DataFrame(
+        {
+            "city": data["city"],
+            "latest_listings": data["latest_listings"],
+            "baseline_listings": data["baseline_listings"],
+            "latest_weighted_value": (
+                data["latest_avg_per_m2_eur"] * data["latest_listings"]
+            ),
+            "baseline_weighted_value": (
+                data["baseline_avg_per_m2_eur"] * data["baseline_listings"]
+            ),
+        }
+    ).groupby("city", observed=True)
+    city_movement = grouped.sum()
+    city_movement.insert(
+        0, "comparable_sectors", data.groupby("city", observed=True)["sector"].nunique()
     )
+    first = data.iloc[0]
+    city_movement["latest_date"] = first["latest_date"]
+    city_movement["baseline_date"] = first["baseline_date"]
+    city_movement["days_between"] = first["days_between"]
     city_movement["latest_avg_per_m2_eur"] = (
         city_movement["latest_weighted_value"] / city_movement["latest_listings"]
     )
@@ -396,46 +747,176 @@ def build_weekly_city_price_movement(
         / city_movement["baseline_avg_per_m2_eur"]
         * 100
     )
-    return city_movement.sort_values("change_percent")
+    return city_movement.reset_index().sort_values("change_percent")
 
 
-def apply_daily_occupancy_assumption(
+# Occupancy steps, in percent, offered by the daily-rent occupancy slider.
+OCCUPANCY_STEPS_PERCENT = tuple(range(20, 95, 5))
+DAILY_YIELD_COLUMNS = (
+    "annual_rent_daily_60pct",
+    "avg_sale_price_eur",
+    "yield_daily_percent",
+)
+DAILY_RETURN_COLUMNS = (
+    "annual_rent_monthly",
+    "annual_rent_daily_60pct",
+    "avg_sale_price_eur",
+    "sale_listings",
+    "total_rent_listings",
+)
+
+
+def numeric_values(data: pd.DataFrame, column: str) -> np.ndarray:
+    if column not in data.columns:
+        return np.full(len(data), np.nan)
+    return as_numeric(data[column]).to_numpy(dtype="float64", na_value=np.nan)
+
+
+def build_occupancy_scenarios(
     yield_data: pd.DataFrame,
+    steps: Iterable[int] = OCCUPANCY_STEPS_PERCENT,
+) -> dict:
+    """
+    Daily-rent returns at every occupancy step at once, re-scaled from the
+    public 60% occupancy model. Matrices have one row per step and one column
+    per `yield_data` row; markets without a positive daily rent and sale
+    price are NaN. Monthly yield and break-even occupancy do not depend on
+    the step, and `comparable` marks the rows the return comparison keeps.
+    """
+    steps = tuple(steps)
+    # Non-positive rents and prices become NaN, so nothing divides by zero.
+    daily_60 = numeric_values(yield_data, "annual_rent_daily_60pct")
+    daily_60 = np.where(daily_60 > 0, daily_60, np.nan)
+    sale_price = numeric_values(yield_data, "avg_sale_price_eur")
+    sale_price = np.where(sale_price > 0, sale_price, np.nan)
+    monthly = numeric_values(yield_data, "annual_rent_monthly")
+    full_occupancy_rent = np.where(np.isnan(sale_price), np.nan, daily_60 / 0.60)
+    annual_rent_daily = (
+        full_occupancy_rent * np.asarray(steps, dtype="float64")[:, None] / 100
+    )
+    yield_daily = annual_rent_daily / sale_price * 100
+    monthly_yield = monthly / sale_price * 100
+
+    comparable = np.zeros(len(yield_data), dtype=bool)
+    if {"city", "sector", *DAILY_RETURN_COLUMNS}.issubset(yield_data.columns):
+        comparable = (
+            yield_data[["city", "sector"]].notna().all(axis=1).to_numpy()
+            & (monthly > 0)
+            & ~np.isnan(daily_60)
+            & ~np.isnan(sale_price)
+            & ~np.isnan(numeric_values(yield_data, "sale_listings"))
+            & ~np.isnan(numeric_values(yield_data, "total_rent_listings"))
+        )
+    return {
+        "yield_data": yield_data,
+        "steps": steps,
+        "annual_rent_daily": annual_rent_daily,
+        "yield_daily": yield_daily,
+        "monthly_yield": monthly_yield,
+        "daily_advantage": yield_daily - monthly_yield,
+        "break_even": monthly / (daily_60 / 0.60) * 100,
+        "comparable": comparable,
+    }
+
+
+def occupancy_row(scenarios: dict, daily_occupancy_percent: int) -> tuple[dict, int]:
+    """The grid row of one occupancy; steps outside the grid get their own row."""
+    if daily_occupancy_percent not in scenarios["steps"]:
+        scenarios = build_occupancy_scenarios(
+            scenarios["yield_data"], (daily_occupancy_percent,)
+        )
+    return scenarios, scenarios["steps"].index(daily_occupancy_percent)
+
+
+def occupancy_scenario(scenarios: dict, daily_occupancy_percent: int) -> pd.DataFrame:
+    """The yield rows with daily-rent metrics at one occupancy step."""
+    yield_data = scenarios["yield_data"]
+    if (
+        yield_data.empty
+        or not set(DAILY_YIELD_COLUMNS).issubset(yield_data.columns)
+        or not 0 < daily_occupancy_percent <= 100
+    ):
+        return yield_data
+
+    scenarios, row = occupancy_row(scenarios, daily_occupancy_percent)
+    # A shallow copy: replaced and added columns never reach `yield_data`.
+    data = yield_data.copy(deep=False)
+    for column in DAILY_YIELD_COLUMNS:
+        data[column] = as_numeric(data[column])
+    data["annual_rent_daily_eur"] = scenarios["annual_rent_daily"][row]
+    data["yield_daily_percent"] = scenarios["yield_daily"][row]
+    return data
+
+
+def occupancy_return_scenario(
+    scenarios: dict,
     daily_occupancy_percent: int,
 ) -> pd.DataFrame:
-    """Apply the selected occupancy to daily-rent yield metrics."""
-    required = {
-        "annual_rent_daily_60pct",
-        "avg_sale_price_eur",
-        "yield_daily_percent",
-    }
+    """Daily versus monthly gross return of comparable markets at one step."""
+    yield_data = scenarios["yield_data"]
     if (
         yield_data.empty
-        or not required.issubset(yield_data.columns)
+        or not {"city", "sector", *DAILY_RETURN_COLUMNS}.issubset(yield_data.columns)
         or not 0 < daily_occupancy_percent <= 100
     ):
-        return yield_data.copy()
+        return pd.DataFrame()
+
+    scenarios, row = occupancy_row(scenarios, daily_occupancy_percent)
+    comparable = scenarios["comparable"]
+    data = occupancy_scenario(scenarios, daily_occupancy_percent).take(
+        np.flatnonzero(comparable)
+    )
+    if data.empty:
+        return data
+    for column in DAILY_RETURN_COLUMNS:
+        data[column] = as_numeric(data[column])
+
+    data["monthly_gross_yield_percent"] = scenarios["monthly_yield"][comparable]
+    data["daily_gross_yield_percent"] = data["yield_daily_percent"]
+    data["daily_advantage_pp"] = scenarios["daily_advantage"][row][comparable]
+    data["occupancy_to_match_monthly_percent"] = scenarios["break_even"][comparable]
+    return data.sort_values("daily_advantage_pp", ascending=False)
 
-    data = yield_data.copy()
-    for column in required:
-        data[column] = pd.to_numeric(data[column], errors="coerce")
-    valid = (data["annual_rent_daily_60pct"] > 0) & (
-        data["avg_sale_price_eur"] > 0
+
+def occupancy_scenario_table(scenarios: dict) -> pd.DataFrame:
+    """
+    Every comparable market at every occupancy step, one row per market and
+    step: the rows behind the sensitivity chart and the scenario export.
+    """
+    comparable = scenarios["comparable"]
+    if not comparable.any():
+        return pd.DataFrame()
+
+    markets = scenarios["yield_data"].loc[
+        comparable, ["city", "sector", "sale_listings", "total_rent_listings"]
+    ]
+    steps = len(scenarios["steps"])
+    table = markets.iloc[np.tile(np.arange(len(markets)), steps)].reset_index(
+        drop=True
     )
-    data["annual_rent_daily_eur"] = pd.NA
-    data["yield_daily_percent"] = pd.NA
-    data.loc[valid, "annual_rent_daily_eur"] = (
-        data.loc[valid, "annual_rent_daily_60pct"]
-        / 0.60
-        * daily_occupancy_percent
-        / 100
+    table.insert(0, "occupancy_percent", np.repeat(scenarios["steps"], len(markets)))
+    table["monthly_gross_yield_percent"] = np.tile(
+        scenarios["monthly_yield"][comparable], steps
     )
-    data.loc[valid, "yield_daily_percent"] = (
-        data.loc[valid, "annual_rent_daily_eur"]
-        / data.loc[valid, "avg_sale_price_eur"]
-        * 100
+    table["daily_gross_yield_percent"] = scenarios["yield_daily"][
+        :, comparable
+    ].ravel()
+    table["daily_advantage_pp"] = scenarios["daily_advantage"][:, comparable].ravel()
+    table["occupancy_to_match_monthly_percent"] = np.tile(
+        scenarios["break_even"][comparable], steps
+    )
+    return table
+
+
+def apply_daily_occupancy_assumption(
+    yield_data: pd.DataFrame,
+    daily_occupancy_percent: int,
+) -> pd.DataFrame:
+    """Apply the selected occupancy to daily-rent yield metrics."""
+    return occupancy_scenario(
+        build_occupancy_scenarios(yield_data, (daily_occupancy_percent,)),
+        daily_occupancy_percent,
     )
-    return data
 
 
 def build_daily_vs_monthly_return(
@@ -443,51 +924,240 @@ def build_daily_vs_monthly_return(
     daily_occupancy_percent: int,
 ) -> pd.DataFrame:
     """Recalculate daily gross return from the public 60% occupancy model."""
-    required = {
-        "city",
-        "sector",
-        "annual_rent_monthly",
-        "annual_rent_daily_60pct",
-        "avg_sale_price_eur",
-        "sale_listings",
-        "total_rent_listings",
+    return occupancy_return_scenario(
+        build_occupancy_scenarios(yield_data, (daily_occupancy_percent,)),
+        daily_occupancy_percent,
+    )
+
+
+# Period aliases of the history rollup grains, labelled by their first day.
+# "W-SUN" weeks run Monday to Sunday, like Postgres `date_trunc('week')`.
+HISTORY_GRAIN_PERIODS = {"week": "W-SUN", "month": "M"}
+
+
+def rollup_history(rows: pd.DataFrame, grain: str) -> pd.DataFrame:
+    """
+    Rolls daily city-sector sale snapshots up to weekly or monthly rows, the
+    same rows `api_estate_history_rollup` returns: the average daily listing
+    count and the listing-weighted price per m2 of each period.
+    """
+    columns = ["date", "city", "sector", "listings", "avg_per_m2_eur"]
+    if grain == "day":
+        return rows
+    if rows.empty:
+        return pd.DataFrame(columns=columns)
+
+    data = rows[(rows["listings"] > 0) & rows["avg_per_m2_eur"].notna()]
+    periods = as_datetime(data["date"]).dt.to_period(HISTORY_GRAIN_PERIODS[grain])
+    totals = (
+        data.assign(
+            date=periods.dt.start_time,
+            weighted_price=data["avg_per_m2_eur"] * data["listings"],
+        )
+        .groupby(["date", "city", "sector"], observed=True)
+        .agg(
+            listings=("listings", "sum"),
+            days=("listings", "size"),
+            weighted_price=("weighted_price", "sum"),
+        )
+    )
+    rollup = pd.DataFrame(
+        {
+            "listings": (totals["listings"] / totals["days"]).round(),
+            "avg_per_m2_eur": totals["weighted_price"] / totals["listings"],
+        }
+    )
+    return rollup.reset_index()[columns]
+
+
+# Windows, in days, of the listing-weighted rolling price indices.
+ROLLING_INDEX_WINDOWS_DAYS = (7, 28)
+
+
+def new_rolling_index(window_days: int) -> dict:
+    return {
+        "window_days": window_days,
+        "markets": {},
+        "cities": [],
+        "sectors": [],
+        "weighted_price": np.zeros(0),
+        "listings": np.zeros(0),
+        "days": OrderedDict(),
+        "rows": OrderedDict(),
+        "frame": None,
     }
-    if (
-        yield_data.empty
-        or not required.issubset(yield_data.columns)
-        or not 0 < daily_occupancy_percent <= 100
-    ):
-        return pd.DataFrame()
 
-    data = apply_daily_occupancy_assumption(yield_data, daily_occupancy_percent)
-    numeric_columns = [
-        "annual_rent_monthly",
-        "annual_rent_daily_60pct",
-        "avg_sale_price_eur",
-        "sale_listings",
-        "total_rent_listings",
-    ]
-    for column in numeric_columns:
-        data[column] = pd.to_numeric(data[column], errors="coerce")
-    data = data.dropna(subset=["city", "sector", *numeric_columns])
-    data = data[
-        (data["annual_rent_monthly"] > 0)
-        & (data["annual_rent_daily_60pct"] > 0)
-        & (data["avg_sale_price_eur"] > 0)
-    ].copy()
-    if data.empty:
-        return data
 
-    data["monthly_gross_yield_percent"] = (
-        data["annual_rent_monthly"] / data["avg_sale_price_eur"] * 100
+def shift_rolling_sums(index: dict, day: tuple, sign: int) -> None:
+    positions, weighted_price, listings = day
+    index["weighted_price"][positions] += sign * weighted_price
+    index["listings"][positions] += sign * listings
+
+
+def market_positions(index: dict, cities: pd.Index, sectors: pd.Index) -> np.ndarray:
+    """Running-sum positions of city-sector markets; new markets are appended."""
+    markets = index["markets"]
+    positions = np.empty(len(cities), dtype=np.int64)
+    for row, market in enumerate(zip(cities, sectors, strict=True)):
+        position = markets.get(market)
+        if position is None:
+            position = markets[market] = len(index["cities"])
+            index["cities"].append(market[0])
+            index["sectors"].append(market[1])
+        positions[row] = position
+
+    missing = len(index["cities"]) - len(index["listings"])
+    if missing:
+        index["weighted_price"] = np.append(index["weighted_price"], np.zeros(missing))
+        index["listings"] = np.append(index["listings"], np.zeros(missing))
+    return positions
+
+
+def advance_rolling_index(
+    index: dict,
+    rows: pd.DataFrame,
+    since: pd.Timestamp | str | None = None,
+) -> dict:
+    """
+    Adds daily city-sector rows to a rolling index in date order. Running
+    sums of listings x price and listings are kept per market: each new day
+    is added and the days leaving the window are subtracted, so a day costs
+    O(markets) however long the history is. Indexed days from `since` onward
+    are replaced first; `since` may not be earlier than the last indexed day.
+    """
+    days = index["days"]
+    if since is not None and days:
+        since = pd.Timestamp(since)
+        if since < next(reversed(days)):
+            raise ValueError("A rolling index can only replace its last day.")
+        for date in [date for date in days if date >= since]:
+            shift_rolling_sums(index, days.pop(date), -1)
+            index["rows"].pop(date, None)
+        index["frame"] = None
+    if rows.empty:
+        return index
+
+    data = rows[(rows["listings"] > 0) & rows["avg_per_m2_eur"].notna()]
+    if data.empty:
+        return index
+    daily = (
+        pd.DataFrame(
+            {
+                "date": as_datetime(data["date"]),
+                "city": data["city"],
+                "sector": data["sector"],
+                "weighted_price": data["avg_per_m2_eur"] * data["listings"],
+                "listings": data["listings"].astype("float64"),
+            }
+        )
+        .groupby(["date", "city", "sector"], observed=True)
+        .sum()
     )
-    data["daily_gross_yield_percent"] = data["yield_daily_percent"]
-    data["daily_advantage_pp"] = (
-        data["daily_gross_yield_percent"] - data["monthly_gross_yield_percent"]
+    positions = market_positions(
+        index,
+        daily.index.get_level_values("city"),
+        daily.index.get_level_values("sector"),
     )
-    data["occupancy_to_match_monthly_percent"] = (
-        data["annual_rent_monthly"]
-        / (data["annual_rent_daily_60pct"] / 0.60)
-        * 100
+    weighted_price = daily["weighted_price"].to_numpy()
+    listings = daily["listings"].to_numpy()
+    dates = daily.index.get_level_values("date")
+    starts = np.flatnonzero(np.r_[True, dates[1:] != dates[:-1]])
+    window = pd.Timedelta(days=index["window_days"])
+    for start, end in zip(starts, [*starts[1:], len(dates)], strict=True):
+        date = dates[start]
+        day = (
+            positions[start:end],
+            weighted_price[start:end],
+            listings[start:end],
+        )
+        days[date] = day
+        shift_rolling_sums(index, day, 1)
+        while next(iter(days)) <= date - window:
+            shift_rolling_sums(index, days.popitem(last=False)[1], -1)
+
+        current = day[0]
+        window_listings = index["listings"][current]
+        index["rows"][date] = (
+            current,
+            window_listings,
+            index["weighted_price"][current] / window_listings,
+        )
+    index["frame"] = None
+    return index
+
+
+def trim_rolling_index(index: dict, cutoff: pd.Timestamp | str) -> None:
+    """Drops index rows dated before `cutoff`; the running sums are kept."""
+    cutoff = pd.Timestamp(cutoff)
+    for date in [date for date in index["rows"] if date < cutoff]:
+        del index["rows"][date]
+        index["frame"] = None
+
+
+def rolling_index_frame(index: dict) -> pd.DataFrame:
+    """
+    The index as history rows: `listings` sums the window and
+    `avg_per_m2_eur` is the listing-weighted price over the window.
+    """
+    if index["frame"] is not None:
+        return index["frame"]
+
+    rows = index["rows"]
+    if rows:
+        positions, listings, prices = (
+            np.concatenate(parts) for parts in zip(*rows.values(), strict=True)
+        )
+        dates = np.repeat(
+            pd.DatetimeIndex(list(rows)), [len(day[0]) for day in rows.values()]
+        )
+    else:
+        positions = np.zeros(0, dtype=np.int64)
+        listings = prices = np.zeros(0)
+        dates = pd.DatetimeIndex([])
+    index["frame"] = pd.DataFrame(
+        {
+            "date": dates,
+            "city": np.asarray(index["cities"], dtype=object)[positions],
+            "sector": np.asarray(index["sectors"], dtype=object)[positions],
+            "listings": listings,
+            "avg_per_m2_eur": prices,
+        }
     )
-    return data.sort_values("daily_advantage_pp", ascending=False)
+    return index["frame"]
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, target: int) -> np.ndarray:
+    """
+    Positions kept by largest-triangle-three-buckets downsampling of a series
+    sorted by `x`. The first and last points are always kept; each bucket in
+    between keeps the point that spans the largest triangle with the point
+    kept before it and the mean of the next bucket.
+    """
+    size = len(x)
+    if target < 3 or size <= target:
+        return np.arange(size)
+
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    edges = np.linspace(1, size - 1, target - 1).astype(np.int64)
+    counts = np.diff(np.append(edges, size))
+    mean_x = (np.add.reduceat(x, edges) / counts).tolist()
+    mean_y = (np.add.reduceat(y, edges) / counts).tolist()
+    # Buckets hold a handful of points, so plain floats beat per-bucket arrays.
+    xs, ys, bounds = x.tolist(), y.tolist(), edges.tolist()
+    kept = [0]
+    previous_x, previous_y = xs[0], ys[0]
+    for bucket in range(target - 2):
+        next_x, next_y = mean_x[bucket + 1], mean_y[bucket + 1]
+        best, best_area = bounds[bucket], -1.0
+        for position in range(bounds[bucket], bounds[bucket + 1]):
+            area = abs(
+                (previous_x - next_x) * (ys[position] - previous_y)
+                - (previous_x - xs[position]) * (next_y - previous_y)
+            )
+            if area > best_area:
+                best, best_area = position, area
+        kept.append(best)
+        previous_x, previous_y = xs[best], ys[best]
+    kept.append(size - 1)
+    return np.array(kept, dtype=np.int64)
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from dashboard_components import format_number, format_number_series
+
+ROWS = 20_000
+ROUNDS = 15
+
+
+def table_values() -> pd.Series:
+    """Prices per m2 and total prices, the shape of the sector table columns."""
+    rng = np.random.default_rng(11)
+    per_m2 = rng.uniform(400, 3_000, ROWS)
+    return pd.Series(per_m2 * rng.uniform(1, 120, ROWS))
+
+
+def median_ms(format_values, values: pd.Series) -> float:
+    timings = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        format_values(values)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def main() -> int:
+    values = table_values()
+    for decimals in (0, 1):
+        per_value = median_ms(
+            lambda series, decimals=decimals: series.map(
+                lambda value: format_number(value, decimals)
+            ),
+            values,
+        )
+        vectorized = median_ms(
+            lambda series, decimals=decimals: format_number_series(series, decimals),
+            values,
+        )
+        print(
+            f"{ROWS} rows, {decimals} decimals: map(format_number)={per_value:.1f} ms "
+            f"format_number_series={vectorized:.1f} ms"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
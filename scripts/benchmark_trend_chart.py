@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from dashboard_charts import (
+    apply_common_chart_style,
+    build_sector_trend_figure,
+)
+from dashboard_components import format_number
+from dashboard_theme import THEME, TREND_COLORS
+from dashboard_transforms import sector_names
+
+SECTORS = 8
+DAYS = 90
+LONG_DAYS = 730
+ROUNDS = 30
+
+
+def trend_rows(days: int = DAYS) -> pd.DataFrame:
+    """A daily history for eight sectors, shaped like the trend input."""
+    rng = np.random.default_rng(7)
+    dates = pd.date_range(end="2026-10-16", periods=days, freq="D")
+    frame = pd.DataFrame(
+        {
+            "date": np.tile(dates, SECTORS),
+            "sector": np.repeat([f"Sector {i}" for i in range(SECTORS)], days),
+            "avg_per_m2_eur": 1_200 + rng.normal(0, 40, SECTORS * days).cumsum(),
+        }
+    )
+    return frame.sort_values("date")
+
+
+def per_sector_label_figure(plot: pd.DataFrame):
+    """The previous build: px.line plus one add_scatter per end label."""
+    plot = plot.copy()
+    plot["sector"] = sector_names(plot["sector"])
+    plot["PriceLabel"] = plot["avg_per_m2_eur"].map(format_number)
+    color_map = {
+        sector: TREND_COLORS[index % len(TREND_COLORS)]
+        for index, sector in enumerate(plot["sector"].drop_duplicates())
+    }
+    fig = px.line(
+        plot,
+        x="date",
+        y="avg_per_m2_eur",
+        color="sector",
+        color_discrete_map=color_map,
+        custom_data=["PriceLabel"],
+    )
+    fig.update_traces(line_width=2.2)
+    last_points = plot.groupby("sector", as_index=False).tail(1)
+    for _, row in last_points.sort_values("avg_per_m2_eur").iterrows():
+        fig.add_scatter(
+            x=[row["date"]],
+            y=[row["avg_per_m2_eur"]],
+            mode="markers+text",
+            marker={"size": 6, "color": color_map[row["sector"]]},
+            text=[f"{row['sector']} {format_number(row['avg_per_m2_eur'])}"],
+            textposition="middle right",
+            textfont={"size": 12, "color": THEME["chart_label"]},
+            hoverinfo="skip",
+            showlegend=False,
+            cliponaxis=False,
+        )
+    return apply_common_chart_style(fig, height=500, show_legend=False)
+
+
+def median_ms(build, plot: pd.DataFrame) -> float:
+    timings = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        build(plot)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def main() -> int:
+    plot = trend_rows()
+    for name, build in (
+        ("per-sector labels", per_sector_label_figure),
+        ("single label trace", build_sector_trend_figure),
+    ):
+        traces = len(build(plot).data)
+        print(f"{name}: traces={traces} median={median_ms(build, plot):.1f} ms")
+
+    long_plot = trend_rows(LONG_DAYS)
+    for name, build in (
+        ("full history, SVG", per_sector_label_figure),
+        ("downsampled, WebGL", build_sector_trend_figure),
+    ):
+        fig = build(long_plot)
+        points = sum(len(trace.x) for trace in fig.data)
+        print(
+            f"{name} ({len(long_plot)} rows): points={points} "
+            f"json={len(fig.to_json()) / 1024:.0f} KB "
+            f"median={median_ms(build, long_plot):.1f} ms"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,64 @@
+-- Add a read-only RPC that returns weekly or monthly rollups of the daily
+-- sale history, so multi-year trend windows do not load every daily row.
+--
+-- public.api_estate_history_rollup(p_grain, p_since, p_cities) groups
+-- public.api_estate_daily rows dated p_since or later by date_trunc(p_grain)
+-- (weeks start on Monday), city, and sector. An empty or null city array
+-- means no filter. Each row is dated by the first day of its period and has:
+-- - listings: the average daily listing count, rounded;
+-- - avg_per_m2_eur: the listing-weighted average price per m2.
+--
+-- Requires:
+-- - public.api_estate_daily already exists.
+--
+-- The function runs as the caller, so the table's public read policy still
+-- applies. Call it from PostgREST with `.rpc("api_estate_history_rollup", ...)`.
+
+begin;
+
+create or replace function public.api_estate_history_rollup(
+    p_grain text,
+    p_since date,
+    p_cities text[] default null
+)
+returns table (
+    date date,
+    city text,
+    sector text,
+    listings bigint,
+    avg_per_m2_eur numeric
+)
+language sql
+stable
+security invoker
+set search_path to 'public', 'pg_temp'
+as $function$
+select
+    date_trunc(p_grain, d.date)::date,
+    d.city,
+    d.sector,
+    round(avg(d.listings))::bigint,
+    sum(d.avg_per_m2_eur * d.listings) / sum(d.listings)
+from public.api_estate_daily d
+where p_grain in ('week', 'month')
+  and d.date >= p_since
+  and d.listings > 0
+  and d.avg_per_m2_eur is not null
+  and (coalesce(cardinality(p_cities), 0) = 0 or d.city = any(p_cities))
+group by 1, 2, 3
+order by 1, 2, 3
+$function$;
+
+revoke all on function public.api_estate_history_rollup(text, date, text[])
+    from public;
+grant execute on function public.api_estate_history_rollup(text, date, text[])
+    to anon, authenticated, service_role;
+
+comment on function public.api_estate_history_rollup(text, date, text[]) is
+    'Weekly or monthly listing-weighted rollups of the daily sale history.';
+
+commit;
+
+-- Smoke-test after applying:
+--
+-- select * from public.api_estate_history_rollup('month', current_date - 1826, null);
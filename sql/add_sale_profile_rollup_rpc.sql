@@ -0,0 +1,146 @@
+-- Add a read-only RPC that returns the sale-profile rollups the dashboard
+-- otherwise computes in pandas from raw segment rows.
+--
+-- public.api_sale_profile_rollup(p_cities, p_rooms, p_area_bands,
+-- p_min_listings) filters public.api_estate_segments_current to the selected
+-- cities, room groups, and area bands. An empty or null array means no filter.
+-- It returns listing-weighted averages at four levels, one row per group:
+-- - market: one row per date, city, and sector with at least p_min_listings;
+-- - rooms_group and area_band: segment rows inside those markets;
+-- - city: the markets rolled up per city.
+-- Rows are ordered, so PostgREST callers can page them with `.range()`.
+--
+-- Requires:
+-- - public.api_estate_segments_current already exists.
+--
+-- The function runs as the caller, so the table's public read policy still
+-- applies. Call it from PostgREST with `.rpc("api_sale_profile_rollup", ...)`.
+
+begin;
+
+create or replace function public.api_sale_profile_rollup(
+    p_cities text[] default null,
+    p_rooms text[] default null,
+    p_area_bands text[] default null,
+    p_min_listings integer default 0
+)
+returns table (
+    level text,
+    date date,
+    city text,
+    sector text,
+    group_value text,
+    listings bigint,
+    avg_price_eur numeric,
+    avg_per_m2_eur numeric
+)
+language sql
+stable
+security invoker
+set search_path to 'public', 'pg_temp'
+as $function$
+with segments as (
+    select
+        date,
+        city,
+        sector,
+        rooms_group,
+        area_band,
+        listings,
+        avg_price_eur,
+        avg_per_m2_eur
+    from public.api_estate_segments_current
+    where (coalesce(cardinality(p_cities), 0) = 0 or city = any(p_cities))
+      and (coalesce(cardinality(p_rooms), 0) = 0 or rooms_group = any(p_rooms))
+      and (
+          coalesce(cardinality(p_area_bands), 0) = 0
+          or area_band = any(p_area_bands)
+      )
+),
+markets as (
+    select
+        date,
+        city,
+        sector,
+        sum(listings) as listings,
+        sum(avg_price_eur * listings) / sum(listings) as avg_price_eur,
+        sum(avg_per_m2_eur * listings) / sum(listings) as avg_per_m2_eur
+    from segments
+    where listings > 0
+      and avg_price_eur is not null
+      and avg_per_m2_eur is not null
+    group by date, city, sector
+    having sum(listings) >= p_min_listings
+),
+market_segments as (
+    select s.rooms_group, s.area_band, s.listings, s.avg_per_m2_eur
+    from segments s
+    join markets m
+      on m.date = s.date
+     and m.city = s.city
+     and m.sector = s.sector
+    where s.listings > 0
+      and s.avg_per_m2_eur is not null
+)
+select
+    'market'::text,
+    date,
+    city,
+    sector,
+    null::text,
+    listings::bigint,
+    avg_price_eur,
+    avg_per_m2_eur
+from markets
+union all
+select
+    'rooms_group'::text,
+    null::date,
+    null::text,
+    null::text,
+    rooms_group,
+    sum(listings)::bigint,
+    null::numeric,
+    sum(avg_per_m2_eur * listings) / sum(listings)
+from market_segments
+group by rooms_group
+union all
+select
+    'area_band'::text,
+    null::date,
+    null::text,
+    null::text,
+    area_band,
+    sum(listings)::bigint,
+    null::numeric,
+    sum(avg_per_m2_eur * listings) / sum(listings)
+from market_segments
+group by area_band
+union all
+select
+    'city'::text,
+    null::date,
+    city,
+    null::text,
+    null::text,
+    sum(listings)::bigint,
+    sum(avg_price_eur * listings) / sum(listings),
+    sum(avg_per_m2_eur * listings) / sum(listings)
+from markets
+group by city
+order by 1, 2, 3, 4, 5
+$function$;
+
+revoke all on function public.api_sale_profile_rollup(text[], text[], text[], integer)
+    from public;
+grant execute on function public.api_sale_profile_rollup(text[], text[], text[], integer)
+    to anon, authenticated, service_role;
+
+comment on function public.api_sale_profile_rollup(text[], text[], text[], integer) is
+    'Listing-weighted sale-profile rollups by market, rooms, area band, and city.';
+
+commit;
+
+-- Smoke-test after applying:
+--
+-- select * from public.api_sale_profile_rollup(array['Chisinau'], array['2'], null, 5);
@@ -0,0 +1,105 @@
+"""
+A Supabase client fake that runs the RPC function bodies in `sql/` on SQLite
+after a few dialect rewrites, for the rollup equivalence tests.
+"""
+
+import re
+import sqlite3
+from collections.abc import Iterable
+from pathlib import Path
+from types import SimpleNamespace
+
+import pandas as pd
+
+SQL_DIR = Path(__file__).resolve().parents[1] / "sql"
+# Postgres-only syntax -> SQLite equivalents for the parts the bodies use.
+SQLITE_REWRITES = (
+    (r"public\.", ""),
+    (r"::\w+", ""),
+    (r"coalesce\(cardinality\((p_\w+)\), 0\) = 0", r"(select count(*) from \1) = 0"),
+    (r"([\w.]+) = any\((p_\w+)\)", r"\1 in (select value from \2)"),
+)
+
+
+def sqlite_function_body(
+    sql_file: str,
+    scalar_params: Iterable[str] = (),
+    rewrites: Iterable[tuple[str, str]] = (),
+) -> str:
+    """
+    The body of the function in `sql/<sql_file>` as a SQLite query: scalar
+    params become named parameters and array params tables of one `value`
+    column. `rewrites` run after the shared ones.
+    """
+    source = (SQL_DIR / sql_file).read_text(encoding="utf-8")
+    body = source.split("as $function$", 1)[1].split("$function$;", 1)[0]
+    for pattern, replacement in (
+        *SQLITE_REWRITES,
+        *((rf"\b({param})\b", r":\1") for param in scalar_params),
+        *rewrites,
+    ):
+        body = re.sub(pattern, replacement, body)
+    return body
+
+
+class SQLiteRpcSupabase:
+    """Runs an RPC body on an in-memory copy of the table it reads."""
+
+    def __init__(
+        self,
+        sql_file: str,
+        table_name: str,
+        table: pd.DataFrame,
+        columns: Iterable[str],
+        array_params: Iterable[str] = (),
+        scalar_params: Iterable[str] = (),
+        rewrites: Iterable[tuple[str, str]] = (),
+    ) -> None:
+        self.body = sqlite_function_body(sql_file, scalar_params, rewrites)
+        self.table_name = table_name
+        self.table = table
+        self.columns = tuple(columns)
+        self.array_params = tuple(array_params)
+        self.scalar_params = tuple(scalar_params)
+        self.rpc_calls: list[tuple[str, dict]] = []
+        self.ranges: list[tuple[int, int]] = []
+
+    def rpc(self, name: str, params: dict) -> SimpleNamespace:
+        self.rpc_calls.append((name, params))
+        connection = sqlite3.connect(":memory:")
+        try:
+            self.table.to_sql(self.table_name, connection, index=False)
+            for param in self.array_params:
+                values = pd.DataFrame({"value": params[param] or []}, dtype=object)
+                values.to_sql(param, connection, index=False)
+            cursor = connection.execute(
+                self.body, {param: params[param] for param in self.scalar_params}
+            )
+            rows = [
+                dict(zip(self.columns, row, strict=True)) for row in cursor.fetchall()
+            ]
+        finally:
+            connection.close()
+
+        def select_range(start: int, end: int) -> SimpleNamespace:
+            self.ranges.append((start, end))
+            page = rows[start : end + 1]
+            return SimpleNamespace(execute=lambda: SimpleNamespace(data=page))
+
+        return SimpleNamespace(range=select_range)
+
+
+def comparable(df: pd.DataFrame, columns: Iterable[str]) -> pd.DataFrame:
+    """`columns` of `df` with RPC and pandas dtypes aligned, in a stable order."""
+    columns = list(columns)
+    if df.empty:
+        return pd.DataFrame(columns=columns)
+    work = df.loc[:, columns].copy()
+    for column in columns:
+        if column == "date":
+            work[column] = pd.to_datetime(work[column])
+        elif column in ("listings", "avg_price_eur", "avg_per_m2_eur"):
+            work[column] = work[column].astype("float64")
+        else:
+            work[column] = work[column].astype(str)
+    return work.sort_values(columns).reset_index(drop=True)
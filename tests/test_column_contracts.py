@@ -0,0 +1,90 @@
+import ast
+import re
+import unittest
+from pathlib import Path
+
+from dashboard_data import CURRENT_TABLES, HISTORY_TABLES
+
+ROOT = Path(__file__).resolve().parents[1]
+APP_MODULES = (
+    "app.py",
+    "dashboard_charts.py",
+    "dashboard_components.py",
+    "dashboard_transforms.py",
+)
+# Frames in app.py that hold one loaded table without renamed columns.
+APP_DATASET_NAMES = {"df_sales": "sales", "df_rent": "rent", "df_yield": "yield"}
+TABLE_PATTERN = re.compile(
+    r"create table if not exists public\.(api_\w+) \((.*?)\n\);", re.DOTALL
+)
+COLUMN_PATTERN = re.compile(
+    r"^\s+([a-z_0-9]+) (?:date|text|bigint|integer|numeric|double|timestamp)\b",
+    re.MULTILINE,
+)
+
+
+def public_table_columns() -> dict[str, set[str]]:
+    tables: dict[str, set[str]] = {}
+    for path in sorted((ROOT / "sql").glob("*.sql")):
+        for match in TABLE_PATTERN.finditer(path.read_text(encoding="utf-8")):
+            columns = set(COLUMN_PATTERN.findall(match.group(2)))
+            tables.setdefault(match.group(1), set()).update(columns)
+    return tables
+
+
+def dataset_contracts() -> dict[str, tuple[str, set[str]]]:
+    return {
+        name: (table_name, set(columns.split(",")))
+        for name, table_name, columns in (*CURRENT_TABLES, *HISTORY_TABLES)
+    }
+
+
+def module_tree(name: str) -> ast.Module:
+    return ast.parse((ROOT / name).read_text(encoding="utf-8-sig"), filename=name)
+
+
+class ColumnContractTests(unittest.TestCase):
+    def test_contracts_select_explicit_columns_from_the_public_schema(self) -> None:
+        tables = public_table_columns()
+
+        for name, (table_name, columns) in dataset_contracts().items():
+            with self.subTest(dataset=name):
+                self.assertNotIn("*", columns)
+                self.assertIn(table_name, tables)
+                self.assertLessEqual(columns, tables[table_name])
+
+    def test_app_reads_only_contract_columns(self) -> None:
+        public_columns = set().union(*public_table_columns().values())
+        loaded = set().union(*(cols for _, cols in dataset_contracts().values()))
+
+        for module in APP_MODULES:
+            for node in ast.walk(module_tree(module)):
+                if (
+                    isinstance(node, ast.Constant)
+                    and node.value in public_columns
+                    and node.value not in loaded
+                ):
+                    self.fail(
+                        f"{module}:{node.lineno} reads {node.value!r}, "
+                        "which no dataset contract selects"
+                    )
+
+    def test_app_subscripts_stay_inside_their_dataset_contract(self) -> None:
+        contracts = dataset_contracts()
+
+        for node in ast.walk(module_tree("app.py")):
+            if not (
+                isinstance(node, ast.Subscript)
+                and isinstance(node.value, ast.Name)
+                and node.value.id in APP_DATASET_NAMES
+                and isinstance(node.slice, ast.Constant)
+                and isinstance(node.slice.value, str)
+            ):
+                continue
+            dataset = APP_DATASET_NAMES[node.value.id]
+            with self.subTest(line=node.lineno, column=node.slice.value):
+                self.assertIn(node.slice.value, contracts[dataset][1])
+
+
+if __name__ == "__main__":
+    unittest.main()
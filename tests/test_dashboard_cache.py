@@ -0,0 +1,63 @@
+"""Regression tests for the on-disk dashboard snapshot cache."""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+from dashboard_cache import read_snapshot_cache, snapshot_marker, write_snapshot_cache
+
+
+class SnapshotCacheTests(unittest.TestCase):
+    def test_snapshot_round_trip_keeps_rows_and_markers(self) -> None:
+        datasets = {
+            "sales": pd.DataFrame(
+                {
+                    "date": ["2026-08-01", "2026-08-02"],
+                    "city": ["Balti", "Cahul"],
+                    "listings": [12, 7],
+                }
+            ),
+            "segment_history": pd.DataFrame(),
+        }
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            write_snapshot_cache(
+                datasets, extra={"history_window_days": 90}, cache_dir=Path(cache_dir)
+            )
+            loaded, manifest = read_snapshot_cache(
+                ["sales", "segment_history"], cache_dir=Path(cache_dir)
+            )
+
+        pd.testing.assert_frame_equal(loaded["sales"], datasets["sales"])
+        self.assertTrue(loaded["segment_history"].empty)
+        self.assertEqual(manifest["tables"]["sales"]["marker"], "2026-08-02")
+        self.assertGreater(manifest["tables"]["sales"]["memory_bytes"], 0)
+        self.assertEqual(manifest["history_window_days"], 90)
+
+    def test_missing_dataset_is_a_cache_miss(self) -> None:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            self.assertIsNone(read_snapshot_cache(["sales"], cache_dir=Path(cache_dir)))
+            write_snapshot_cache(
+                {"sales": pd.DataFrame({"date": ["2026-08-01"]})},
+                cache_dir=Path(cache_dir),
+            )
+            self.assertIsNone(
+                read_snapshot_cache(["sales", "rent"], cache_dir=Path(cache_dir))
+            )
+
+    def test_marker_prefers_refresh_timestamp_over_snapshot_date(self) -> None:
+        yield_data = pd.DataFrame(
+            {
+                "date": ["2026-08-02", "2026-08-02"],
+                "refreshed_at": ["2026-08-02T05:10:00+00:00", None],
+            }
+        )
+
+        self.assertEqual(snapshot_marker(yield_data), "2026-08-02T05:10:00+00:00")
+        self.assertIsNone(snapshot_marker(pd.DataFrame()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+"""Regression tests for the shared Plotly figure cache and trend figures."""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import dashboard_charts
+
+
+def ranked_rows(price: float = 1_500.0) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "city": ["Chisinau", "Chisinau", "Balti"],
+            "sector": ["Center", "Botanica", "Center"],
+            "listings": [30, 14, 9],
+            "avg_per_m2_eur": [price, 1_300.0, 780.0],
+        }
+    )
+
+
+class FigureCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.cache = dashboard_charts.new_figure_cache()
+        self.builds: list[tuple[pd.DataFrame, tuple]] = []
+
+    def build(self, data: pd.DataFrame, *params):
+        self.builds.append((data, params))
+        return {"rows": len(data), "params": params}
+
+    def cached(self, data: pd.DataFrame, *params, **kwargs):
+        return dashboard_charts.cached_figure(
+            self.build, data, *params, cache=self.cache, **kwargs
+        )
+
+    def test_equal_slices_reuse_the_built_figure(self) -> None:
+        first = self.cached(ranked_rows(), "avg_per_m2_eur", ["#111111", "#222222"])
+        second = self.cached(ranked_rows(), "avg_per_m2_eur", ["#111111", "#222222"])
+
+        self.assertIs(second, first)
+        self.assertEqual(len(self.builds), 1)
+
+    def test_changed_values_or_parameters_rebuild(self) -> None:
+        self.cached(ranked_rows(), "avg_per_m2_eur", 0)
+        self.cached(ranked_rows(price=1_501.0), "avg_per_m2_eur", 0)
+        self.cached(ranked_rows(), "avg_per_m2_eur", 1)
+        self.cached(ranked_rows().astype({"listings": "float64"}), "avg_per_m2_eur", 0)
+
+        self.assertEqual(len(self.builds), 4)
+
+    def test_cache_evicts_least_recently_used_figures(self) -> None:
+        for price in (1.0, 2.0, 1.0, 3.0):
+            self.cached(ranked_rows(price), max_entries=2)
+        self.cached(ranked_rows(1.0), max_entries=2)
+        self.cached(ranked_rows(2.0), max_entries=2)
+
+        built_prices = [data["avg_per_m2_eur"].iloc[0] for data, _ in self.builds]
+        self.assertEqual(built_prices, [1.0, 2.0, 3.0, 2.0])
+
+    def test_ranked_bars_build_once_for_repeated_renders(self) -> None:
+        top = ranked_rows().nsmallest(10, "avg_per_m2_eur")
+        params = ("avg_per_m2_eur", "Price per m2 (EUR)", "#12805c", "lowest", 0)
+
+        first = dashboard_charts.cached_figure(
+            dashboard_charts.build_ranked_bar_figure, top, *params, cache=self.cache
+        )
+        second = dashboard_charts.cached_figure(
+            dashboard_charts.build_ranked_bar_figure,
+            top.copy(),
+            *params,
+            cache=self.cache,
+        )
+
+        self.assertIs(second, first)
+        self.assertEqual(
+            list(first.data[0].y),
+            ["Balti - Center", "Chisinau - Botanica", "Chisinau - Center"],
+        )
+
+
+class SectorTrendFigureTests(unittest.TestCase):
+    def test_end_labels_share_one_trace_after_the_sector_lines(self) -> None:
+        plot = pd.DataFrame(
+            {
+                "date": pd.to_datetime(
+                    ["2026-08-01", "2026-08-01", "2026-08-02", "2026-08-02"]
+                ),
+                "sector": ["Center", "Botanica", "Center", "Botanica"],
+                "avg_per_m2_eur": [1_600.0, 1_200.0, 1_650.0, 1_150.0],
+            }
+        )
+
+        fig = dashboard_charts.build_sector_trend_figure(plot)
+
+        lines, labels = fig.data[:-1], fig.data[-1]
+        self.assertEqual([trace.name for trace in lines], ["Center", "Botanica"])
+        self.assertEqual(
+            [list(trace.y) for trace in lines], [[1_600, 1_650], [1_200, 1_150]]
+        )
+        self.assertEqual(labels.mode, "markers+text")
+        self.assertEqual(list(labels.text), ["Botanica 1.150", "Center 1.650"])
+        self.assertEqual(
+            list(labels.marker.color),
+            [lines[1].line.color, lines[0].line.color],
+        )
+
+    def test_long_histories_switch_to_downsampled_webgl_lines(self) -> None:
+        days, sectors = 730, ["Center", "Botanica", "Ciocana", "Riscani"] * 2
+        sectors = [f"{sector} {index}" for index, sector in enumerate(sectors)]
+        rng = np.random.default_rng(3)
+        plot = pd.DataFrame(
+            {
+                "date": np.tile(pd.date_range("2024-10-01", periods=days), 8),
+                "sector": np.repeat(sectors, days),
+                "avg_per_m2_eur": 1_000 + rng.normal(0, 20, days * 8).cumsum(),
+            }
+        ).sample(frac=1, random_state=3)
+        self.assertGreater(len(plot), dashboard_charts.TREND_WEBGL_MIN_ROWS)
+
+        fig = dashboard_charts.build_sector_trend_figure(plot)
+
+        lines, labels = fig.data[:-1], fig.data[-1]
+        self.assertEqual({trace.type for trace in lines}, {"scattergl"})
+        self.assertEqual(labels.type, "scatter")
+        last_prices = plot.sort_values("date").groupby("sector").tail(1)
+        for trace in lines:
+            dates = pd.Series(trace.x)
+            self.assertEqual(len(dates), dashboard_charts.TREND_MAX_POINTS_PER_SECTOR)
+            self.assertTrue(dates.is_monotonic_increasing)
+            self.assertEqual(
+                trace.y[-1],
+                last_prices.set_index("sector").loc[trace.name, "avg_per_m2_eur"],
+            )
+        self.assertEqual(
+            sorted(labels.y), sorted(last_prices["avg_per_m2_eur"].tolist())
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
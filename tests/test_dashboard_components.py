@@ -0,0 +1,95 @@
+"""Regression tests for the shared number formatters."""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from dashboard_components import (
+    format_number,
+    format_number_series,
+    format_percent,
+    format_percent_series,
+)
+
+EDGE_VALUES = [
+    0.0,
+    -0.0,
+    -0.4,
+    0.5,
+    1.5,
+    2.5,
+    -2.5,
+    0.125,
+    2.675,
+    1.005,
+    999.5,
+    999.9996,
+    999_999.5,
+    1_000.0,
+    -1_234_567.891,
+    2.0**53,
+    1e16,
+    -1e20,
+    np.nan,
+    np.inf,
+    -np.inf,
+]
+
+
+def random_values(seed: int, size: int = 4_000) -> np.ndarray:
+    """Prices, listing counts, yields, and exact halves at several scales."""
+    rng = np.random.default_rng(seed)
+    return np.concatenate(
+        [
+            rng.normal(0, 1_000, size),
+            rng.uniform(-1e9, 1e9, size),
+            rng.integers(0, 5_000, size).astype("float64"),
+            np.round(rng.uniform(-1e4, 1e4, size) * 2) / 2,
+            np.round(rng.uniform(-100, 100, size), 3),
+            10.0 ** rng.uniform(-4, 14, size),
+        ]
+    )
+
+
+class FormatNumberSeriesTests(unittest.TestCase):
+    def assert_matches_scalar(self, values: pd.Series, decimals: int) -> None:
+        expected = values.map(lambda value: format_number(value, decimals))
+        actual = format_number_series(values, decimals)
+
+        mismatches = values[actual != expected]
+        self.assertTrue(
+            mismatches.empty,
+            f"decimals={decimals}: {mismatches.head().tolist()} formatted as "
+            f"{actual[mismatches.index].head().tolist()}, expected "
+            f"{expected[mismatches.index].head().tolist()}",
+        )
+        pd.testing.assert_index_equal(actual.index, values.index)
+
+    def test_series_formatting_matches_scalar_formatting(self) -> None:
+        for seed in range(3):
+            values = pd.Series(np.concatenate([random_values(seed), EDGE_VALUES]))
+            for decimals in range(5):
+                with self.subTest(seed=seed, decimals=decimals):
+                    self.assert_matches_scalar(values, decimals)
+
+    def test_series_formatting_keeps_index_and_accepts_integer_columns(self) -> None:
+        listings = pd.Series([7, 1_250, 48_000], index=[10, 4, 7], dtype="Int64")
+
+        self.assertEqual(
+            format_number_series(listings).to_dict(),
+            {10: "7", 4: "1.250", 7: "48.000"},
+        )
+        self.assertTrue(format_number_series(pd.Series([], dtype=float)).empty)
+
+    def test_percent_series_matches_scalar_percent(self) -> None:
+        yields = pd.Series([4.25, 11.96, -0.04, np.nan])
+
+        self.assertEqual(
+            format_percent_series(yields).tolist(),
+            [format_percent(value) for value in yields],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
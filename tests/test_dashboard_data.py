@@ -1,38 +1,150 @@
 """Regression tests for public Supabase API data loading."""
 
+import tempfile
+import threading
 import unittest
+from pathlib import Path
 from types import SimpleNamespace
 from unittest.mock import patch
 
+import pandas as pd
+
 import dashboard_data
+from dashboard_cache import write_snapshot_cache
 
 
 class FakeQuery:
-    """Small fluent Supabase query fake for pagination tests."""
+    """
+    Small fluent Supabase query fake for pagination tests. It serves `rows` in
+    key order and continues after the rows it already returned, the way a
+    keyset cursor does on the server.
+    """
 
-    def __init__(self, batches: list[list[dict]]) -> None:
-        self.batches = batches
-        self.range_calls: list[tuple[int, int]] = []
+    def __init__(self, rows: list[dict]) -> None:
+        self.rows = rows
+        self.served = 0
+        self.select_calls: list[str] = []
+        self.or_calls: list[str] = []
+        self.order_calls: list[tuple[str, bool]] = []
+        self.limit_calls: list[int] = []
 
-    def select(self, columns: str):
-        self.columns = columns
+    def select(self, columns: str, count: str | None = None):
+        self.select_calls.append(columns)
         return self
 
     def gte(self, column: str, cutoff: str):
         self.gte_call = (column, cutoff)
         return self
 
-    def range(self, start: int, end: int):
-        self.range_calls.append((start, end))
+    def or_(self, filters: str):
+        self.or_calls.append(filters)
+        return self
+
+    def order(self, column: str, desc: bool = False):
+        self.order_calls.append((column, desc))
+        return self
+
+    def limit(self, size: int):
+        self.limit_calls.append(size)
+        return self
+
+    def execute(self):
+        batch = self.rows[self.served : self.served + self.limit_calls[-1]]
+        self.served += len(batch)
+        return SimpleNamespace(data=[dict(row) for row in batch])
+
+
+class FakePostgrest:
+    """
+    In-memory PostgREST table honoring `gte`, `in_`, `order`, `range` and
+    `count="exact"`. `after_request` can mutate the rows between requests.
+    """
+
+    def __init__(self, rows: list[dict], after_request=None) -> None:
+        self.rows = rows
+        self.after_request = after_request
+        self.requests: list[tuple] = []
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def table(self, table_name: str):
+        return FakePostgrestQuery(self)
+
+
+class FakePostgrestQuery:
+    def __init__(self, server: FakePostgrest) -> None:
+        self.server = server
+        self.order_columns: list[str] = []
+        self.membership: tuple[str, list[str]] | None = None
+
+    def select(self, columns: str, count: str | None = None):
+        self.columns = columns.split(",")
+        self.count = count
+        return self
+
+    def gte(self, column: str, value: str):
+        self.filter = (column, value)
+        return self
+
+    def in_(self, column: str, values: list[str]):
+        self.membership = (column, values)
         return self
 
     def order(self, column: str, desc: bool = False):
-        self.order_call = (column, desc)
+        self.order_columns.append(column)
+        return self
+
+    def range(self, start: int, end: int):
+        self.bounds = (start, end)
         return self
 
     def execute(self):
-        batch_index = len(self.range_calls) - 1
-        return SimpleNamespace(data=self.batches[batch_index])
+        server = self.server
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            column, value = self.filter
+            rows = sorted(
+                (
+                    row
+                    for row in server.rows
+                    if row[column] >= value
+                    and (
+                        self.membership is None
+                        or row[self.membership[0]] in self.membership[1]
+                    )
+                ),
+                key=lambda row: tuple(row[key] for key in self.order_columns),
+            )
+        threading.Event().wait(0.01)
+        with server.lock:
+            server.in_flight -= 1
+            server.requests.append((self.bounds, self.count))
+            if server.after_request is not None:
+                server.after_request(server)
+        start, end = self.bounds
+        data = [
+            dict(row)
+            if self.columns == ["*"]
+            else {key: row[key] for key in self.columns}
+            for row in rows[start : end + 1]
+        ]
+        total = len(rows) if self.count == "exact" else None
+        return SimpleNamespace(data=data, count=total)
+
+
+def daily_rows(sectors: list[str]) -> list[dict]:
+    return [
+        {
+            "date": "2026-08-01",
+            "municipality": "Chisinau",
+            "city": "Chisinau",
+            "sector": sector,
+            "listings": listings,
+        }
+        for listings, sector in enumerate(sectors)
+    ]
 
 
 class FakeSupabase:
@@ -47,56 +159,635 @@ class FakeSupabase:
 
 class DashboardDataTests(unittest.TestCase):
     def setUp(self) -> None:
-        dashboard_data.load_historical_data.clear()
-        dashboard_data.load_historical_segment_data.clear()
+        dashboard_data.load_freshness_markers.clear()
+        dashboard_data.get_history_store.clear()
 
     def tearDown(self) -> None:
-        dashboard_data.load_historical_data.clear()
-        dashboard_data.load_historical_segment_data.clear()
+        dashboard_data.load_freshness_markers.clear()
+        dashboard_data.get_history_store.clear()
 
-    def test_fetch_paginated_rows_collects_every_page(self) -> None:
-        rows = [{"id": row_id} for row_id in range(5)]
-        query = FakeQuery([rows[:2], rows[2:4], rows[4:]])
+    def test_keyset_rows_walk_pages_by_primary_key(self) -> None:
+        rows = daily_rows(["Botanica", "Buiucani", "Centru", "Ciocana", "Riscani"])
+        key_columns = dashboard_data.TABLE_KEY_COLUMNS["api_estate_daily"]
+        query = FakeQuery(rows)
         supabase = FakeSupabase(query)
 
-        with patch("dashboard_data.get_supabase_client", return_value=supabase):
-            result = dashboard_data.fetch_paginated_rows(
-                "api_estate_daily", "date,id", "2026-08-01", page_size=2
-            )
+        result = dashboard_data.fetch_keyset_rows(
+            "api_estate_daily",
+            "*",
+            "2026-08-01",
+            key_columns,
+            page_size=2,
+            supabase=supabase,
+        )
 
         self.assertEqual(result, rows)
-        self.assertEqual(supabase.tables, ["api_estate_daily"] * 3)
-        self.assertEqual(query.range_calls, [(0, 1), (2, 3), (4, 5)])
+        self.assertEqual(supabase.tables, ["api_estate_daily"] * 2)
         self.assertEqual(query.gte_call, ("date", "2026-08-01"))
-        self.assertEqual(query.order_call, ("date", False))
+        self.assertEqual(
+            query.order_calls[:4], [(column, False) for column in key_columns]
+        )
+        self.assertEqual(
+            query.or_calls, [dashboard_data.keyset_filter(key_columns, rows[1])]
+        )
+        self.assertEqual(query.limit_calls, [2, 4])
 
-    def test_fetch_paginated_rows_stops_after_short_page(self) -> None:
-        query = FakeQuery([[{"id": 1}, {"id": 2}], [{"id": 3}]])
+    def test_keyset_rows_stop_after_short_page(self) -> None:
+        query = FakeQuery(daily_rows(["Centru"]))
         supabase = FakeSupabase(query)
 
-        with patch("dashboard_data.get_supabase_client", return_value=supabase):
+        result = dashboard_data.fetch_keyset_rows(
+            "api_estate_daily",
+            "*",
+            "2026-08-01",
+            dashboard_data.TABLE_KEY_COLUMNS["api_estate_daily"],
+            page_size=2,
+            supabase=supabase,
+        )
+
+        self.assertEqual(len(result), 1)
+        self.assertEqual(query.or_calls, [])
+        self.assertEqual(query.limit_calls, [2])
+
+    def test_paginated_rows_fetch_counted_ranges_in_parallel(self) -> None:
+        rows = daily_rows([f"Sector {index:02d}" for index in range(10)])
+        server = FakePostgrest(list(reversed(rows)))
+
+        result = dashboard_data.fetch_paginated_rows(
+            "api_estate_daily",
+            "date,city,sector,listings",
+            "2026-08-01",
+            page_size=3,
+            supabase=server,
+        )
+
+        self.assertEqual(
+            result,
+            [
+                {key: row[key] for key in ("date", "city", "sector", "listings")}
+                for row in rows
+            ],
+        )
+        self.assertEqual(server.requests[0], ((0, 2), "exact"))
+        self.assertEqual(
+            sorted(bounds for bounds, _ in server.requests[1:]),
+            [(3, 5), (6, 8), (9, 9)],
+        )
+        self.assertLessEqual(
+            server.max_in_flight, dashboard_data.PAGE_FETCH_MAX_WORKERS
+        )
+        self.assertGreater(server.max_in_flight, 1)
+
+    def test_paginated_rows_fall_back_to_keyset_after_mid_scan_refresh(self) -> None:
+        rows = daily_rows([f"Sector {index:02d}" for index in range(6)])
+
+        def insert_first_row(server: FakePostgrest) -> None:
+            if len(server.requests) == 1:
+                server.rows.append({**rows[0], "sector": "Aeroport"})
+
+        server = FakePostgrest(list(rows), after_request=insert_first_row)
+        with patch(
+            "dashboard_data.fetch_keyset_rows", return_value=[dict(rows[0])]
+        ) as keyset:
             result = dashboard_data.fetch_paginated_rows(
-                "api_estate_daily", "date,id", "2026-08-01", page_size=2
+                "api_estate_daily", "*", "2026-08-01", page_size=2, supabase=server
             )
 
-        self.assertEqual(result, [{"id": 1}, {"id": 2}, {"id": 3}])
-        self.assertEqual(query.range_calls, [(0, 1), (2, 3)])
+        self.assertEqual(result, [rows[0]])
+        keyset.assert_called_once()
+
+    def test_paginated_rows_filter_cities_on_the_server(self) -> None:
+        rows = [
+            *daily_rows(["Center", "Botanica"]),
+            {**daily_rows(["Center"])[0], "city": "Balti"},
+        ]
+        server = FakePostgrest(rows)
+
+        result = dashboard_data.fetch_paginated_rows(
+            "api_estate_daily",
+            "date,city,sector",
+            "2026-08-01",
+            page_size=1,
+            supabase=server,
+            cities=("Balti",),
+        )
+
+        self.assertEqual(
+            result, [{"date": "2026-08-01", "city": "Balti", "sector": "Center"}]
+        )
+        self.assertEqual(len(server.requests), 1)
+
+    def test_keyset_filter_continues_after_the_last_key(self) -> None:
+        result = dashboard_data.keyset_filter(
+            ("date", "city", "sector"),
+            {"date": "2026-08-01", "city": "Balti", "sector": 'Dacia, "Nord"'},
+        )
+
+        self.assertEqual(
+            result,
+            'date.gt."2026-08-01",'
+            'and(date.eq."2026-08-01",city.gt."Balti"),'
+            'and(date.eq."2026-08-01",city.eq."Balti",'
+            'sector.gt."Dacia, \\"Nord\\"")',
+        )
+
+    def test_page_size_adapts_to_response_time(self) -> None:
+        self.assertEqual(dashboard_data.next_page_size(1000, 2.5), 500)
+        self.assertEqual(dashboard_data.next_page_size(300, 2.5), 250)
+        self.assertEqual(dashboard_data.next_page_size(500, 0.1), 1000)
+        self.assertEqual(dashboard_data.next_page_size(1000, 0.1), 1000)
+        self.assertEqual(dashboard_data.next_page_size(500, 0.5), 500)
+
+    def fetch_with_failing_table(self, failing_table: str):
+        def fetch_rows(table, columns, cutoff, supabase):
+            if table == failing_table:
+                raise RuntimeError(f"{table} unavailable")
+            return [{"date": "2026-08-01", "table": table}]
 
-    def test_required_history_request_propagates_failure(self) -> None:
         with (
             patch(
-                "dashboard_data.fetch_paginated_rows",
-                side_effect=RuntimeError("history unavailable"),
+                "dashboard_data.fetch_table_rows",
+                side_effect=lambda table, columns, supabase: [{"table": table}],
             ),
-            self.assertRaisesRegex(RuntimeError, "history unavailable"),
+            patch("dashboard_data.fetch_paginated_rows", side_effect=fetch_rows),
         ):
-            dashboard_data.load_historical_data()
+            return dashboard_data.fetch_dashboard_datasets(
+                supabase=object(), store=dashboard_data.new_history_store()
+            )
+
+    def test_required_history_request_propagates_failure(self) -> None:
+        with self.assertRaisesRegex(RuntimeError, "api_estate_daily unavailable"):
+            self.fetch_with_failing_table("api_estate_daily")
 
     def test_optional_profile_history_returns_empty_data_on_failure(self) -> None:
+        datasets, _ = self.fetch_with_failing_table("api_estate_segments_daily")
+
+        self.assertTrue(datasets["segment_history"].empty)
+        self.assertFalse(datasets["history"].empty)
+
+    def test_history_store_refreshes_only_from_the_last_cached_date(self) -> None:
+        store = dashboard_data.new_history_store()
+        first_load = [
+            {"date": "2026-08-01", "city": "Balti", "avg_per_m2_eur": 700},
+            {"date": "2026-08-02", "city": "Balti", "avg_per_m2_eur": 710},
+        ]
+        refresh = [
+            {"date": "2026-08-02", "city": "Balti", "avg_per_m2_eur": 715},
+            {"date": "2026-08-03", "city": "Balti", "avg_per_m2_eur": 720},
+        ]
+
         with patch(
             "dashboard_data.fetch_paginated_rows",
-            side_effect=RuntimeError("profile history unavailable"),
+            side_effect=[first_load, refresh],
+        ) as fetch:
+            dashboard_data.sync_history_rows(
+                "api_estate_daily", "date,city", "2026-08-01", store=store
+            )
+            rows = dashboard_data.sync_history_rows(
+                "api_estate_daily", "date,city", "2026-08-02", store=store
+            )
+
+        self.assertEqual(fetch.call_args_list[0].args[2], "2026-08-01")
+        self.assertEqual(fetch.call_args_list[1].args[2], "2026-08-02")
+        self.assertEqual(
+            rows["date"].dt.strftime("%Y-%m-%d").tolist(), ["2026-08-02", "2026-08-03"]
+        )
+        self.assertEqual(rows["avg_per_m2_eur"].tolist(), [715, 720])
+        self.assertIsInstance(rows["city"].dtype, pd.CategoricalDtype)
+
+    def test_history_price_index_advances_with_each_refresh(self) -> None:
+        store = dashboard_data.new_history_store()
+
+        def snapshot(date: str, listings: int, price: float) -> dict:
+            return {
+                "date": date,
+                "city": "Balti",
+                "sector": "Center",
+                "listings": listings,
+                "avg_per_m2_eur": price,
+            }
+
+        first_load = [snapshot("2026-08-01", 10, 700), snapshot("2026-08-02", 30, 740)]
+        refresh = [snapshot("2026-08-02", 30, 760), snapshot("2026-08-03", 20, 780)]
+
+        with patch(
+            "dashboard_data.fetch_paginated_rows", side_effect=[first_load, refresh]
+        ):
+            self.assertTrue(dashboard_data.history_price_index(7, store=store).empty)
+            dashboard_data.sync_history_rows(
+                "api_estate_daily", "date", "2026-08-01", store=store
+            )
+            first = dashboard_data.history_price_index(7, store=store)
+            index = store["tables"]["api_estate_daily"]["indices"][7]
+            dashboard_data.sync_history_rows(
+                "api_estate_daily", "date", "2026-08-02", store=store
+            )
+            refreshed = dashboard_data.history_price_index(7, store=store)
+
+        self.assertEqual(first["avg_per_m2_eur"].tolist(), [700, 730])
+        self.assertIs(store["tables"]["api_estate_daily"]["indices"][7], index)
+        self.assertEqual(
+            refreshed["date"].dt.strftime("%Y-%m-%d").tolist(),
+            ["2026-08-02", "2026-08-03"],
+        )
+        self.assertEqual(refreshed["listings"].tolist(), [40, 60])
+        self.assertEqual(
+            refreshed["avg_per_m2_eur"].tolist(),
+            [745, (10 * 700 + 30 * 760 + 20 * 780) / 60],
+        )
+        self.assertIsInstance(refreshed["city"].dtype, pd.CategoricalDtype)
+
+    def test_normalize_frame_converts_contract_columns_once(self) -> None:
+        raw = pd.DataFrame(
+            {
+                "date": ["2026-08-01", "2026-08-02"],
+                "city": ["Balti", "Balti"],
+                "rooms_group": ["1", "2"],
+                "listings": [12, 7],
+                "sale_listings": [3.0, None],
+                "avg_per_m2_eur": ["700.5", "710"],
+                "refreshed_at": ["2026-08-02T03:00:00+00:00"] * 2,
+            }
+        )
+
+        normalized = dashboard_data.normalize_frame(raw)
+
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(normalized["date"]))
+        self.assertIsInstance(normalized["city"].dtype, pd.CategoricalDtype)
+        self.assertIsInstance(normalized["rooms_group"].dtype, pd.CategoricalDtype)
+        self.assertEqual(normalized["listings"].dtype, "int32")
+        self.assertEqual(normalized["sale_listings"].dtype, "float64")
+        self.assertEqual(normalized["avg_per_m2_eur"].tolist(), [700.5, 710.0])
+        self.assertEqual(normalized["refreshed_at"].dtype, object)
+        self.assertIs(dashboard_data.normalize_frame(normalized), normalized)
+
+    def test_snapshot_datasets_share_one_category_set_per_label(self) -> None:
+        datasets = dashboard_data.normalize_datasets(
+            {
+                "sales": pd.DataFrame({"city": ["Chisinau", "Balti"]}),
+                "rent": pd.DataFrame({"city": ["Orhei"], "deal_type": ["daily"]}),
+            }
+        )
+
+        self.assertEqual(
+            datasets["sales"]["city"].dtype, datasets["rent"]["city"].dtype
+        )
+        self.assertEqual(
+            list(datasets["sales"]["city"].cat.categories),
+            ["Balti", "Chisinau", "Orhei"],
+        )
+        combined = pd.concat([datasets["sales"], datasets["rent"]])
+        self.assertIsInstance(combined["city"].dtype, pd.CategoricalDtype)
+
+    def test_memory_report_lists_every_dataset_largest_first(self) -> None:
+        report = dashboard_data.dataset_memory_report(
+            {
+                "yield": pd.DataFrame({"city": ["Balti"]}),
+                "history": pd.DataFrame({"city": ["Balti"] * 500, "listings": 1}),
+            }
+        )
+
+        self.assertEqual(report["dataset"].tolist(), ["history", "yield"])
+        self.assertEqual(report["rows"].tolist(), [500, 1])
+        self.assertEqual(report["columns"].tolist(), [2, 1])
+        self.assertTrue((report["memory_mb"] > 0).all())
+
+    def test_history_store_reloads_when_the_window_widens(self) -> None:
+        store = dashboard_data.new_history_store()
+        rows = [{"date": "2026-08-02", "city": "Balti"}]
+
+        with patch(
+            "dashboard_data.fetch_paginated_rows", side_effect=[rows, rows]
+        ) as fetch:
+            dashboard_data.sync_history_rows(
+                "api_estate_daily", "date,city", "2026-08-02", store=store
+            )
+            dashboard_data.sync_history_rows(
+                "api_estate_daily", "date,city", "2026-07-01", store=store
+            )
+
+        self.assertEqual(fetch.call_args_list[1].args[2], "2026-07-01")
+        self.assertEqual(store["tables"]["api_estate_daily"]["indices"], {})
+
+    def test_fetch_datasets_runs_every_fetch_at_the_same_time(self) -> None:
+        names = ["sales", "rent", "yield", "history"]
+        # Each fetch waits for all others, so a sequential loader would time out.
+        barrier = threading.Barrier(len(names), timeout=5)
+
+        def fetch(name: str) -> list[dict]:
+            barrier.wait()
+            return [{"dataset": name}]
+
+        frames, timings = dashboard_data.fetch_datasets(
+            {name: lambda name=name: fetch(name) for name in names},
+            max_workers=len(names),
+        )
+
+        self.assertEqual(set(frames), set(names))
+        self.assertEqual(frames["rent"].loc[0, "dataset"], "rent")
+        self.assertEqual(set(timings), set(names))
+        self.assertTrue(all(seconds >= 0 for seconds in timings.values()))
+
+    def test_fetch_datasets_keeps_required_and_optional_failure_rules(self) -> None:
+        def fail() -> list[dict]:
+            raise RuntimeError("segment history unavailable")
+
+        frames, timings = dashboard_data.fetch_datasets(
+            {"sales": lambda: [{"city": "Balti"}], "segment_history": fail},
+            optional={"segment_history"},
+        )
+
+        self.assertTrue(frames["segment_history"].empty)
+        self.assertIn("segment_history", timings)
+        with self.assertRaisesRegex(RuntimeError, "segment history unavailable"):
+            dashboard_data.fetch_datasets(
+                {"sales": lambda: [{"city": "Balti"}], "segment_history": fail}
+            )
+
+    def test_dashboard_loader_fetches_every_public_table(self) -> None:
+        with (
+            tempfile.TemporaryDirectory() as cache_dir,
+            patch("dashboard_cache.SNAPSHOT_CACHE_DIR", Path(cache_dir)),
+            patch("dashboard_data.get_supabase_client", return_value=object()),
+            patch(
+                "dashboard_data.fetch_table_rows",
+                side_effect=lambda table, columns, supabase: [{"table": table}],
+            ),
+            patch(
+                "dashboard_data.fetch_paginated_rows",
+                side_effect=lambda table, columns, cutoff, supabase: [{"table": table}],
+            ),
+        ):
+            frames, timings = dashboard_data.load_dashboard_data(
+                dashboard_data.new_snapshot_state()
+            )
+            self.assertTrue((Path(cache_dir) / "yield.parquet").exists())
+
+        expected = {name for name, _, _ in dashboard_data.CURRENT_TABLES}
+        expected |= {"history", "segment_history"}
+        self.assertEqual(set(frames), expected)
+        self.assertEqual(set(timings), expected)
+        self.assertEqual(frames["yield"].loc[0, "table"], "api_rent_yield")
+        self.assertEqual(frames["history"].loc[0, "table"], "api_estate_daily")
+
+    def test_cold_start_serves_disk_snapshot_and_refreshes_in_background(
+        self,
+    ) -> None:
+        cached = {
+            name: pd.DataFrame({"date": ["2026-08-01"], "source": ["disk"]})
+            for name in dashboard_data.DATASET_NAMES
+        }
+        fresh = {
+            name: pd.DataFrame({"date": ["2026-08-02"], "source": ["network"]})
+            for name in dashboard_data.DATASET_NAMES
+        }
+        release_refresh = threading.Event()
+
+        def slow_fetch(supabase, store):
+            release_refresh.wait(timeout=5)
+            return fresh, {"sales": 0.2}
+
+        state = dashboard_data.new_snapshot_state()
+        with tempfile.TemporaryDirectory() as cache_dir:
+            write_snapshot_cache(cached, cache_dir=Path(cache_dir))
+            with (
+                patch("dashboard_cache.SNAPSHOT_CACHE_DIR", Path(cache_dir)),
+                patch("dashboard_data.get_supabase_client", return_value=object()),
+                patch(
+                    "dashboard_data.fetch_dashboard_datasets", side_effect=slow_fetch
+                ),
+            ):
+                first, _ = dashboard_data.load_dashboard_data(state)
+                release_refresh.set()
+                for _ in range(500):
+                    if not state["refreshing"]:
+                        break
+                    threading.Event().wait(0.01)
+                second, timings = dashboard_data.load_dashboard_data(state)
+
+        self.assertEqual(first["sales"].loc[0, "source"], "disk")
+        self.assertEqual(second["sales"].loc[0, "source"], "network")
+        self.assertEqual(timings, {"sales": 0.2})
+
+
+def wait_for_refresh(state: dict) -> None:
+    for _ in range(500):
+        with state["lock"]:
+            if not state["refreshing"]:
+                return
+        threading.Event().wait(0.01)
+
+
+def stale_state(datasets: dict) -> dict:
+    state = dashboard_data.new_snapshot_state()
+    state.update(
+        datasets=datasets,
+        source="network",
+        loaded_at=-dashboard_data.SNAPSHOT_MAX_AGE_SECONDS,
+    )
+    return state
+
+
+class StaleWhileRevalidateTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        for patcher in (
+            patch("dashboard_cache.SNAPSHOT_CACHE_DIR", Path(self.cache_dir.name)),
+            patch("dashboard_data.get_supabase_client", return_value=object()),
+            patch("dashboard_data.load_freshness_markers", return_value=None),
+            patch(
+                "dashboard_data.get_history_store",
+                return_value=dashboard_data.new_history_store(),
+            ),
         ):
-            result = dashboard_data.load_historical_segment_data()
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_expired_snapshot_is_served_while_one_refresh_runs(self) -> None:
+        old = {"sales": pd.DataFrame({"date": ["2026-08-01"]})}
+        new = {"sales": pd.DataFrame({"date": ["2026-08-02"]})}
+        release_refresh = threading.Event()
+        calls = []
+
+        def slow_fetch(supabase, store):
+            calls.append(1)
+            release_refresh.wait(timeout=5)
+            return new, {}
+
+        state = stale_state(old)
+        with patch("dashboard_data.fetch_dashboard_datasets", side_effect=slow_fetch):
+            served = [dashboard_data.load_dashboard_data(state)[0] for _ in range(3)]
+            release_refresh.set()
+            wait_for_refresh(state)
+            refreshed, _ = dashboard_data.load_dashboard_data(state)
+
+        self.assertTrue(all(datasets is old for datasets in served))
+        self.assertEqual(len(calls), 1)
+        self.assertIs(refreshed, new)
+
+    def test_failed_refresh_keeps_serving_the_previous_snapshot(self) -> None:
+        old = {"sales": pd.DataFrame({"date": ["2026-08-01"]})}
+        state = stale_state(old)
+
+        with patch(
+            "dashboard_data.fetch_dashboard_datasets",
+            side_effect=RuntimeError("api unavailable"),
+        ):
+            dashboard_data.load_dashboard_data(state)
+            wait_for_refresh(state)
+            served, _ = dashboard_data.load_dashboard_data(state)
+            status = dashboard_data.snapshot_status(state)
+
+        self.assertIs(served, old)
+        self.assertIsInstance(status["last_error"], RuntimeError)
+        self.assertFalse(status["refreshing"])
+
+    def test_cold_process_without_snapshot_raises_load_failure(self) -> None:
+        with (
+            patch(
+                "dashboard_data.fetch_dashboard_datasets",
+                side_effect=RuntimeError("api unavailable"),
+            ),
+            self.assertRaisesRegex(RuntimeError, "api unavailable"),
+        ):
+            dashboard_data.load_dashboard_data(dashboard_data.new_snapshot_state())
+
+
+class FakeProbeQuery:
+    def __init__(self, latest: str | None) -> None:
+        self.latest = latest
+        self.calls: list[tuple] = []
+
+    def select(self, columns: str):
+        self.calls.append(("select", columns))
+        return self
+
+    def order(self, column: str, desc: bool = False):
+        self.calls.append(("order", column, desc))
+        return self
+
+    def limit(self, size: int):
+        self.calls.append(("limit", size))
+        return self
+
+    def execute(self):
+        data = [] if self.latest is None else [{"refreshed_at": self.latest}]
+        return SimpleNamespace(data=data)
+
+
+class FakeProbeSupabase:
+    def __init__(self, latest: dict[str, str | None]) -> None:
+        self.queries = {name: FakeProbeQuery(value) for name, value in latest.items()}
+
+    def table(self, table_name: str) -> FakeProbeQuery:
+        if table_name not in self.queries:
+            raise RuntimeError(f"{table_name} is not exposed")
+        return self.queries[table_name]
+
+
+class FreshnessProbeTests(unittest.TestCase):
+    def test_probe_reads_one_refreshed_at_row_per_table(self) -> None:
+        tables = [
+            table_name
+            for _, table_name, _ in (
+                *dashboard_data.CURRENT_TABLES,
+                *dashboard_data.HISTORY_TABLES,
+            )
+            if table_name != "api_estate_segments_daily"
+        ]
+        supabase = FakeProbeSupabase(
+            {table_name: "2026-10-16T03:00:00+00:00" for table_name in tables}
+        )
+
+        markers = dashboard_data.probe_freshness(supabase)
+
+        self.assertEqual(set(markers), set(dashboard_data.DATASET_NAMES))
+        self.assertEqual(markers["yield"], "2026-10-16T03:00:00+00:00")
+        self.assertIsNone(markers["segment_history"])
+        self.assertEqual(
+            supabase.queries["api_rent_current"].calls,
+            [
+                ("select", "refreshed_at"),
+                ("order", "refreshed_at", True),
+                ("limit", 1),
+            ],
+        )
+
+    def test_snapshot_reloads_only_when_the_probe_changes(self) -> None:
+        loaded = {"sales": "2026-10-16T03:00:00+00:00"}
+        state = stale_state({"sales": pd.DataFrame({"date": ["2026-10-16"]})})
+        state["markers"] = loaded
+
+        self.assertFalse(dashboard_data.snapshot_is_stale(state, dict(loaded)))
+        self.assertTrue(
+            dashboard_data.snapshot_is_stale(
+                state, {"sales": "2026-10-17T03:00:00+00:00"}
+            )
+        )
+        self.assertTrue(dashboard_data.snapshot_is_stale(state, None))
+
+    def test_disk_boot_skips_the_refresh_when_markers_match(self) -> None:
+        markers = {
+            name: "2026-10-16T03:00:00+00:00" for name in dashboard_data.DATASET_NAMES
+        }
+        datasets = {
+            name: pd.DataFrame({"date": ["2026-10-16"]})
+            for name in dashboard_data.DATASET_NAMES
+        }
+        with tempfile.TemporaryDirectory() as cache_dir:
+            write_snapshot_cache(
+                datasets, extra={"freshness": markers}, cache_dir=Path(cache_dir)
+            )
+            state = dashboard_data.new_snapshot_state()
+            with (
+                patch("dashboard_cache.SNAPSHOT_CACHE_DIR", Path(cache_dir)),
+                patch("dashboard_data.load_freshness_markers", return_value=markers),
+                patch(
+                    "dashboard_data.get_history_store",
+                    return_value=dashboard_data.new_history_store(),
+                ),
+                patch("dashboard_data.start_background_refresh") as refresh,
+            ):
+                served, _ = dashboard_data.load_dashboard_data(state)
+
+        self.assertEqual(set(served), set(dashboard_data.DATASET_NAMES))
+        self.assertEqual(state["source"], "disk")
+        refresh.assert_not_called()
+
+
+class SegmentCubeStoreTests(unittest.TestCase):
+    def test_cube_is_rebuilt_only_for_a_new_segment_frame(self) -> None:
+        store = dashboard_data.new_segment_cube_store()
+        first = pd.DataFrame({"listings": [1]})
+        second = first.copy()
+
+        with patch(
+            "dashboard_data.build_segment_cube",
+            side_effect=lambda df: {"rows": len(df)},
+        ) as build:
+            cube = dashboard_data.segment_cube(first, store)
+            again = dashboard_data.segment_cube(first, store)
+            dashboard_data.segment_cube(second, store)
+
+        self.assertIs(cube, again)
+        self.assertEqual(build.call_count, 2)
+
+
+class MarketIndexStoreTests(unittest.TestCase):
+    def test_index_is_built_once_per_frame_and_old_frames_are_dropped(self) -> None:
+        store = dashboard_data.new_market_index_store()
+        frames = [pd.DataFrame({"city": ["Balti"]}) for _ in range(3)]
+
+        with patch(
+            "dashboard_data.build_market_index",
+            side_effect=lambda df: {"frame": df},
+        ) as build:
+            index = dashboard_data.market_index(frames[0], store, max_entries=2)
+            again = dashboard_data.market_index(frames[0], store, max_entries=2)
+            dashboard_data.market_index(frames[1], store, max_entries=2)
+            dashboard_data.market_index(frames[2], store, max_entries=2)
 
-        self.assertTrue(result.empty)
+        self.assertIs(index, again)
+        self.assertEqual(build.call_count, 3)
+        self.assertEqual(list(store["indices"]), [id(frames[1]), id(frames[2])])
@@ -1,18 +1,77 @@
 import unittest
+from itertools import chain, combinations
 
+import numpy as np
 import pandas as pd
 
 from dashboard_transforms import (
+    advance_rolling_index,
     apply_daily_occupancy_assumption,
     build_city_market_summary,
     build_daily_vs_monthly_return,
+    build_market_index,
+    build_occupancy_scenarios,
+    build_price_movement,
+    build_price_panel,
     build_sale_market_from_segments,
+    build_segment_cube,
+    build_segment_summary,
     build_weekly_city_price_movement,
     build_weekly_price_movement,
+    filter_sale_profile_segments,
+    lttb_indices,
+    memoized,
+    new_rolling_index,
+    new_transform_memo,
+    occupancy_return_scenario,
+    occupancy_scenario,
+    occupancy_scenario_table,
+    query_segment_cube,
+    rolling_index_frame,
+    sector_label,
+    select_market_segments,
+    select_markets,
+    trim_rolling_index,
     weighted_average,
 )
 
 
+def subsets(values: list[str]) -> list[tuple[str, ...]]:
+    return list(
+        chain.from_iterable(
+            combinations(values, size) for size in range(len(values) + 1)
+        )
+    )
+
+
+def profile_segments() -> pd.DataFrame:
+    rows = [
+        ("Chisinau", "Center", "1", "<40 m2", 12, 52_000, 1_450),
+        ("Chisinau", "Center", "2", "40-59 m2", 30, 81_000, 1_600),
+        ("Chisinau", "Center", "3", "60-79 m2", 8, 118_000, 1_700),
+        ("Chisinau", "Botanica", "1", "<40 m2", 6, 45_000, 1_250),
+        ("Chisinau", "Botanica", "2", "60-79 m2", 14, 70_000, 1_300),
+        ("Balti", "Center", "2", "40-59 m2", 9, 41_000, 780),
+        ("Balti", "Center", "1", "<40 m2", 3, None, 700),
+    ]
+    segments = pd.DataFrame(
+        rows,
+        columns=[
+            "city",
+            "sector",
+            "rooms_group",
+            "area_band",
+            "listings",
+            "avg_price_eur",
+            "avg_per_m2_eur",
+        ],
+    )
+    segments.insert(0, "date", pd.Timestamp("2026-08-10"))
+    for column in ("city", "sector", "rooms_group", "area_band"):
+        segments[column] = segments[column].astype("category")
+    return segments
+
+
 class DashboardTransformsTests(unittest.TestCase):
     def test_weighted_average_does_not_treat_sectors_equally(self) -> None:
         markets = pd.DataFrame(
@@ -59,6 +118,127 @@ class DashboardTransformsTests(unittest.TestCase):
         self.assertEqual(market.loc[0, "avg_price_eur"], 136_000.0)
         self.assertEqual(market.loc[0, "avg_per_m2_eur"], 1_600.0)
 
+    def test_categorical_segments_keep_only_observed_markets(self) -> None:
+        segments = pd.DataFrame(
+            {
+                "date": pd.to_datetime(["2026-08-10", "2026-08-10", "2026-08-11"]),
+                "city": pd.Categorical(["Chisinau", "Balti", "Chisinau"]),
+                "sector": pd.Categorical(["Center", "Dacia", "Center"]),
+                "listings": pd.Series([80, 20, 10], dtype="int32"),
+                "avg_price_eur": [120_000.0, 60_000.0, 125_000.0],
+                "avg_per_m2_eur": [1_500.0, 800.0, 1_550.0],
+            }
+        )
+
+        market = build_sale_market_from_segments(segments)
+
+        self.assertEqual(len(market), 3)
+
+    def test_segment_cube_matches_profile_builders_for_every_filter(self) -> None:
+        segments = profile_segments()
+        cube = build_segment_cube(segments)
+        min_listings = 10
+
+        for rooms in subsets(["1", "2", "3"]):
+            for area_bands in subsets(["<40 m2", "40-59 m2", "60-79 m2"]):
+                profile = filter_sale_profile_segments(segments, rooms, area_bands)
+                market = select_markets(
+                    build_market_index(build_sale_market_from_segments(profile)),
+                    [],
+                    min_listings,
+                )
+                rooms_summary = build_segment_summary(
+                    select_market_segments(build_market_index(profile), market),
+                    "rooms_group",
+                    ["1", "2", "3"],
+                )
+
+                rollup = query_segment_cube(cube, [], rooms, area_bands, min_listings)
+
+                with self.subTest(rooms=rooms, area_bands=area_bands):
+                    self.assertEqual(len(rollup["market"]), len(market))
+                    self.assertEqual(len(rollup["rooms_group"]), len(rooms_summary))
+                    if market.empty:
+                        continue
+                    self.assertEqual(
+                        rollup["rooms_group"]["rooms_group"].tolist(),
+                        rooms_summary["rooms_group"].astype(str).tolist(),
+                    )
+                    pd.testing.assert_series_equal(
+                        rollup["market"]["avg_price_eur"],
+                        market["avg_price_eur"],
+                        check_index=False,
+                    )
+                    pd.testing.assert_series_equal(
+                        rollup["rooms_group"]["avg_per_m2_eur"],
+                        rooms_summary["avg_per_m2_eur"],
+                        check_index=False,
+                    )
+                    pd.testing.assert_frame_equal(
+                        rollup["city"],
+                        build_city_market_summary(market),
+                    )
+
+    def test_segment_cube_filters_cities(self) -> None:
+        cube = build_segment_cube(profile_segments())
+
+        rollup = query_segment_cube(cube, ["Balti"], [], [], 1)
+
+        self.assertEqual(rollup["market"]["city"].tolist(), ["Balti"])
+        self.assertEqual(rollup["market"].loc[0, "listings"], 9)
+        self.assertEqual(
+            rollup["area_band"]["area_band"].tolist(), ["40-59 m2", "<40 m2"]
+        )
+
+    def test_memoized_reuses_results_for_the_same_frame_and_filters(self) -> None:
+        memo = new_transform_memo(snapshot=None)
+        markets = pd.DataFrame({"city": ["Chisinau", "Balti"], "listings": [5, 1]})
+        index = build_market_index(markets)
+
+        first = memoized(memo, select_markets, index, ["Balti"], 1)
+        again = memoized(memo, select_markets, index, ["Balti"], 1)
+        other = memoized(
+            memo, select_markets, build_market_index(markets), ["Balti"], 1
+        )
+        wider = memoized(memo, select_markets, index, [], 1)
+
+        self.assertIs(first, again)
+        self.assertIsNot(first, other)
+        self.assertEqual(len(wider), 2)
+        self.assertEqual(len(memo["entries"]), 3)
+
+    def test_memoized_evicts_the_least_recently_used_entry(self) -> None:
+        memo = new_transform_memo(snapshot=None)
+        index = build_market_index(
+            pd.DataFrame({"city": ["Chisinau"], "listings": [5]})
+        )
+
+        kept = memoized(memo, select_markets, index, [], 1, max_entries=2)
+        memoized(memo, select_markets, index, [], 2, max_entries=2)
+        memoized(memo, select_markets, index, [], 1, max_entries=2)
+        memoized(memo, select_markets, index, [], 3, max_entries=2)
+
+        self.assertEqual(
+            [key[2][-1] for key in memo["entries"]],
+            [1, 3],
+        )
+        self.assertIs(
+            memoized(memo, select_markets, index, [], 1, max_entries=2),
+            kept,
+        )
+
+    def test_sector_label_fills_missing_categorical_sector(self) -> None:
+        markets = pd.DataFrame(
+            {
+                "city": pd.Categorical(["Balti", "Orhei"]),
+                "sector": pd.Categorical(["Dacia", None]),
+            }
+        )
+
+        self.assertEqual(
+            sector_label(markets).tolist(), ["Balti -> Dacia", "Orhei -> Center"]
+        )
+
     def test_weekly_movement_uses_closest_snapshot_at_least_seven_days_earlier(
         self,
     ) -> None:
@@ -81,12 +261,15 @@ class DashboardTransformsTests(unittest.TestCase):
             }
         )
 
-        movement = build_weekly_price_movement(history, visible_markets).set_index(
+        changes = build_price_movement(build_price_panel(history))
+        movement = build_weekly_price_movement(changes, visible_markets).set_index(
             "city"
         )
 
         self.assertEqual(len(movement), 2)
-        self.assertEqual(movement.loc["Chisinau", "baseline_date"], pd.Timestamp("2026-08-03"))
+        self.assertEqual(
+            movement.loc["Chisinau", "baseline_date"], pd.Timestamp("2026-08-03")
+        )
         self.assertEqual(movement.loc["Chisinau", "days_between"], 7)
         self.assertAlmostEqual(movement.loc["Chisinau", "change_percent"], 10.0)
         self.assertAlmostEqual(movement.loc["Balti", "change_percent"], -10.0)
@@ -103,14 +286,54 @@ class DashboardTransformsTests(unittest.TestCase):
         )
         visible_markets = history[["city", "sector"]].drop_duplicates()
 
-        movement = build_weekly_city_price_movement(history, visible_markets)
+        changes = build_price_movement(build_price_panel(history))
+        movement = build_weekly_city_price_movement(changes, visible_markets)
 
         self.assertEqual(movement.loc[0, "comparable_sectors"], 2)
         self.assertEqual(movement.loc[0, "latest_listings"], 110)
-        self.assertAlmostEqual(movement.loc[0, "baseline_avg_per_m2_eur"], 1_090.909, places=3)
-        self.assertAlmostEqual(movement.loc[0, "latest_avg_per_m2_eur"], 1_172.727, places=3)
+        self.assertAlmostEqual(
+            movement.loc[0, "baseline_avg_per_m2_eur"], 1_090.909, places=3
+        )
+        self.assertAlmostEqual(
+            movement.loc[0, "latest_avg_per_m2_eur"], 1_172.727, places=3
+        )
         self.assertAlmostEqual(movement.loc[0, "change_percent"], 7.5)
 
+    def test_price_movement_compares_every_date_with_its_lagged_snapshot(
+        self,
+    ) -> None:
+        history = pd.DataFrame(
+            [
+                ("2026-08-01", "Chisinau", "Center", 1_000),
+                ("2026-08-02", "Chisinau", "Center", 1_020),
+                ("2026-08-09", "Chisinau", "Center", 1_100),
+                ("2026-08-10", "Chisinau", "Center", 1_122),
+                ("2026-08-01", "Balti", "Center", 800),
+                ("2026-08-10", "Balti", "Center", 760),
+            ],
+            columns=["date", "city", "sector", "avg_per_m2_eur"],
+        )
+
+        movement = build_price_movement(build_price_panel(history), (1, 7, 30))
+        rows = {
+            (row.lag_days, f"{row.latest_date:%m-%d}", row.city): (
+                f"{row.baseline_date:%m-%d}",
+                round(row.change_percent, 3),
+            )
+            for row in movement.itertuples()
+        }
+
+        self.assertEqual(
+            rows,
+            {
+                (1, "08-02", "Chisinau"): ("08-01", 2.0),
+                (1, "08-09", "Chisinau"): ("08-02", 7.843),
+                (1, "08-10", "Chisinau"): ("08-09", 2.0),
+                (7, "08-09", "Chisinau"): ("08-02", 7.843),
+                (7, "08-10", "Chisinau"): ("08-02", 10.0),
+            },
+        )
+
     def test_daily_return_tracks_the_selected_occupancy(self) -> None:
         yield_data = pd.DataFrame(
             {
@@ -139,5 +362,223 @@ class DashboardTransformsTests(unittest.TestCase):
         )
 
 
+class LttbIndicesTests(unittest.TestCase):
+    def test_downsampling_keeps_endpoints_order_and_spikes(self) -> None:
+        x = np.arange(2_000, dtype="float64")
+        y = np.sin(x / 50)
+        y[1_234] = 25.0
+
+        kept = lttb_indices(x, y, 100)
+
+        self.assertEqual(len(kept), 100)
+        self.assertEqual((kept[0], kept[-1]), (0, 1_999))
+        self.assertTrue((np.diff(kept) > 0).all())
+        self.assertIn(1_234, kept)
+
+    def test_short_series_are_returned_whole(self) -> None:
+        x = np.arange(5, dtype="float64")
+
+        self.assertEqual(lttb_indices(x, x, 5).tolist(), [0, 1, 2, 3, 4])
+        self.assertEqual(lttb_indices(x, x, 2).tolist(), [0, 1, 2, 3, 4])
+
+
+def rent_rows() -> pd.DataFrame:
+    rows = [
+        ("Chisinau", "Center", "rent_monthly", 14),
+        ("Balti", "Center", "rent_daily", 3),
+        ("Chisinau", None, "rent_daily", 8),
+        ("Orhei", "Center", "rent_monthly", None),
+        ("Chisinau", "Botanica", "rent_daily", 2),
+        ("Balti", "Dacia", "rent_monthly", 9),
+    ]
+    rent = pd.DataFrame(rows, columns=["city", "sector", "deal_type", "listings"])
+    rent.insert(0, "date", pd.Timestamp("2026-08-10"))
+    # A shuffled index shows that rows keep their labels and frame order.
+    rent.index = [5, 3, 0, 4, 1, 2]
+    for column in ("city", "sector", "deal_type"):
+        rent[column] = rent[column].astype("category")
+    return rent
+
+
+class MarketIndexTests(unittest.TestCase):
+    def test_indexed_selection_matches_frame_filters(self) -> None:
+        rent = rent_rows()
+        index = build_market_index(rent)
+
+        for cities in ([], ["Chisinau"], ["Balti", "Chisinau"], ["Tiraspol"]):
+            for deal_type in (None, "rent_daily"):
+                for min_listings in (None, 0, 5):
+                    expected = rent
+                    if deal_type is not None:
+                        expected = expected[expected["deal_type"] == deal_type]
+                    if cities:
+                        expected = expected[expected["city"].isin(cities)]
+                    if min_listings is not None:
+                        expected = expected[expected["listings"] >= min_listings]
+                    with self.subTest(
+                        cities=cities, deal_type=deal_type, min_listings=min_listings
+                    ):
+                        pd.testing.assert_frame_equal(
+                            select_markets(index, cities, min_listings, deal_type),
+                            expected,
+                        )
+
+    def test_segment_lookup_matches_the_market_merge(self) -> None:
+        segments = rent_rows()
+        market = segments.iloc[[0, 2, 5]].drop(columns=["deal_type", "listings"])
+
+        pd.testing.assert_frame_equal(
+            select_market_segments(build_market_index(segments), market).reset_index(
+                drop=True
+            ),
+            segments.merge(
+                market[["date", "city", "sector"]], on=["date", "city", "sector"]
+            ),
+        )
+        self.assertTrue(
+            select_market_segments(build_market_index(pd.DataFrame()), market).empty
+        )
+
+
+def yield_markets() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "city": ["Chisinau", "Chisinau", "Balti", "Balti"],
+            "sector": ["Center", "Botanica", "Center", None],
+            "annual_rent_monthly": [7_200, 6_000, 0, 5_000],
+            "annual_rent_daily_60pct": [12_000, 6_000, 7_000, 9_000],
+            "avg_sale_price_eur": [120_000, 100_000, 70_000, 90_000],
+            "sale_listings": [80, 40, 12, 9],
+            "total_rent_listings": [60, 30, 10, 8],
+            "yield_daily_percent": [10.0, 6.0, 10.0, 10.0],
+        }
+    )
+
+
+class OccupancyScenarioTests(unittest.TestCase):
+    def test_grid_lookups_match_single_occupancy_results(self) -> None:
+        yield_data = yield_markets()
+        scenarios = build_occupancy_scenarios(yield_data)
+
+        self.assertEqual(scenarios["yield_daily"].shape, (15, 4))
+        for percent in (20, 45, 60, 90, 33):
+            with self.subTest(percent=percent):
+                pd.testing.assert_frame_equal(
+                    occupancy_scenario(scenarios, percent),
+                    apply_daily_occupancy_assumption(yield_data, percent),
+                )
+                pd.testing.assert_frame_equal(
+                    occupancy_return_scenario(scenarios, percent),
+                    build_daily_vs_monthly_return(yield_data, percent),
+                )
+
+    def test_scenario_table_lists_comparable_markets_at_every_step(self) -> None:
+        table = occupancy_scenario_table(build_occupancy_scenarios(yield_markets()))
+        center = table[table["sector"] == "Center"].set_index("occupancy_percent")
+
+        self.assertEqual(len(table), 2 * 15)
+        self.assertEqual(center.index.tolist(), list(range(20, 95, 5)))
+        self.assertAlmostEqual(center.loc[30, "daily_gross_yield_percent"], 5.0)
+        self.assertAlmostEqual(center.loc[90, "daily_advantage_pp"], 9.0)
+        self.assertTrue((center["occupancy_to_match_monthly_percent"] == 36.0).all())
+        self.assertTrue(
+            occupancy_scenario_table(build_occupancy_scenarios(pd.DataFrame())).empty
+        )
+
+
+def random_daily_history(seed: int, days: int = 60) -> pd.DataFrame:
+    """Daily rows for a few markets, with gaps and unpriced snapshots."""
+    rng = np.random.default_rng(seed)
+    markets = [("Chisinau", "Center"), ("Chisinau", "Botanica"), ("Balti", "Center")]
+    rows = [
+        (date, city, sector, int(rng.integers(0, 40)), rng.uniform(600, 2_000))
+        for date in pd.date_range("2026-06-01", periods=days)
+        for city, sector in markets
+        if rng.random() < 0.8
+    ]
+    history = pd.DataFrame(
+        rows, columns=["date", "city", "sector", "listings", "avg_per_m2_eur"]
+    )
+    unpriced = history.sample(frac=0.05, random_state=seed).index
+    history.loc[unpriced, "avg_per_m2_eur"] = np.nan
+    return history
+
+
+def naive_rolling_index(history: pd.DataFrame, window_days: int) -> pd.DataFrame:
+    data = history[(history["listings"] > 0) & history["avg_per_m2_eur"].notna()]
+    rows = []
+    for (date, city, sector), _ in data.groupby(["date", "city", "sector"]):
+        window = data[
+            (data["city"] == city)
+            & (data["sector"] == sector)
+            & (data["date"] > date - pd.Timedelta(days=window_days))
+            & (data["date"] <= date)
+        ]
+        listings = window["listings"].sum()
+        price = (window["listings"] * window["avg_per_m2_eur"]).sum() / listings
+        rows.append((date, city, sector, float(listings), price))
+    return pd.DataFrame(
+        rows, columns=["date", "city", "sector", "listings", "avg_per_m2_eur"]
+    )
+
+
+def sorted_index(frame: pd.DataFrame) -> pd.DataFrame:
+    return frame.sort_values(["date", "city", "sector"]).reset_index(drop=True)
+
+
+class RollingIndexTests(unittest.TestCase):
+    def test_index_matches_listing_weighted_window_averages(self) -> None:
+        for seed, window_days in ((0, 7), (1, 28)):
+            with self.subTest(seed=seed, window_days=window_days):
+                history = random_daily_history(seed)
+                index = advance_rolling_index(new_rolling_index(window_days), history)
+
+                pd.testing.assert_frame_equal(
+                    sorted_index(rolling_index_frame(index)),
+                    naive_rolling_index(history, window_days),
+                )
+
+    def test_advancing_by_day_matches_a_full_build(self) -> None:
+        history = random_daily_history(2)
+        dates = sorted(history["date"].unique())
+        index = advance_rolling_index(new_rolling_index(7), history.iloc[0:0])
+        for date in dates:
+            advance_rolling_index(index, history[history["date"] == date])
+        full = advance_rolling_index(new_rolling_index(7), history)
+
+        pd.testing.assert_frame_equal(
+            rolling_index_frame(index), rolling_index_frame(full)
+        )
+
+    def test_last_day_is_replaced_and_earlier_days_are_rejected(self) -> None:
+        history = random_daily_history(3)
+        last_date = history["date"].max()
+        index = advance_rolling_index(new_rolling_index(7), history)
+        rerun = history[history["date"] == last_date].assign(avg_per_m2_eur=1_000.0)
+
+        advance_rolling_index(index, rerun, since=last_date)
+        expected = pd.concat([history[history["date"] < last_date], rerun])
+
+        pd.testing.assert_frame_equal(
+            sorted_index(rolling_index_frame(index)),
+            naive_rolling_index(expected, 7),
+        )
+        with self.assertRaises(ValueError):
+            advance_rolling_index(index, rerun, since=last_date - pd.Timedelta(days=1))
+
+    def test_trimmed_rows_keep_their_window_sums(self) -> None:
+        history = random_daily_history(4)
+        cutoff = pd.Timestamp("2026-07-01")
+        index = advance_rolling_index(new_rolling_index(28), history)
+
+        trim_rolling_index(index, cutoff)
+        expected = naive_rolling_index(history, 28)
+
+        pd.testing.assert_frame_equal(
+            sorted_index(rolling_index_frame(index)),
+            expected[expected["date"] >= cutoff].reset_index(drop=True),
+        )
+
+
 if __name__ == "__main__":
     unittest.main()
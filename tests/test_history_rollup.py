@@ -0,0 +1,245 @@
+"""
+Equivalence tests for the `api_estate_history_rollup` RPC. The function body
+in `sql/` is run on SQLite by `tests.sqlite_rpc`, and its rows are compared
+with `rollup_history`, which the dashboard uses when the RPC is unavailable.
+"""
+
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pandas as pd
+from streamlit.testing.v1 import AppTest
+
+import dashboard_data
+from dashboard_transforms import rollup_history
+from tests.sqlite_rpc import SQLiteRpcSupabase, comparable
+
+APP_PATH = Path(__file__).resolve().parents[1] / "app.py"
+HISTORY_COLUMNS = tuple(dashboard_data.HISTORY_SALE_COLUMNS.split(","))
+# SQLite has no `date_trunc`; weeks start on Monday as in Postgres.
+DATE_TRUNC_REWRITE = (
+    r"date_trunc\(:p_grain, d\.date\)",
+    (
+        "case :p_grain when 'week' then date(d.date, '-6 days', 'weekday 1') "
+        "else date(d.date, 'start of month') end"
+    ),
+)
+
+
+def daily_rows() -> pd.DataFrame:
+    # Sunday 26 July to Monday 3 August crosses two week and month boundaries.
+    rows = [
+        ("2026-07-26", "Chisinau", "Center", 20, 1_500),
+        ("2026-07-27", "Chisinau", "Center", 30, 1_560),
+        ("2026-07-31", "Chisinau", "Center", 10, 1_620),
+        ("2026-08-01", "Chisinau", "Center", 25, 1_640),
+        ("2026-08-03", "Chisinau", "Center", 35, 1_700),
+        ("2026-07-27", "Chisinau", "Botanica", 12, 1_200),
+        ("2026-07-28", "Chisinau", "Botanica", 0, 1_900),
+        ("2026-08-02", "Chisinau", "Botanica", 18, None),
+        ("2026-08-03", "Chisinau", "Botanica", 16, 1_260),
+        ("2026-07-27", "Balti", "Center", 7, 780),
+        ("2026-08-04", "Balti", "Center", 9, 800),
+        ("2026-06-30", "Balti", "Center", 5, 700),
+    ]
+    # Float prices keep SQLite from truncating the weighted averages.
+    return pd.DataFrame(rows, columns=list(HISTORY_COLUMNS)).astype(
+        {"avg_per_m2_eur": "float64"}
+    )
+
+
+def history_rpc(daily: pd.DataFrame) -> SQLiteRpcSupabase:
+    return SQLiteRpcSupabase(
+        "add_estate_history_rollup_rpc.sql",
+        "api_estate_daily",
+        daily,
+        HISTORY_COLUMNS,
+        array_params=("p_cities",),
+        scalar_params=("p_grain", "p_since"),
+        rewrites=(DATE_TRUNC_REWRITE,),
+    )
+
+
+class HistoryRollupTests(unittest.TestCase):
+    def assert_matches_pandas(self, grain: str, cities: list[str]) -> None:
+        daily = daily_rows()
+        supabase = history_rpc(daily)
+        since = "2026-07-01"
+
+        rollup = dashboard_data.fetch_history_rollup(
+            grain, since, cities, supabase=supabase
+        )
+        rows = dashboard_data.normalize_frame(daily)
+        rows = rows[rows["date"] >= since]
+        if cities:
+            rows = rows[rows["city"].isin(cities)]
+        expected = rollup_history(rows, grain)
+
+        self.assertEqual(tuple(rollup.columns), HISTORY_COLUMNS)
+        pd.testing.assert_frame_equal(
+            comparable(rollup, HISTORY_COLUMNS), comparable(expected, HISTORY_COLUMNS)
+        )
+
+    def test_weekly_rollup_matches_pandas(self) -> None:
+        self.assert_matches_pandas("week", [])
+
+    def test_monthly_rollup_matches_pandas_for_selected_cities(self) -> None:
+        self.assert_matches_pandas("month", ["Chisinau"])
+
+    def test_weeks_start_on_monday_and_weight_prices_by_listings(self) -> None:
+        rollup = rollup_history(
+            dashboard_data.normalize_frame(daily_rows()), "week"
+        ).set_index(["date", "city", "sector"])
+
+        center = rollup.loc[(pd.Timestamp("2026-07-27"), "Chisinau", "Center")]
+        self.assertEqual(center["listings"], 22)
+        self.assertAlmostEqual(
+            center["avg_per_m2_eur"], (30 * 1_560 + 10 * 1_620 + 25 * 1_640) / 65
+        )
+        self.assertIn((pd.Timestamp("2026-07-20"), "Chisinau", "Center"), rollup.index)
+
+    def test_rollup_pages_are_read_until_a_short_page(self) -> None:
+        supabase = history_rpc(daily_rows())
+
+        rollup = dashboard_data.fetch_history_rollup(
+            "week", "2026-07-01", [], page_size=3, supabase=supabase
+        )
+
+        self.assertEqual(len(rollup), 7)
+        self.assertEqual(supabase.ranges, [(0, 2), (3, 5), (6, 8)])
+        self.assertEqual(
+            supabase.rpc_calls[0],
+            (
+                "api_estate_history_rollup",
+                {"p_grain": "week", "p_since": "2026-07-01", "p_cities": None},
+            ),
+        )
+
+
+class HistoryWindowTests(unittest.TestCase):
+    def setUp(self) -> None:
+        dashboard_data.load_history_window.clear()
+
+    def test_windows_read_the_finest_tier_that_covers_them(self) -> None:
+        grains = {
+            days: dashboard_data.history_grain(days) for days in (91, 365, 730, 1_825)
+        }
+
+        self.assertEqual(
+            grains, {91: "week", 365: "week", 730: "month", 1_825: "month"}
+        )
+        # The snapshot's daily rows cover 90 days; nothing covers ten years.
+        for days in (30, 90, 10 * 366):
+            with self.subTest(days=days), self.assertRaises(ValueError):
+                dashboard_data.history_grain(days)
+
+    def test_missing_rollup_function_falls_back_to_daily_rows(self) -> None:
+        failing = SimpleNamespace(rpc=lambda name, params: 1 / 0)
+        daily = daily_rows()
+
+        def fetch_rows(table_name, columns, since, supabase=None, cities=()):
+            rows = daily[daily["date"] >= since]
+            return rows[rows["city"].isin(cities)].to_dict("records")
+
+        with (
+            patch.object(dashboard_data, "get_supabase_client", return_value=failing),
+            patch.object(
+                dashboard_data,
+                "get_history_store",
+                return_value=dashboard_data.new_history_store(),
+            ),
+            patch.object(
+                dashboard_data, "fetch_paginated_rows", side_effect=fetch_rows
+            ) as fetch,
+        ):
+            history = dashboard_data.load_history_window(730, ("Balti",))
+
+        self.assertEqual(fetch.call_args.args[0], "api_estate_daily")
+        self.assertEqual(fetch.call_args.kwargs["cities"], ("Balti",))
+        self.assertEqual(
+            history["date"].dt.strftime("%Y-%m-%d").tolist(),
+            ["2026-06-01", "2026-07-01", "2026-08-01"],
+        )
+        self.assertEqual(set(history["city"]), {"Balti"})
+
+
+class HistoryTierTests(unittest.TestCase):
+    def test_stored_tier_rereads_only_its_latest_period(self) -> None:
+        daily = daily_rows()
+        served = {"daily": daily[daily["date"] <= "2026-07-31"]}
+        calls = []
+
+        def fetch_rows(table_name, columns, since, supabase=None, cities=()):
+            calls.append(since)
+            rows = served["daily"]
+            return rows[rows["date"] >= since].to_dict("records")
+
+        store = dashboard_data.new_history_store()
+        with patch.object(
+            dashboard_data, "fetch_paginated_rows", side_effect=fetch_rows
+        ):
+            dashboard_data.sync_history_tier("week", "2026-07-01", (), store=store)
+            served["daily"] = daily
+            tier = dashboard_data.sync_history_tier(
+                "week", "2026-07-01", (), store=store
+            )
+
+        self.assertEqual(calls, ["2026-07-01", "2026-07-27"])
+        rows = dashboard_data.normalize_frame(daily)
+        expected = rollup_history(rows[rows["date"] >= "2026-07-01"], "week")
+        pd.testing.assert_frame_equal(
+            comparable(tier, HISTORY_COLUMNS), comparable(expected, HISTORY_COLUMNS)
+        )
+
+
+class TrendWindowAppTests(unittest.TestCase):
+    def test_failed_history_load_keeps_the_trend_fragment_running(self) -> None:
+        datasets = {
+            name: pd.DataFrame(columns=columns.split(","))
+            for name, _, columns in (
+                *dashboard_data.CURRENT_TABLES,
+                *dashboard_data.HISTORY_TABLES,
+            )
+        }
+        datasets["sales"] = dashboard_data.normalize_frame(
+            pd.DataFrame(
+                [
+                    {
+                        "date": "2026-08-01",
+                        "city": "Chisinau",
+                        "sector": "Center",
+                        "listings": 20,
+                        "avg_price_eur": 60_000.0,
+                        "avg_per_m2_eur": 1_200.0,
+                    }
+                ]
+            )
+        )
+        dashboard_data.load_history_window.clear()
+
+        with (
+            patch.object(
+                dashboard_data, "load_dashboard_data", return_value=(datasets, {})
+            ),
+            patch.object(dashboard_data, "load_freshness_markers", return_value=None),
+            patch.object(
+                dashboard_data,
+                "get_supabase_client",
+                side_effect=ConnectionError("no client"),
+            ),
+        ):
+            app = AppTest.from_file(str(APP_PATH), default_timeout=30).run()
+            app.radio(key="trend_window").set_value("2 years").run()
+            failed = [block.value for block in app.markdown]
+            app.radio(key="trend_window").set_value("90 days").run()
+            restored = [block.value for block in app.markdown]
+
+        self.assertEqual(app.exception, [])
+        self.assertTrue(any("could not be loaded" in value for value in failed))
+        self.assertFalse(any("could not be loaded" in value for value in restored))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,178 @@
+"""
+Equivalence tests for the `api_sale_profile_rollup` RPC. The function body in
+`sql/` is run on SQLite by `tests.sqlite_rpc`, and its rows are compared with
+the pandas builders the dashboard uses when the RPC is unavailable.
+"""
+
+import unittest
+
+import pandas as pd
+
+import dashboard_data
+from dashboard_transforms import (
+    build_city_market_summary,
+    build_market_index,
+    build_sale_market_from_segments,
+    build_segment_summary,
+    filter_sale_profile_segments,
+    select_market_segments,
+    select_markets,
+)
+from tests.sqlite_rpc import SQLiteRpcSupabase, comparable
+
+ARRAY_PARAMS = ("p_cities", "p_rooms", "p_area_bands")
+ROOM_GROUP_ORDER = ["1", "2", "3", "4+"]
+AREA_BAND_ORDER = ["<40 m2", "40-59 m2", "60-79 m2", "80-119 m2", "120+ m2"]
+
+
+def segment_rows() -> pd.DataFrame:
+    rows = [
+        ("Chisinau", "Center", "1", "<40 m2", 12, 52_000, 1_450),
+        ("Chisinau", "Center", "2", "40-59 m2", 30, 81_000, 1_600),
+        ("Chisinau", "Center", "3", "60-79 m2", 8, 118_000, 1_700),
+        ("Chisinau", "Botanica", "1", "<40 m2", 6, 45_000, 1_250),
+        ("Chisinau", "Botanica", "2", "40-59 m2", 14, 70_000, 1_300),
+        ("Chisinau", "Botanica", "4+", "120+ m2", 5, 210_000, 1_500),
+        ("Balti", "Center", "2", "40-59 m2", 9, 41_000, 780),
+        ("Balti", "Center", "3", "60-79 m2", 4, 55_000, 760),
+        ("Balti", "Center", "1", "<40 m2", 3, None, 700),
+        ("Orhei", "Center", "2", "40-59 m2", 5, 38_000, 690),
+    ]
+    # Postgres `numeric` divides exactly; float columns keep SQLite from
+    # truncating the weighted averages to integers.
+    return pd.DataFrame(
+        [("2026-08-10", *row) for row in rows],
+        columns=[
+            "date",
+            "city",
+            "sector",
+            "rooms_group",
+            "area_band",
+            "listings",
+            "avg_price_eur",
+            "avg_per_m2_eur",
+        ],
+    ).astype({"avg_price_eur": "float64", "avg_per_m2_eur": "float64"})
+
+
+def sale_profile_rpc(segments: pd.DataFrame) -> SQLiteRpcSupabase:
+    return SQLiteRpcSupabase(
+        "add_sale_profile_rollup_rpc.sql",
+        "api_estate_segments_current",
+        segments,
+        dashboard_data.SALE_PROFILE_ROLLUP_COLUMNS,
+        array_params=ARRAY_PARAMS,
+        scalar_params=("p_min_listings",),
+    )
+
+
+def pandas_rollup(
+    segments: pd.DataFrame,
+    cities: list[str],
+    rooms: list[str],
+    area_bands: list[str],
+    min_listings: int,
+) -> dict[str, pd.DataFrame]:
+    """The sale tab's profile path, built from raw segment rows."""
+    profile = filter_sale_profile_segments(
+        select_markets(build_market_index(segments), cities), rooms, area_bands
+    )
+    market = select_markets(
+        build_market_index(build_sale_market_from_segments(profile)), [], min_listings
+    )
+    market_segments = select_market_segments(build_market_index(profile), market)
+    return {
+        "market": market,
+        "rooms_group": build_segment_summary(
+            market_segments, "rooms_group", ROOM_GROUP_ORDER
+        ),
+        "area_band": build_segment_summary(
+            market_segments, "area_band", AREA_BAND_ORDER
+        ),
+        "city": build_city_market_summary(market),
+    }
+
+
+class SaleProfileRollupTests(unittest.TestCase):
+    def assert_matches_pandas(
+        self,
+        cities: list[str],
+        rooms: list[str],
+        area_bands: list[str],
+        min_listings: int,
+    ) -> None:
+        segments = segment_rows()
+        supabase = sale_profile_rpc(segments)
+        normalized = dashboard_data.normalize_frame(segments)
+
+        rollup = dashboard_data.fetch_sale_profile_rollup(
+            cities, rooms, area_bands, min_listings, supabase=supabase
+        )
+        expected = pandas_rollup(normalized, cities, rooms, area_bands, min_listings)
+
+        for level, columns in dashboard_data.SALE_PROFILE_ROLLUP_LEVELS.items():
+            with self.subTest(level=level):
+                self.assertEqual(list(rollup[level].columns), list(columns))
+                pd.testing.assert_frame_equal(
+                    comparable(rollup[level], columns),
+                    comparable(expected[level], columns),
+                    check_dtype=False,
+                )
+
+    def test_unfiltered_rollup_matches_pandas_builders(self) -> None:
+        self.assert_matches_pandas([], [], [], 0)
+
+    def test_profile_rollup_matches_pandas_builders(self) -> None:
+        self.assert_matches_pandas(["Chisinau", "Balti"], ["1", "2"], [], 10)
+
+    def test_area_band_rollup_matches_pandas_builders(self) -> None:
+        self.assert_matches_pandas([], [], ["40-59 m2", "60-79 m2"], 5)
+
+    def test_rollup_with_no_market_returns_empty_levels(self) -> None:
+        self.assert_matches_pandas(["Orhei"], ["3"], [], 0)
+
+    def test_rollup_pages_are_read_until_a_short_page(self) -> None:
+        segments = segment_rows()
+        expected = dashboard_data.fetch_sale_profile_rollup(
+            [], [], [], 0, supabase=sale_profile_rpc(segments)
+        )
+        total = sum(len(level) for level in expected.values())
+        supabase = sale_profile_rpc(segments)
+
+        rollup = dashboard_data.fetch_sale_profile_rollup(
+            [], [], [], 0, page_size=4, supabase=supabase
+        )
+
+        self.assertEqual(
+            supabase.ranges,
+            [(start, start + 3) for start in range(0, total + 1, 4)],
+        )
+        for level, frame in rollup.items():
+            with self.subTest(level=level):
+                pd.testing.assert_frame_equal(frame, expected[level])
+
+    def test_empty_selections_are_sent_as_null_filters(self) -> None:
+        supabase = sale_profile_rpc(segment_rows())
+
+        dashboard_data.fetch_sale_profile_rollup(
+            ["Balti"], [], [], 3, supabase=supabase
+        )
+
+        self.assertEqual(
+            supabase.rpc_calls,
+            [
+                (
+                    "api_sale_profile_rollup",
+                    {
+                        "p_cities": ["Balti"],
+                        "p_rooms": None,
+                        "p_area_bands": None,
+                        "p_min_listings": 3,
+                    },
+                )
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,15 +6,22 @@ APP_PATH = Path(__file__).resolve().parents[1] / "app.py"
 
 def sale_tab_source() -> str:
     source = APP_PATH.read_text(encoding="utf-8")
-    start = source.index("    with tab_sale:")
-    end = source.index("    with tab_rent_monthly:", start)
+    start = source.index('    if active_view == "For Sale":')
+    end = source.index('    elif active_view == "Monthly Rent":', start)
     return source[start:end]
 
 
 def daily_rent_tab_source() -> str:
     source = APP_PATH.read_text(encoding="utf-8")
-    start = source.index("    with tab_rent_daily:")
-    end = source.index("    with tab_insights:", start)
+    start = source.index('    elif active_view == "Daily Rent":')
+    end = source.index('    elif active_view == "Insights":', start)
+    return source[start:end]
+
+
+def function_source(name: str, next_name: str) -> str:
+    source = APP_PATH.read_text(encoding="utf-8")
+    start = source.index(f"def {name}(")
+    end = source.index(f"def {next_name}(", start)
     return source[start:end]
 
 
@@ -27,11 +34,21 @@ def market_highlights_source() -> str:
 
 def insights_tab_source() -> str:
     source = APP_PATH.read_text(encoding="utf-8")
-    start = source.index("    with tab_insights:")
+    start = source.index('    elif active_view == "Insights":')
     end = source.index("# =========================\n# Footer", start)
     return source[start:end]
 
 
+class ViewRoutingTests(unittest.TestCase):
+    def test_only_the_selected_view_is_rendered(self) -> None:
+        source = APP_PATH.read_text(encoding="utf-8")
+
+        self.assertNotIn("st.tabs(", source)
+        for view in ("For Sale", "Monthly Rent", "Daily Rent", "Insights"):
+            with self.subTest(view=view):
+                self.assertEqual(source.count(f'active_view == "{view}":'), 1)
+
+
 class SaleTabLayoutTests(unittest.TestCase):
     def test_sale_trends_precede_market_overview(self) -> None:
         source = sale_tab_source()
@@ -47,16 +64,25 @@ class SaleTabLayoutTests(unittest.TestCase):
 class DailyRentTabLayoutTests(unittest.TestCase):
     def test_daily_yield_precedes_market_rankings(self) -> None:
         source = daily_rent_tab_source()
-        yield_position = source.index("render_yield_chart(")
-        rankings_position = min(
-            source.index("render_listing_sections"),
-            source.index("render_price_sections"),
+        analysis = function_source(
+            "render_daily_rent_analysis", "render_investment_analysis"
         )
 
-        self.assertLess(yield_position, rankings_position)
+        self.assertIn("render_daily_rent_analysis(", source)
+        self.assertNotIn("render_market_rankings(", source)
+        self.assertLess(
+            analysis.index("render_yield_chart("),
+            analysis.index("render_market_rankings("),
+        )
+        self.assertLess(
+            analysis.index("render_market_rankings("),
+            analysis.index('st.expander("Return scenarios"'),
+        )
 
     def test_return_scenarios_group_secondary_daily_analysis(self) -> None:
-        source = daily_rent_tab_source()
+        source = function_source(
+            "render_daily_rent_analysis", "render_investment_analysis"
+        )
         disclosure = 'with st.expander("Return scenarios"'
         self.assertIn(disclosure, source)
         disclosure_position = source.index(disclosure)
@@ -68,6 +94,32 @@ class DailyRentTabLayoutTests(unittest.TestCase):
         )
 
 
+class ViewFragmentTests(unittest.TestCase):
+    def test_view_local_inputs_live_inside_their_fragments(self) -> None:
+        fragments = {
+            "render_budget_guide": ("render_market_highlights", "buyer_budget_eur"),
+            "render_market_rankings": ("render_daily_rent_analysis", "market_lens"),
+            "render_daily_rent_analysis": (
+                "render_investment_analysis",
+                "daily_occupancy_input()",
+            ),
+            "render_investment_analysis": (
+                "render_daily_rent_context",
+                "daily_occupancy_input()",
+            ),
+            "render_sales_trend": ("selected_trend_city", '"trend_window"'),
+        }
+        source = APP_PATH.read_text(encoding="utf-8")
+        main_flow = source[source.index("# Load data") :]
+
+        for name, (next_name, widget) in fragments.items():
+            with self.subTest(fragment=name):
+                fragment = function_source(name, next_name)
+                self.assertIn(f"@st.fragment\ndef {name}(", source)
+                self.assertIn(widget, fragment)
+                self.assertNotIn(widget, main_flow)
+
+
 class MarketPulseLayoutTests(unittest.TestCase):
     def test_market_pulse_uses_compact_metrics_instead_of_kpi_cards(self) -> None:
         source = market_highlights_source()
@@ -0,0 +1,141 @@
+"""
+Peak-allocation budgets for the transform hot paths. Each transform runs
+once on a large synthetic snapshot under `tracemalloc`, and its peak is
+compared with the memory of its input frame. Defensive full copies show up
+as a whole extra input per copy, which these budgets leave no room for.
+"""
+
+import tracemalloc
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from dashboard_transforms import (
+    build_city_market_summary,
+    build_market_index,
+    build_occupancy_scenarios,
+    build_sale_market_from_segments,
+    build_segment_summary,
+    filter_sale_profile_segments,
+    occupancy_return_scenario,
+    occupancy_scenario,
+    select_market_segments,
+    select_markets,
+)
+
+ROWS = 200_000
+ROOM_GROUPS = ["1", "2", "3", "4+"]
+AREA_BANDS = ["<40 m2", "40-59 m2", "60-79 m2", "80+ m2"]
+
+
+def synthetic_segments(rows: int = ROWS) -> pd.DataFrame:
+    """Sale segment snapshots shaped like the normalized public table."""
+    rng = np.random.default_rng(5)
+    segments = pd.DataFrame(
+        {
+            "date": pd.Timestamp("2026-08-10")
+            - pd.to_timedelta(rng.integers(0, 90, rows), unit="D"),
+            "city": rng.choice([f"City {i}" for i in range(12)], rows),
+            "sector": rng.choice([f"Sector {i}" for i in range(40)], rows),
+            "rooms_group": rng.choice(ROOM_GROUPS, rows),
+            "area_band": rng.choice(AREA_BANDS, rows),
+            "listings": rng.integers(0, 40, rows),
+            "avg_price_eur": rng.uniform(30_000, 200_000, rows),
+            "avg_per_m2_eur": rng.uniform(500, 2_500, rows),
+        }
+    )
+    for column in ("city", "sector", "rooms_group", "area_band"):
+        segments[column] = segments[column].astype("category")
+    return segments
+
+
+def synthetic_yield(rows: int = ROWS) -> pd.DataFrame:
+    rng = np.random.default_rng(6)
+    return pd.DataFrame(
+        {
+            "city": rng.choice(["Chisinau", "Balti"], rows),
+            "sector": rng.choice(["Center", "Botanica"], rows),
+            "yield_monthly_percent": rng.uniform(3, 8, rows),
+            "yield_daily_percent": rng.uniform(4, 12, rows),
+            "annual_rent_monthly": rng.uniform(3_000, 9_000, rows),
+            "annual_rent_daily_60pct": rng.uniform(3_000, 15_000, rows),
+            "avg_sale_price_eur": rng.uniform(40_000, 200_000, rows),
+            "sale_listings": rng.integers(1, 50, rows),
+            "total_rent_listings": rng.integers(1, 50, rows),
+        }
+    )
+
+
+def peak_allocation(transform, *args) -> int:
+    """Bytes allocated at the peak of one call, after a warm-up call."""
+    transform(*args)
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        transform(*args)
+        return tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+
+
+class TransformPeakAllocationTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.segments = synthetic_segments()
+        cls.yield_data = synthetic_yield()
+
+    def assert_peak_within(
+        self, budget: float, data: pd.DataFrame, transform, *args
+    ) -> None:
+        """`transform(*args)` peaks at no more than `budget` times `data`."""
+        input_bytes = data.memory_usage(deep=True).sum()
+        peak = peak_allocation(transform, *args)
+        self.assertLessEqual(
+            peak / input_bytes,
+            budget,
+            f"{transform.__name__} peaked at {peak / input_bytes:.2f}x its input",
+        )
+
+    def test_segment_transforms_stay_within_their_budgets(self) -> None:
+        budgets = [
+            (1.0, filter_sale_profile_segments, (["1", "2"], ["<40 m2"])),
+            (3.4, build_sale_market_from_segments, ()),
+            (1.5, build_segment_summary, ("rooms_group", ROOM_GROUPS)),
+            (1.5, build_city_market_summary, ()),
+        ]
+        for budget, transform, args in budgets:
+            with self.subTest(transform=transform.__name__):
+                self.assert_peak_within(
+                    budget, self.segments, transform, self.segments, *args
+                )
+
+    def test_market_selections_stay_within_their_budgets(self) -> None:
+        index = build_market_index(self.segments)
+        markets = select_markets(
+            build_market_index(build_sale_market_from_segments(self.segments)),
+            ["City 1", "City 2"],
+        )
+        budgets = {
+            "two cities": (0.3, select_markets, (index, ["City 1", "City 2"])),
+            "min listings": (1.2, select_markets, (index, [], 10)),
+            "market segments": (0.55, select_market_segments, (index, markets)),
+        }
+        for selection, (budget, transform, args) in budgets.items():
+            with self.subTest(selection=selection):
+                self.assert_peak_within(budget, self.segments, transform, *args)
+
+    def test_occupancy_scenarios_stay_within_their_budgets(self) -> None:
+        scenarios = build_occupancy_scenarios(self.yield_data)
+        for budget, transform in (
+            (0.4, occupancy_scenario),
+            (1.6, occupancy_return_scenario),
+        ):
+            with self.subTest(transform=transform.__name__):
+                self.assert_peak_within(
+                    budget, self.yield_data, transform, scenarios, 45
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()